@@ -0,0 +1,280 @@
+# -----------------------------------------
+# RouterOS binary API transport (librouteros)
+# -----------------------------------------
+
+import itertools
+import ssl
+
+from librouteros import connect as api_connect
+from librouteros.exceptions import LibRouterosError
+from librouteros.protocol import cast_to_api, compose_word, parse_word
+
+from parsing import split_command
+
+
+API_PORT = 8728
+API_SSL_PORT = 8729
+
+# CLI print arguments that only affect text rendering
+_PRINT_DISPLAY_ARGS = {"detail", "terse", "without-paging", "show-ids"}
+
+# "where" operators: the API ANDs consecutive queries on its own; the rest
+# would need query stack words (?#|, ?#!) and are not translated
+_QUERY_AND = {"and", "&&"}
+_QUERY_UNSUPPORTED = {"or", "||", "not", "!", "in"}
+
+# Name of the first unnamed CLI argument for verbs that take one
+_POSITIONAL = {
+    "monitor-traffic": "interface",
+    "monitor": "numbers",
+    "ping": "address",
+    "set": "numbers",
+    "remove": "numbers",
+    "enable": "numbers",
+    "disable": "numbers",
+    "run": "number",
+}
+
+
+###################
+# Translate a RouterOS CLI command into an API sentence
+###################
+def cli_to_api(command: str):
+    """
+    Converts e.g. "/ip address print detail where interface=ether1" or
+    "/ip/service/set numbers=3 disabled=yes" into (path, words).
+
+    Only the plain "menu verb key=value" subset of the CLI is supported;
+    scripting such as [find ...] raises RuntimeError.
+    """
+    if "[" in command or "{" in command or command.lstrip().startswith(":"):
+        raise RuntimeError(
+            f"Command not supported over the RouterOS API: {command}"
+        )
+
+    path, args = split_command(command)
+    if not path:
+        raise RuntimeError(f"Empty RouterOS command: {command}")
+
+    verb = path[-1]
+    words = []
+    in_query = False
+    positional = _POSITIONAL.get(verb)
+    for token in args:
+        if token == "where":
+            in_query = True
+            continue
+
+        key, sep, value = token.partition("=")
+        if in_query and token in _QUERY_AND:
+            continue
+        if in_query and token in _QUERY_UNSUPPORTED:
+            raise RuntimeError(
+                f"'{token}' in where is not supported over the RouterOS API: {command}"
+            )
+        if in_query:
+            words.append(f"?{key}={value}")
+        elif sep:
+            words.append(f"={key}={value}")
+        elif verb == "print" and key in _PRINT_DISPLAY_ARGS:
+            continue
+        elif positional:
+            words.append(f"={positional}={key}")
+            positional = None
+        else:
+            words.append(f"={key}=")          # flag argument, e.g. once
+
+    return "/" + "/".join(path), words
+
+
+###################
+# Render API rows as CLI text the existing parsers understand
+###################
+def _format_value(value):
+    text = cast_to_api(value)
+    if text == "" or any(c in text for c in ' ";=\\'):
+        text = '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+def format_row(index, row):
+    """
+    Rows with an .id render as one "print terse" line; id-less rows
+    (single-item menus like /system resource) render as "key: value".
+    """
+    if ".id" not in row:
+        return "\n".join(f"{k}: {cast_to_api(v)}" for k, v in row.items())
+
+    flags = "X" if row.get("disabled") is True else ""
+    fields = " ".join(
+        f"{k}={_format_value(v)}" for k, v in row.items() if k != ".id"
+    )
+    return f"{index:>2} {flags:<2} {fields}"
+
+
+def _tag_of(attrs):
+    for word in attrs:
+        if word.startswith(".tag="):
+            return word[len(".tag="):]
+    return None
+
+
+class ApiConnection:
+    """
+    One RouterOS API session (port 8728, or 8729 with TLS).
+    Rows are streamed as dicts straight off the socket.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str | None = None,
+        port: int | None = None,
+        use_tls: bool = False,
+        timeout: int = 10,
+        connect_timeout: int | None = None,
+    ):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.port = port or (API_SSL_PORT if use_tls else API_PORT)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout or timeout
+        self.api = None
+        self._tags = itertools.count(1)
+
+    def connect(self):
+        kwargs = {"port": self.port, "timeout": self.connect_timeout,
+                  "encoding": "latin-1"}
+
+        if self.use_tls:
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE     # RouterOS ships self-signed
+            kwargs["ssl_wrapper"] = ctx.wrap_socket
+
+        try:
+            self.api = api_connect(
+                host=self.host,
+                username=self.username,
+                password=self.password or "",
+                **kwargs,
+            )
+        except (LibRouterosError, OSError) as exc:
+            raise RuntimeError(
+                f"API connection failed to {self.host}: {exc}"
+            ) from exc
+        # connect_timeout covered connect and login; replies get the full one
+        self.api.protocol.transport.sock.settimeout(self.timeout)
+
+    def close(self):
+        if self.api:
+            try:
+                self.api.close()
+            except OSError:
+                pass
+            self.api = None
+
+    def is_alive(self):
+        if not self.api:
+            return False
+        try:
+            tuple(self.api("/system/identity/print"))
+        except (LibRouterosError, OSError):
+            return False
+        return True
+
+    ###################
+    # Streaming command execution
+    ###################
+    def _read(self):
+        """
+        Reads one reply sentence. A !fatal reply or a dead socket closes
+        the session and raises RuntimeError.
+        """
+        try:
+            return self.api.protocol.readSentence()
+        except (LibRouterosError, OSError) as exc:
+            self.close()
+            raise RuntimeError(f"Router error: {exc}") from exc
+
+    def _cancel(self, tag):
+        """
+        Stops the running command tagged tag (e.g. an endless
+        monitor-traffic) and reads until it and the /cancel have finished.
+        """
+        cancel_tag = next(self._tags)
+        self.api.protocol.writeSentence("/cancel", f"=tag={tag}", f".tag={cancel_tag}")
+        pending = {str(tag), str(cancel_tag)}
+        while pending and self.api:
+            reply, attrs = self._read()
+            if reply == "!done":
+                pending.discard(_tag_of(attrs))
+
+    def stream(self, path: str, *words: str):
+        """
+        Sends one API sentence and yields each !re reply as a dict while
+        it arrives. If the caller stops early, the command is cancelled
+        (/cancel on its .tag) so the session stays usable; endless
+        commands such as monitor-traffic end this way.
+        """
+        if not self.api:
+            raise RuntimeError("Not connected to router")
+
+        tag = str(next(self._tags))
+        self.api.protocol.writeSentence(path, *words, f".tag={tag}")
+        trap = None
+        done = False
+        try:
+            while True:
+                reply, attrs = self._read()
+                if _tag_of(attrs) != tag:
+                    continue                # late reply to an older command
+                row = dict(parse_word(w) for w in attrs if w.startswith("="))
+                if reply == "!re":
+                    yield row
+                elif reply == "!trap":
+                    trap = trap or row.get("message", "unknown error")
+                elif reply == "!done":
+                    done = True
+                    break
+        finally:
+            if not done and self.api:
+                try:
+                    self._cancel(tag)
+                except (RuntimeError, LibRouterosError, OSError):
+                    self.close()
+
+        if trap:
+            raise RuntimeError(f"Router error: {trap}")
+
+    def rows(self, path: str, proplist=None, **query):
+        """
+        Yields rows of <path>/print. proplist limits the returned columns
+        (.proplist), query keyword arguments become ?key=value filters.
+        """
+        words = []
+        if proplist:
+            words.append(f"=.proplist={','.join(proplist)}")
+        words.extend(f"?{k}={cast_to_api(v)}" for k, v in query.items())
+        yield from self.stream(path.rstrip("/") + "/print", *words)
+
+    def call_lines(self, command: str):
+        """
+        Runs a CLI-style command and yields its result as CLI text lines.
+        """
+        path, words = cli_to_api(command)
+        for index, row in enumerate(self.stream(path, *words)):
+            yield from format_row(index, row).splitlines()
+
+    def call(self, command: str):
+        return "\n".join(self.call_lines(command))
+
+    def run(self, path: str, **args):
+        """
+        Runs an API command with attribute words, returns all rows.
+        """
+        words = [compose_word(k, v) for k, v in args.items()]
+        return list(self.stream(path, *words))
@@ -0,0 +1,175 @@
+# -----------------------------------------
+# Local config export archive (content-addressed, gzip-compressed)
+# -----------------------------------------
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from config import MT_STATE_DIR
+from units import parse_duration
+
+
+ARCHIVE_DIR = os.path.join(MT_STATE_DIR, "archive")
+
+# "# 2024-01-02 12:00:00 by RouterOS 7.14" changes on every export
+_HEADER_STAMP = re.compile(r"^#.* by RouterOS ")
+
+
+def normalize(lines):
+    """
+    Drops the timestamp line of an /export header and trailing whitespace,
+    so identical configs hash identically.
+    """
+    header = True
+    for line in lines:
+        line = line.rstrip()
+        if header:
+            if _HEADER_STAMP.match(line):
+                continue
+            header = line.startswith("#")
+        yield line
+
+
+class ConfigArchive:
+    """
+    Exports stored once per distinct content:
+
+        <root>/objects/<sha[:2]>/<sha>.rsc.gz   compressed export
+        <root>/history/<router>.jsonl           one line per change
+
+    An export identical to the router's latest one writes nothing.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or ARCHIVE_DIR
+        self._lock = threading.Lock()
+
+    def object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.rsc.gz")
+
+    def _history_path(self, router):
+        return os.path.join(self.root, "history", f"{router}.jsonl")
+
+    ###################
+    # Read
+    ###################
+    def read(self, sha):
+        with gzip.open(self.object_path(sha), "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def history(self, router):
+        """
+        [{"time", "sha", "size"}] oldest first.
+        """
+        try:
+            with open(self._history_path(router)) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def latest(self, router):
+        entries = self.history(router)
+        return entries[-1] if entries else None
+
+    def resolve(self, router, ref="latest"):
+        """
+        Returns the sha of an archived version. ref is "latest", "-N" (N
+        versions before latest), an age ("7d": as of a week ago), an ISO
+        date/time (as of then) or a sha prefix.
+        """
+        entries = self.history(router)
+        if not entries:
+            raise ValueError(f"No archived export for {router}")
+
+        if ref in ("", "latest"):
+            return entries[-1]["sha"]
+
+        if re.fullmatch(r"-\d+", ref):
+            back = int(ref[1:])
+            if back >= len(entries):
+                raise ValueError(f"{router} has only {len(entries)} versions")
+            return entries[-1 - back]["sha"]
+
+        age = parse_duration(ref)
+        if age is not None or re.match(r"^\d{4}-\d{2}-\d{2}", ref):
+            when = (datetime.fromtimestamp(time.time() - age)
+                    if age is not None else datetime.fromisoformat(ref))
+            older = [e for e in entries
+                     if datetime.fromisoformat(e["time"]) <= when]
+            if not older:
+                raise ValueError(f"No export of {router} as of {when:%Y-%m-%d %H:%M}")
+            return older[-1]["sha"]
+
+        matches = {e["sha"] for e in entries if e["sha"].startswith(ref)}
+        if len(matches) != 1:
+            raise ValueError(f"{router}@{ref}: {'ambiguous' if matches else 'unknown'} version")
+        return matches.pop()
+
+    def routers(self):
+        path = os.path.join(self.root, "history")
+        if not os.path.isdir(path):
+            return []
+        return sorted(f[:-len(".jsonl")] for f in os.listdir(path)
+                      if f.endswith(".jsonl"))
+
+    ###################
+    # Write
+    ###################
+    def store(self, router, lines):
+        """
+        Hashes the export while it streams in. Writes the object only if
+        the content is new and records it in the router's history only if
+        it differs from the latest entry. Returns {"status", "sha", "size"}
+        with status "unchanged", "known" (object already archived, e.g. a
+        reverted change) or "new".
+        """
+        digest = hashlib.sha256()
+        text = []
+        for line in normalize(lines):
+            data = (line + "\n").encode()
+            digest.update(data)
+            text.append(data)
+        sha = digest.hexdigest()
+        size = sum(len(t) for t in text)
+
+        latest = self.latest(router)
+        if latest and latest["sha"] == sha:
+            return {"status": "unchanged", "sha": sha, "size": size}
+
+        path = self.object_path(sha)
+        status = "known" if os.path.exists(path) else "new"
+        if status == "new":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            # mtime=0 keeps the compressed bytes deterministic
+            with open(tmp, "wb") as raw, \
+                    gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.writelines(text)
+            os.replace(tmp, path)
+
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "sha": sha,
+                 "size": size}
+        with self._lock:
+            os.makedirs(os.path.dirname(self._history_path(router)),
+                        exist_ok=True)
+            with open(self._history_path(router), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+        return {"status": status, "sha": sha, "size": size}
+
+
+###################
+# Stream one router's /export into the archive
+###################
+def export_router(client, name, archive, sensitive=False):
+    if client.api:
+        raise RuntimeError("/export is only available over SSH")
+
+    command = "/export show-sensitive" if sensitive else "/export"
+    return archive.store(name, client.call_iter(command))
@@ -0,0 +1,995 @@
+# -----------------------------------------
+# Headless batch mode: run one task across routers, emit records
+# -----------------------------------------
+
+import contextlib
+import copy
+import csv
+import json
+import math
+import os
+from datetime import datetime
+import re
+import statistics
+import sys
+import threading
+import time
+
+import prompts
+from config import MT_MAX_WORKERS, MT_POOL_IDLE_TIMEOUT, MT_TRAFFIC_HISTORY
+from tasks.misc1_2 import parse_system_resources
+from units import format_rate, parse_duration
+from report import Report, parse_filter
+from registry import TASKS, find_task, task_key
+from routers import get_router_clients
+from runner import connected, run_on_routers
+
+# Feature modules (archive, exporter, metrics, traffic, upgrade, ...) are
+# imported inside their subcommand handlers, so each subcommand only loads
+# what it runs
+
+
+FORMATS = ("ndjson", "json", "csv", "text")
+
+_CSV_FIELDS = ["router", "task", "ok", "error", "elapsed", "output", "data"]
+
+
+def parse_names(value):
+    return [n.strip() for n in (value or "").split(",") if n.strip()]
+
+
+###################
+# Result record writers
+###################
+class RecordWriter:
+    """
+    Writes one record per router as soon as it completes. json is the only
+    format that needs the full set and is emitted on close().
+    """
+
+    def __init__(self, fmt, stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.records = []
+        self._csv = None
+
+        if fmt == "csv":
+            self._csv = csv.DictWriter(
+                self.stream, fieldnames=_CSV_FIELDS, extrasaction="ignore"
+            )
+            self._csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == "ndjson":
+            self.stream.write(json.dumps(record, default=str) + "\n")
+        elif self.fmt == "csv":
+            data = record.get("data")
+            self._csv.writerow({**record, "data": "" if data is None
+                                else json.dumps(data, default=str)})
+        elif self.fmt == "json":
+            self.records.append(record)
+        else:
+            status = "OK" if record["ok"] else f"FAIL {record['error']}"
+            self.stream.write(f"--- {record['router']} [{status}] ---\n")
+            if record.get("output"):
+                self.stream.write(record["output"].rstrip("\n") + "\n")
+            elif isinstance(record.get("data"), list):
+                for row in record["data"]:
+                    self.stream.write(" ".join(f"{k}={v}" for k, v in row.items()) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.fmt == "json":
+            json.dump(self.records, self.stream, indent=2, default=str)
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def to_record(task, result):
+    return {
+        "router": result["router"],
+        "task": task_key(task),
+        "ok": result["ok"],
+        "error": result["error"],
+        "elapsed": round(result["elapsed"], 3),
+        "output": result.get("output", ""),
+        "data": result.get("data"),
+    }
+
+
+###################
+# main.py run
+###################
+def cmd_run(args):
+    task = find_task(args.task)
+    if not task:
+        print(f"Unknown task: {args.task} (see 'main.py tasks')",
+              file=sys.stderr)
+        return 2
+
+    try:
+        selected = get_router_clients(args.routers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    # Prompts take --answer values in order, then default to skip
+    prompts.set_answers(args.answer)
+
+    # A setup hook consumes the answers once for all routers
+    options = {}
+    if task.get("setup"):
+        prompts.reset()
+        # Keep the echoed prompts out of the record stream
+        with contextlib.redirect_stdout(sys.stderr):
+            options = task["setup"]()
+
+    def _run(client, name):
+        prompts.reset()
+        # Read-only report tasks return their rows as data, not printed text
+        if task.get("rows") and task.get("read_only"):
+            return task["rows"](client, name)
+        return task["func"](client, name, **options)
+
+    writer = RecordWriter(args.format)
+    results = run_on_routers(
+        {**task, "func": _run},
+        selected,
+        max_workers=args.workers,
+        on_result=lambda result: writer.write(to_record(task, result)),
+        capture=True,
+    )
+    writer.close()
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+###################
+# main.py report
+###################
+def cmd_report(args):
+    task = find_task(args.task)
+    if not task or not task.get("rows"):
+        reportable = ", ".join(task_key(t) for t in TASKS.values() if t.get("rows"))
+        print(f"No report for task: {args.task} (available: {reportable})",
+              file=sys.stderr)
+        return 2
+
+    try:
+        selected = get_router_clients(args.routers)
+        report = Report(
+            columns=parse_names(args.columns) or task.get("columns"),
+            filters=args.filter,
+            sort=args.sort,
+            fmt=args.format,
+        )
+    except (ValueError, re.error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    # Rows are rendered as each router responds
+    results = run_on_routers(
+        {**task, "func": task["rows"]},
+        selected,
+        max_workers=args.workers,
+        on_result=lambda r: report.add(r["router"], r["data"], r["error"]),
+        capture=True,
+    )
+    report.close()
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+###################
+# main.py logs
+###################
+def _log_writer(fmt):
+    import logtail
+
+    lock = threading.Lock()
+
+    def _write(router, entry):
+        if fmt == "ndjson":
+            line = json.dumps({"router": router, **entry})
+        else:
+            line = logtail.format_entry(router, entry)
+        with lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    return _write
+
+
+def _follow_router(name, client, cursor, write, retry=5):
+    """
+    Follows one router's log until the process exits, reconnecting after
+    errors.
+    """
+    import logtail
+
+    while True:
+        try:
+            with connected(client):
+                logtail.follow(client, name, write, cursor)
+        except Exception as e:
+            print(f"{name}: {e} (retrying in {retry}s)", file=sys.stderr)
+        time.sleep(retry)
+
+
+def cmd_logs(args):
+    import logtail
+
+    try:
+        selected = get_router_clients(args.routers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    write = _log_writer(args.format)
+
+    if not args.follow:
+        def _on_result(result):
+            if result["error"]:
+                print(f"{result['router']}: {result['error']}", file=sys.stderr)
+            for entry in result["data"] or []:
+                write(result["router"], entry)
+
+        results = run_on_routers(
+            {"func": lambda client, name: logtail.poll(client, name, args.limit)},
+            selected,
+            max_workers=args.workers,
+            on_result=_on_result,
+            capture=True,
+        )
+        return 0 if all(r["ok"] for r in results) else 1
+
+    # One long-lived log request per router
+    cursors = {name: logtail.LogCursor(name) for name in selected}
+    for name, client in selected.items():
+        threading.Thread(
+            target=_follow_router, args=(name, client, cursors[name], write),
+            daemon=True,
+        ).start()
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for cursor in cursors.values():
+            cursor.save()
+    return 0
+
+
+###################
+# main.py traffic
+###################
+_TRAFFIC_COLUMNS = [
+    "router", "interface",
+    "rx-bps-mean", "rx-bps-p95", "rx-bps-peak",
+    "tx-bps-mean", "tx-bps-p95", "tx-bps-peak",
+]
+
+
+def _humanize_rates(row):
+    return {k: format_rate(v) if "-bps-" in k else v for k, v in row.items()}
+
+
+def cmd_traffic(args):
+    from traffic import TrafficSampler
+
+    try:
+        selected = get_router_clients(args.routers)
+        columns = parse_names(args.columns) or _TRAFFIC_COLUMNS
+        for expr in args.filter:
+            parse_filter(expr)
+    except (ValueError, re.error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    sampler = TrafficSampler(selected, history=MT_TRAFFIC_HISTORY,
+                             interval=args.interval)
+    sampler.start()
+
+    started = time.monotonic()
+    try:
+        while True:
+            time.sleep(args.every)
+            rows = sampler.rows(args.window)
+            if args.format == "table":
+                rows = [_humanize_rates(r) for r in rows]
+                print(f"\n--- last {args.window}s, {time.strftime('%H:%M:%S')} ---")
+
+            report = Report(columns=columns, filters=args.filter,
+                            sort=args.sort, fmt=args.format)
+            for router in selected:
+                report.add(router, [r for r in rows if r["router"] == router])
+            report.close()
+
+            if args.duration and time.monotonic() - started >= args.duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+    return 0
+
+
+###################
+# main.py metrics collect | query
+###################
+def _collect_resources(client, name):
+    import metrics
+
+    # Every sample must come from the router, not the result cache
+    return metrics.normalize(
+        parse_system_resources(client.call("/system resource print", fresh=True))
+    )
+
+
+def cmd_metrics_collect(args):
+    import metrics
+
+    try:
+        selected = get_router_clients(args.routers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    store = metrics.MetricsStore()
+
+    def _on_result(result):
+        if result["ok"]:
+            store.append(result["router"], result["data"])
+            print(f"{result['router']}: {len(result['data'])} metrics")
+        else:
+            print(f"{result['router']}: {result['error']}", file=sys.stderr)
+
+    ok = True
+    try:
+        while True:
+            started = time.monotonic()
+            results = run_on_routers(
+                {"func": _collect_resources}, selected,
+                max_workers=args.workers, on_result=_on_result, capture=True,
+            )
+            ok = all(r["ok"] for r in results)
+            if not args.every:
+                break
+            time.sleep(max(0, args.every - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    return 0 if ok else 1
+
+
+def _parse_when(text):
+    """
+    "7d" (ago) or an ISO date/time -> epoch seconds.
+    """
+    if not text:
+        return None
+    seconds = parse_duration(text)
+    if seconds is not None:
+        return time.time() - seconds
+    return datetime.fromisoformat(text).timestamp()
+
+
+def cmd_metrics_query(args):
+    import metrics
+
+    store = metrics.MetricsStore()
+    routers = parse_names(args.routers) or store.routers()
+    columns = parse_names(args.columns) or sorted(
+        {m for router in routers for m in store.metrics(router)})
+
+    try:
+        start = _parse_when(args.since)
+        end = _parse_when(args.until)
+        step = parse_duration(args.step) if args.step else None
+        if args.step and not step:
+            raise ValueError(f"Invalid step: {args.step}")
+        report = Report(columns=["router", "time"] + columns,
+                        filters=args.filter, sort=args.sort, fmt=args.format,
+                        width=20)
+    except (ValueError, re.error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    for router in routers:
+        ts, values = store.query(router, columns, start, end)
+        if step:
+            ts, values = metrics.downsample(ts, values, int(step), args.agg)
+
+        rows = []
+        for i, t in enumerate(ts):
+            row = {"time": time.strftime("%Y-%m-%d %H:%M:%S",
+                                         time.localtime(int(t)))}
+            for col, series in values.items():
+                if not math.isnan(series[i]):
+                    row[col] = round(float(series[i]), 3)
+            rows.append(row)
+        report.add(router, rows)
+
+    report.close()
+    return 0
+
+
+###################
+# main.py serve
+###################
+def cmd_serve(args):
+    from exporter import Exporter, serve
+
+    try:
+        selected = get_router_clients(args.routers)
+        host, _, port = args.listen.rpartition(":")
+        port = int(port)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    exporter = Exporter(selected, interval=args.interval,
+                        max_workers=args.workers,
+                        idle_timeout=MT_POOL_IDLE_TIMEOUT)
+    try:
+        serve(exporter, host or "0.0.0.0", port)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Cannot listen on {args.listen}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+###################
+# main.py export
+###################
+def _print_export_history(store, routers):
+    for router in routers or store.routers():
+        print(f"--- {router} ---")
+        for entry in store.history(router):
+            print(f"{entry['time']}  {entry['sha'][:12]}  {entry['size']:>8} bytes")
+
+
+def cmd_export(args):
+    import archive
+
+    store = archive.ConfigArchive()
+    if args.history:
+        _print_export_history(store, parse_names(args.routers))
+        return 0
+
+    try:
+        selected = get_router_clients(args.routers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    def _on_result(result):
+        if result["ok"]:
+            data = result["data"]
+            print(f"{result['router']:<16} {data['status']:<10} "
+                  f"{data['sha'][:12]}  {data['size']:>8} bytes  "
+                  f"{result['elapsed']:.1f}s")
+        else:
+            print(f"{result['router']:<16} FAILED     {result['error']}",
+                  file=sys.stderr)
+
+    results = run_on_routers(
+        {"func": lambda client, name: archive.export_router(
+            client, name, store, args.sensitive)},
+        selected,
+        max_workers=args.workers,
+        on_result=_on_result,
+        capture=True,
+    )
+
+    counts = {}
+    for r in results:
+        status = r["data"]["status"] if r["ok"] else "failed"
+        counts[status] = counts.get(status, 0) + 1
+    print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+###################
+# main.py diff
+###################
+def _split_ref(ref):
+    name, _, version = ref.partition("@")
+    return name, version or "latest"
+
+
+def _load_exports(refs, store):
+    """
+    Returns {ref: export text}. Refs are files, router@live (exported now,
+    in parallel) or archived versions (router, router@-1, router@7d, ...).
+    """
+    import archive
+
+    texts = {}
+    live = {}
+    for ref in refs:
+        name, version = _split_ref(ref)
+        if os.path.isfile(ref):
+            with open(ref, encoding="utf-8", errors="replace") as f:
+                texts[ref] = f.read()
+        elif version == "live":
+            live[name] = ref
+        else:
+            texts[ref] = store.read(store.resolve(name, version))
+
+    if live:
+        selected = get_router_clients(list(live))
+        results = run_on_routers(
+            {"func": lambda client, name: "\n".join(archive.normalize(
+                client.call_iter("/export")))},
+            selected, max_workers=MT_MAX_WORKERS,
+            on_result=lambda r: None, capture=True,
+        )
+        for r in results:
+            if not r["ok"]:
+                raise ValueError(f"{r['router']}@live: {r['error']}")
+            texts[live[r["router"]]] = r["data"]
+
+    return texts
+
+
+def cmd_diff(args):
+    import archive
+    import configdiff
+
+    store = archive.ConfigArchive()
+    targets = list(args.targets)
+    if args.all:
+        targets += [r for r in store.routers()
+                    if r != _split_ref(args.base)[0] and r not in targets]
+    if not targets:
+        print("Nothing to compare: give a target or --all", file=sys.stderr)
+        return 2
+
+    try:
+        texts = _load_exports([args.base] + targets, store)
+    except (ValueError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    base = configdiff.parse_export(texts[args.base])
+    results = {}
+    for target in targets:
+        changes = configdiff.diff_exports(
+            base, configdiff.parse_export(texts[target]), args.ignore)
+        results[target] = changes
+
+        if args.format == "json":
+            continue
+        counts = configdiff.summarize(changes)
+        print(f"=== {args.base} -> {target}: +{counts['+']} -{counts['-']} "
+              f"~{counts['~']} ===")
+        if changes and not args.summary:
+            print(configdiff.format_diff(changes))
+
+    if args.format == "json":
+        json.dump({
+            target: {menu: [{"op": op, "key": key, "fields": data}
+                            for op, key, data in section]
+                     for menu, section in changes.items()}
+            for target, changes in results.items()
+        }, sys.stdout, indent=2)
+        print()
+
+    return 1 if any(results.values()) else 0
+
+
+###################
+# main.py leases
+###################
+def cmd_leases(args):
+    import leases
+
+    try:
+        selected = get_router_clients(args.routers)
+        older_than = parse_duration(args.older_than) if args.older_than else None
+        if args.older_than and older_than is None:
+            raise ValueError(f"Invalid duration: {args.older_than}")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    lease_filter = leases.LeaseFilter(
+        status=args.status, older_than=older_than, mac_prefix=args.mac_prefix,
+        server=args.server, hostname=args.hostname,
+        include_static=args.include_static,
+    )
+    action = "removed" if args.apply else "would remove"
+    print(f"Filter: {lease_filter}", file=sys.stderr)
+
+    def _on_result(result):
+        if not result["ok"]:
+            print(f"{result['router']:<16} FAILED {result['error']}",
+                  file=sys.stderr)
+            return
+        data = result["data"]
+        if args.list:
+            for lease in data["leases"]:
+                print(f"{result['router']:<16} {lease.get('address', ''):<16} "
+                      f"{lease.get('mac-address', ''):<18} "
+                      f"{lease.get('host-name', ''):<24} "
+                      f"{lease.get('status', ''):<8} {lease.get('last-seen', '')}")
+        count = data["removed"] if args.apply else data["matched"]
+        print(f"{result['router']:<16} {data['total']:>6} leases  "
+              f"{data['matched']:>6} matched  {count:>6} {action}")
+
+    results = run_on_routers(
+        {"func": lambda client, name: leases.cleanup(
+            client, lease_filter, args.apply)},
+        selected,
+        max_workers=args.workers,
+        on_result=_on_result,
+        capture=True,
+    )
+
+    done = [r["data"] for r in results if r["ok"]]
+    print(f"Total: {sum(d['matched'] for d in done)} matched, "
+          f"{sum(d['removed'] for d in done)} removed on {len(done)} routers"
+          + ("" if args.apply else " (dry run, use --apply to remove)"))
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+###################
+# main.py apply
+###################
+def _read_commands(path):
+    f = sys.stdin if path == "-" else open(path)
+    with f:
+        return [line.strip() for line in f
+                if line.strip() and not line.lstrip().startswith("#")]
+
+
+def cmd_apply(args):
+    import changeset
+
+    try:
+        selected = get_router_clients(args.routers)
+        commands = _read_commands(args.file)
+    except (ValueError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    changes = changeset.ChangeSet(stop_on_error=args.stop_on_error)
+    changes.extend(commands)
+    if args.show:
+        sys.stdout.write(changes.script())
+        return 0
+
+    def _on_result(result):
+        router = result["router"]
+        if not result["ok"]:
+            print(f"{router:<16} FAILED {result['error']}", file=sys.stderr)
+            return
+        for i, line in enumerate(result["data"]):
+            if line["status"] != "ok" or args.verbose:
+                print(f"{router:<16} #{i:<4} {line['status']:<8} {line['command']}")
+                if line["output"]:
+                    print(f"{'':<16}       {line['output']}")
+        counts = changeset.summarize(result["data"])
+        print(f"{router:<16} " + ", ".join(
+            f"{n} {status}" for status, n in sorted(counts.items())))
+
+    results = run_on_routers(
+        {"func": lambda client, name: changes.apply(client)},
+        selected,
+        max_workers=args.workers,
+        on_result=_on_result,
+        capture=True,
+    )
+    return 0 if all(
+        r["ok"] and all(line["status"] == "ok" for line in r["data"])
+        for r in results) else 1
+
+
+###################
+# main.py firewall
+###################
+FIREWALL_FINDINGS = ("hot", "shadowed", "zero-hit")
+
+
+def cmd_firewall(args):
+    import firewall
+
+    findings = parse_names(args.findings) or list(FIREWALL_FINDINGS)
+    try:
+        selected = get_router_clients(args.routers)
+        unknown = [f for f in findings if f not in FIREWALL_FINDINGS]
+        if unknown:
+            raise ValueError(f"Unknown finding(s): {', '.join(unknown)}")
+        report = Report(
+            columns=["router", "finding", "chain", "position", "action",
+                     "packets", "share", "detail"],
+            filters=args.filter, sort=args.sort, fmt=args.format,
+        )
+    except (ValueError, re.error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    def _analyze(client, name):
+        # Parsing and analysis run in the worker thread of each router
+        rules = firewall.fetch_rules(client, args.table)
+        analysis = firewall.analyze(rules, top=args.top)
+        print(f"  {name}: {analysis['rules']} rules, {len(analysis['zero'])} "
+              f"never matched, {len(analysis['shadowed'])} shadowed",
+              file=sys.stderr)
+        return [row for row in firewall.analysis_rows(analysis)
+                if row["finding"] in findings]
+
+    results = run_on_routers(
+        {"func": _analyze}, selected,
+        max_workers=args.workers,
+        on_result=lambda r: report.add(r["router"], r["data"], r["error"]),
+        capture=True,
+    )
+    report.close()
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+###################
+# main.py locate
+###################
+def _refresh_index(index, args):
+    import locator
+
+    try:
+        selected = get_router_clients(args.routers)
+        max_age = parse_duration(args.max_age) if args.max_age else 0
+        if args.max_age and max_age is None:
+            raise ValueError(f"Invalid duration: {args.max_age}")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return False
+
+    if max_age:
+        stale = index.stale_routers(selected, max_age)
+        selected = {n: selected[n] for n in stale}
+    counts = {"changed": 0, "unchanged": 0, "failed": 0}
+
+    def _on_result(result):
+        if not result["ok"]:
+            counts["failed"] += 1
+            print(f"{result['router']:<16} FAILED {result['error']}",
+                  file=sys.stderr)
+            return
+        changed = index.update(result["router"], result["data"])
+        counts["changed" if changed else "unchanged"] += 1
+
+    run_on_routers(
+        {"func": locator.collect}, selected,
+        max_workers=args.workers, on_result=_on_result, capture=True,
+    )
+    print(f"Index: {counts['changed']} routers updated, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed",
+          file=sys.stderr)
+    return counts["failed"] == 0
+
+
+def cmd_locate(args):
+    import locator
+
+    if not args.query and not args.refresh:
+        print("Give a MAC, IP, CIDR or host name to look up, or --refresh",
+              file=sys.stderr)
+        return 2
+
+    index = locator.HostIndex()
+    try:
+        ok = _refresh_index(index, args) if args.refresh else True
+        if not args.query:
+            return 0 if ok else 1
+
+        try:
+            found = index.find(args.query, kind=args.kind, limit=args.limit)
+            report = Report(columns=locator.COLUMNS, filters=[], sort=None,
+                            fmt=args.format)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+
+        now = time.time()
+        for row in found:
+            row["seen"] = _format_age(now - row["seen"])
+            report.add(row.pop("router"), [row])
+        report.close()
+        if not found:
+            print(f"{args.query}: not found", file=sys.stderr)
+        return 0 if found and ok else 1
+    finally:
+        index.close()
+
+
+def _format_age(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit} ago"
+    return f"{int(seconds)}s ago"
+
+
+###################
+# main.py upgrade
+###################
+def cmd_upgrade(args):
+    import upgrade
+
+    try:
+        selected = get_router_clients(args.routers)
+        timeout = parse_duration(args.timeout)
+        if not timeout:
+            raise ValueError(f"Invalid timeout: {args.timeout}")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    # Phase 1: checks run on all routers at once, each polling until settled
+    print(f"Checking {len(selected)} routers for updates...", file=sys.stderr)
+    checks = run_on_routers(
+        {"func": lambda client, name: upgrade.check(
+            client, name, args.channel, args.check_timeout)},
+        selected, max_workers=args.workers, on_result=lambda r: None,
+        capture=True,
+    )
+
+    targets = {}
+    for r in sorted(checks, key=lambda r: r["router"]):
+        if not r["ok"]:
+            print(f"{r['router']:<16} FAILED {r['error']}")
+            continue
+        info = r["data"]
+        print(f"{r['router']:<16} {info.get('installed-version', '?'):<12} "
+              f"{info.get('latest-version', '?'):<12} {info.get('status', '')}")
+        if info["update-available"] and info["settled"]:
+            targets[r["router"]] = info["latest-version"]
+
+    waves = upgrade.plan_waves(sorted(targets), args.wave_size, args.canary)
+    print(f"\n{len(targets)} routers to upgrade in {len(waves)} waves "
+          f"(canary {args.canary}, wave size {args.wave_size})")
+    if not targets or not args.apply:
+        if targets:
+            print("Dry run, use --apply to install")
+        return 0 if all(r["ok"] for r in checks) else 1
+
+    # Phase 2: install wave by wave, each router confirmed on its new version
+    def _on_result(result):
+        if result["ok"]:
+            data = result["data"]
+            print(f"{result['router']:<16} upgraded to {data['version']} "
+                  f"(back after {data['downtime']}s)")
+        else:
+            print(f"{result['router']:<16} FAILED {result['error']}")
+
+    results = upgrade.rollout(
+        selected, targets, wave_size=args.wave_size, canary=args.canary,
+        max_workers=args.workers, max_failures=args.max_failures,
+        timeout=timeout, on_result=_on_result,
+    )
+    done = sum(r["ok"] for r in results)
+    print(f"\nUpgraded {done}/{len(targets)} routers")
+    return 0 if done == len(targets) else 1
+
+
+###################
+# main.py health
+###################
+def cmd_health(args):
+    import health
+
+    tracker = health.HealthTracker()
+    clients = get_router_clients()
+
+    if args.reset:
+        names = list(clients) if args.reset == "all" else parse_names(args.reset)
+        for name in names:
+            tracker.reset(name)
+        tracker.save()
+        print(f"Reset health of {len(names)} routers", file=sys.stderr)
+        return 0
+
+    report = Report(
+        columns=["router", "circuit", "failures", "latency-ms", "timeout",
+                 "open-until", "last-error"],
+        filters=args.filter, sort=args.sort, fmt=args.format,
+    )
+    for name, client in clients.items():
+        state = tracker.routers.get(name)
+        if not state:
+            report.add(name, [{"circuit": "closed", "failures": 0}])
+            continue
+        row = {
+            "circuit": tracker.status(name),
+            "failures": state["failures"],
+            "latency-ms": round(state["latency"] * 1000) if state["latency"] else None,
+            "timeout": tracker.connect_timeout(name, client.timeout),
+            "open-until": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(
+                state["open_until"])) if state["open_until"] else None,
+            "last-error": state["last_error"],
+        }
+        report.add(name, [{k: v for k, v in row.items() if v is not None}])
+    report.close()
+    return 0
+
+
+###################
+# main.py bench-profiles
+###################
+def _bench_profile(client, profile, command, repeat):
+    """
+    Connects a private copy of client with profile (no shared cache or
+    session) and streams command repeat times. Returns one report row.
+    """
+    bench = copy.copy(client)
+    bench.client = bench.api = None
+    bench.cache = None
+    bench.profile = profile
+    row = {"profile": profile.name, "settings": profile.describe()}
+    try:
+        bench.connect()
+        row["connect-ms"] = round(bench.connect_time * 1000)
+        timings = []
+        size = 0
+        for _ in range(repeat):
+            started = time.monotonic()
+            size = sum(len(line.encode()) + 1 for line in bench.call_iter(command))
+            timings.append(time.monotonic() - started)
+    except Exception as e:
+        row["error"] = str(e)
+        return row
+    finally:
+        bench.close()
+
+    seconds = statistics.median(timings)
+    row.update({"seconds": round(seconds, 3), "bytes": size,
+                "throughput": format_rate(size * 8 / seconds) if seconds else None})
+    return row
+
+
+def cmd_bench_profiles(args):
+    import profiles
+
+    try:
+        clients = get_router_clients(args.routers)
+        known = profiles.load_profiles()
+        selected = ([profiles.get_profile(n, known) for n in parse_names(args.profiles)]
+                    if args.profiles else list(known.values()))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    report = Report(
+        columns=["router", "profile", "connect-ms", "seconds", "bytes",
+                 "throughput", "fastest", "settings", "error"],
+        sort=args.sort, fmt=args.format,
+    )
+    # Routers and profiles one at a time, so runs do not share bandwidth
+    for name, client in clients.items():
+        if client.transport != "ssh":
+            report.add(name, [], error=f"profiles apply to SSH, not {client.transport}")
+            continue
+        print(f"{name}: {len(selected)} profiles x {args.repeat} runs", file=sys.stderr)
+        rows = [_bench_profile(client, p, args.command, args.repeat) for p in selected]
+        timed = [r for r in rows if "seconds" in r]
+        if timed:
+            min(timed, key=lambda r: r["seconds"])["fastest"] = "*"
+        report.add(name, [{k: v for k, v in r.items() if v is not None} for r in rows])
+    report.close()
+    return 0
+
+
+###################
+# main.py tasks
+###################
+def cmd_tasks(args):
+    for idx, task in TASKS.items():
+        note = " (read-only)" if task.get("read_only") else ""
+        if task.get("rows"):
+            note += " (report)"
+        print(f"{idx:>3}  {task_key(task):<24} {task['name']}{note}")
+    return 0
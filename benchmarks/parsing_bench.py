@@ -0,0 +1,59 @@
+# -----------------------------------------
+# Microbenchmark for parsing.py on large RouterOS tables
+#
+# Usage: python -m benchmarks.parsing_bench [lines]
+# -----------------------------------------
+
+import sys
+import time
+
+from parsing import parse_records, parse_as_value
+
+
+###################
+# Synthetic outputs shaped like /ip/firewall/filter and /ip/address
+###################
+def detail_lines(n):
+    yield "Flags: X - disabled, I - invalid; D - dynamic"
+    i = 0
+    while n > 0:
+        yield f" {i}   ;;; rule {i} for \"lan\" hosts"
+        yield (f"      chain=forward action=accept protocol=tcp "
+               f"src-address=10.{i % 256}.{i // 256 % 256}.0/24 dst-port=443")
+        yield (f"      in-interface=ether{i % 8} log=no "
+               f"log-prefix=\"fw {i}\" bytes={i * 1500} packets={i}")
+        yield ""
+        i += 1
+        n -= 4
+
+
+def terse_lines(n):
+    for i in range(n):
+        yield (f"{i} D address=10.0.{i % 256}.1/24 network=10.0.{i % 256}.0 "
+               f"interface=vlan{i} actual-interface=vlan{i} comment=\"site {i}\"")
+
+
+def as_value_lines(n):
+    for i in range(n):
+        yield (f".id=*{i:X};address=10.0.{i % 256}.1/24;"
+               f"interface=vlan{i};disabled=false")
+
+
+def bench(label, parser, lines, n):
+    lines = list(lines)
+    start = time.perf_counter()
+    count = sum(1 for _ in parser(iter(lines)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {n:>8} lines {count:>8} records "
+          f"{elapsed:7.3f}s {n / elapsed:>12,.0f} lines/s")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    bench("detail", parse_records, detail_lines(n), n)
+    bench("terse", parse_records, terse_lines(n), n)
+    bench("as-value", parse_as_value, as_value_lines(n), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -----------------------------------------
+# TTL result cache for read-only RouterOS commands
+# -----------------------------------------
+
+import threading
+import time
+from collections import OrderedDict
+
+from parsing import split_command
+
+
+###################
+# Command classification
+###################
+def command_key(command: str):
+    """
+    Normalizes a CLI command so "/ip address print" and "/ip/address/print"
+    share one cache entry. Returns (path, args) as a hashable tuple.
+    """
+    try:
+        path, args = split_command(command)
+    except ValueError:                      # unbalanced quotes
+        return (command.strip(),)
+    return ("/".join(path), tuple(args))
+
+
+# Menus whose print output is live state (load, uptime, sensors, clock):
+# never served from the cache
+_LIVE_MENUS = ("system/resource", "system/health", "system/clock")
+
+
+def is_read_command(command: str):
+    """
+    True for commands that do not change the router: print/get and
+    monitors. Anything else invalidates the router's cached results.
+    """
+    try:
+        path, args = split_command(command)
+    except ValueError:
+        return False
+
+    if not path or command.lstrip().startswith(":"):
+        return False
+    return path[-1] in ("print", "get", "monitor", "monitor-traffic")
+
+
+def is_cacheable(command: str):
+    """
+    True for read commands whose output can be cached: print/get of
+    configuration and tables. Monitors, live-state menus (/system resource)
+    and follow/interval prints are always run.
+    """
+    if not is_read_command(command):
+        return False
+
+    path, args = split_command(command)
+    if path[-1] not in ("print", "get"):
+        return False
+    if "/".join(path[:-1]) in _LIVE_MENUS:
+        return False
+    return not any(a in ("follow", "follow-only") or a.startswith("interval=")
+                   for a in args)
+
+
+class TTLCache:
+    """
+    Per-(router, command) result cache with a time-to-live and an LRU
+    size bound. Thread-safe; shared by all clients of the process.
+    """
+
+    def __init__(self, ttl: float = 30, maxsize: int = 512):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()          # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, router, command):
+        """
+        Returns the cached output or None when missing or expired.
+        """
+        key = (router, command_key(command))
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, router, command, value):
+        key = (router, command_key(command))
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, router):
+        """
+        Drops every cached result of one router.
+        """
+        with self._lock:
+            for key in [k for k in self._data if k[0] == router]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
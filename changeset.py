@@ -0,0 +1,133 @@
+# -----------------------------------------
+# Change-sets: many mutations, one round trip
+# -----------------------------------------
+
+import re
+import secrets
+
+from config import MT_CHANGESET_INLINE_MAX
+
+
+class ChangeSet:
+    """
+    Collects RouterOS commands and applies them as one script. Each
+    command runs inside ":do { } on-error={ }" and reports back through a
+    marker line, so one failing command does not abort the others (unless
+    stop_on_error) and every command gets its own result.
+
+    Small scripts run as a single exec; larger ones are uploaded over SFTP
+    and run with /import. Over the API the script runs via /execute.
+    """
+
+    def __init__(self, stop_on_error=False):
+        self.commands = []
+        self.stop_on_error = stop_on_error
+
+    def add(self, command):
+        self.commands.append(command.strip())
+        return self
+
+    def extend(self, commands):
+        for command in commands:
+            self.add(command)
+        return self
+
+    def __len__(self):
+        return len(self.commands)
+
+    ###################
+    # Script
+    ###################
+    def script(self, token="0"):
+        marker = f"#cs-{token}"
+        lines = ["{", ":local csfailed false"]
+        for i, command in enumerate(self.commands):
+            step = (f":do {{\n{command}\n:put \"{marker} {i} ok\"\n}} "
+                    f"on-error={{ :set csfailed true; :put \"{marker} {i} failed\" }}")
+            if self.stop_on_error:
+                step = (f":if ($csfailed) do={{ :put \"{marker} {i} skipped\" }} "
+                        f"else={{\n{step}\n}}")
+            lines.append(step)
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def _results(self, output, token):
+        """
+        Splits script output at the marker lines. Output printed by a
+        command precedes its marker and is attached to it.
+        """
+        results = [{"command": c, "status": "not run", "output": ""}
+                   for c in self.commands]
+        marker = re.compile(rf"^#cs-{token} (\d+) (ok|failed|skipped)$")
+        pending = []
+        seen = False
+        for line in output.splitlines():
+            m = marker.match(line.strip())
+            if not m:
+                pending.append(line)
+                continue
+            seen = True
+            result = results[int(m.group(1))]
+            result["status"] = m.group(2)
+            result["output"] = "\n".join(pending).strip()
+            pending = []
+
+        leftover = "\n".join(pending).strip()
+        if leftover and not seen:
+            # The script did not run at all, e.g. a syntax error
+            for result in results:
+                result["output"] = leftover
+        return results
+
+    ###################
+    # Apply
+    ###################
+    def apply(self, client, inline_max=MT_CHANGESET_INLINE_MAX):
+        """
+        Runs all commands in one round trip. Returns one
+        {"command", "status", "output"} per command, in order; status is
+        "ok", "failed", "skipped" (after an error with stop_on_error) or
+        "not run".
+        """
+        if not self.commands:
+            return []
+
+        token = secrets.token_hex(4)
+        script = self.script(token)
+
+        if client.api:
+            rows = client.api.run("/execute", script=script, **{"as-string": ""})
+            output = "\n".join(str(r.get("ret", "")) for r in rows)
+        elif len(script.encode()) <= inline_max:
+            output = client.call(script)
+        else:
+            name = f"mtops-changeset-{token}.rsc"
+            client.upload(name, script.encode())
+            output = client.call(
+                f':do {{ /import file-name={name} verbose=no }} '
+                f'on-error={{ :put "import failed" }}\n'
+                f'/file remove [find name="{name}"]'
+            )
+        return self._results(output, token)
+
+
+def summarize(results):
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+def check_results(results):
+    """
+    Returns results, or raises RuntimeError if any command did not apply.
+    """
+    failed = [r for r in results if r["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(results)} changes not applied "
+                           f"({failed[0]['command']}: {failed[0]['output'] or failed[0]['status']})")
+    return results
+
+
+def apply_commands(client, commands, stop_on_error=False):
+    return ChangeSet(stop_on_error).extend(commands).apply(client)
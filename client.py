@@ -1,21 +1,54 @@
+import codecs
+import os
+import select
+import threading
+import time
+
 import paramiko
 from paramiko import SSHException, AuthenticationException
 
+from api import ApiConnection
+from cache import is_cacheable, is_read_command
+from parsing import parse_records
+
+
+# Parsed private keys, shared by all clients: path -> (mtime, passphrase, key)
+_KEY_CACHE = {}
+_KEY_LOCK = threading.Lock()
 
-_KEY_TYPES = [
-    paramiko.Ed25519Key,
-    paramiko.RSAKey,
-    paramiko.ECDSAKey,
-]
 
+def _load_private_key(path: str, passphrase: str | None = None):
+    """
+    Loads a private key once per process. The key type is taken from the
+    file itself (PKey.from_path inspects the PEM/OpenSSH header) instead of
+    trying every key class; the parsed key is reused until the file changes.
+    """
+    path = os.path.expanduser(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as exc:
+        raise RuntimeError(f"Could not read SSH key: {path}") from exc
+
+    with _KEY_LOCK:
+        cached = _KEY_CACHE.get(path)
+        if cached and cached[:2] == (mtime, passphrase):
+            return cached[2]
 
-def _load_private_key(path: str):
-    for key_class in _KEY_TYPES:
         try:
-            return key_class.from_private_key_file(path)
-        except (SSHException, ValueError):
-            continue
-    raise RuntimeError(f"Could not load SSH key (unsupported type): {path}")
+            key = paramiko.PKey.from_path(
+                path, passphrase=passphrase.encode() if passphrase else None
+            )
+        except (SSHException, ValueError, TypeError) as exc:
+            raise RuntimeError(
+                f"Could not load SSH key ({exc}): {path}"
+            ) from exc
+
+        _KEY_CACHE[path] = (mtime, passphrase, key)
+        return key
+
+
+# Transports a client can speak: SSH CLI or the binary RouterOS API
+TRANSPORTS = ("ssh", "api", "api-ssl")
 
 
 class MikroTikClient:
@@ -26,63 +59,335 @@ class MikroTikClient:
         password: str | None = None,
         port: int = 22,
         ssh_key: str | None = None,
+        ssh_key_passphrase: str | None = None,
+        use_agent: bool = True,
         timeout: int = 10,
+        keepalive: int = 0,
+        transport: str = "ssh",
+        api_port: int | None = None,
+        cache=None,
+        profile=None,
     ):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport '{transport}' for {host}")
+
         self.host = host
         self.username = username
         self.password = password
         self.port = port
         self.ssh_key = ssh_key
-        self.timeout = timeout
+        self.ssh_key_passphrase = ssh_key_passphrase
+        self.use_agent = use_agent
+        self.timeout = timeout               # session and command reads
+        # TCP connect only; health tuning lowers it, never above timeout
+        self.connect_timeout = timeout
+        self.keepalive = keepalive
+        self.transport = transport
+        self.api_port = api_port
+        self.cache = cache
+        # TransportProfile tuning the SSH transport (None = paramiko defaults)
+        self.profile = profile
         self.client = None
+        self.api = None
+        # Seconds the last successful connect took (None until connected)
+        self.connect_time = None
 
     def connect(self):
+        started = time.monotonic()
+        self.connect_time = None
+        self._connect()
+        self.connect_time = time.monotonic() - started
+
+    def _connect(self):
+        if self.transport != "ssh":
+            self.api = ApiConnection(
+                host=self.host,
+                username=self.username,
+                password=self.password,
+                port=self.api_port,
+                use_tls=self.transport == "api-ssl",
+                timeout=self.timeout,
+                connect_timeout=self.connect_timeout,
+            )
+            self.api.connect()
+            return
+
         try:
             self.client = paramiko.SSHClient()
             self.client.set_missing_host_key_policy(
                 paramiko.AutoAddPolicy()
             )
 
+            options = dict(
+                hostname=self.host,
+                port=self.port,
+                username=self.username,
+                timeout=self.connect_timeout,
+                allow_agent=self.use_agent,
+            )
+            if self.profile:
+                options["compress"] = self.profile.compress
+                options["transport_factory"] = self.profile.transport_factory
+
             if self.ssh_key:
-                key = _load_private_key(self.ssh_key)
-                self.client.connect(
-                    hostname=self.host,
-                    port=self.port,
-                    username=self.username,
-                    pkey=key,
-                    timeout=self.timeout,
-                )
+                key = _load_private_key(self.ssh_key, self.ssh_key_passphrase)
+                self.client.connect(pkey=key, look_for_keys=False, **options)
             else:
-                self.client.connect(
-                    hostname=self.host,
-                    port=self.port,
-                    username=self.username,
-                    password=self.password,
-                    timeout=self.timeout,
-                )
+                self.client.connect(password=self.password, **options)
+
+            keepalive = self.keepalive
+            if self.profile and self.profile.keepalive is not None:
+                keepalive = self.profile.keepalive
+            if keepalive:
+                self.client.get_transport().set_keepalive(keepalive)
 
         except (SSHException, AuthenticationException) as exc:
             raise RuntimeError(
                 f"SSH connection failed to {self.host}: {exc}"
             ) from exc
 
+    def is_alive(self):
+        """
+        Health check: True if the SSH transport is open and authenticated.
+        Sends an SSH_MSG_IGNORE so a silently dropped socket is detected.
+        """
+        if self.api:
+            return self.api.is_alive()
+
+        transport = self.client.get_transport() if self.client else None
+        if not transport or not transport.is_active():
+            return False
+        if not transport.is_authenticated():
+            return False
+
+        try:
+            transport.send_ignore()
+        except (SSHException, OSError, EOFError):
+            return False
+        return True
+
     def close(self):
+        if self.api:
+            self.api.close()
+            self.api = None
         if self.client:
             self.client.close()
             self.client = None
 
-    def call(self, command: str):
+    def _exec(self, command: str):
         """
-        Execute a RouterOS CLI command over SSH.
-        Returns stdout as string.
+        Opens a new exec channel on the shared transport and starts command.
         """
         if not self.client:
             raise RuntimeError("Not connected to router")
 
-        stdin, stdout, stderr = self.client.exec_command(command)
+        transport = self.client.get_transport()
+        channel = transport.open_session(timeout=self.timeout)
+        channel.exec_command(command)
+        return channel
+
+    @staticmethod
+    def _drain(channel, chunk_size: int = 32768, timeout=None):
+        """
+        Reads stdout and stderr of a command channel together until EOF.
+        Yields raw stdout chunks as they arrive; raises RuntimeError with
+        the stderr text once the command has finished, or when no data
+        arrives for timeout seconds (None waits forever).
+        """
+        errors = []
+        while True:
+            if channel.recv_stderr_ready():
+                errors.append(channel.recv_stderr(chunk_size))
+            elif channel.recv_ready():
+                yield channel.recv(chunk_size)
+            elif channel.eof_received or channel.closed:
+                break
+            elif not select.select([channel], [], [], timeout)[0]:
+                raise RuntimeError(f"Command timed out (no output for {timeout}s)")
 
-        err = stderr.read().decode().strip()
+        err = b"".join(errors).decode(errors="replace").strip()
         if err:
             raise RuntimeError(f"Router error: {err}")
 
-        return stdout.read().decode().strip()
+    def _result(self, channel):
+        """
+        Waits for a command channel to finish and returns stdout as string.
+        """
+        try:
+            return b"".join(self._drain(channel, timeout=self.timeout)).decode().strip()
+        finally:
+            channel.close()
+
+    def upload(self, remote_path: str, data: bytes):
+        """
+        Writes data to a file on the router over SFTP (SSH only).
+        """
+        if not self.client:
+            raise RuntimeError("File upload needs an SSH connection")
+
+        sftp = self.client.open_sftp()
+        try:
+            with sftp.open(remote_path, "wb") as f:
+                f.write(data)
+        finally:
+            sftp.close()
+
+    ###################
+    # Result cache: reads are served from cache, anything else invalidates
+    ###################
+    def _cache_lookup(self, command: str, fresh: bool = False):
+        if not self.cache or not self.cache.enabled:
+            return None
+        if not is_read_command(command):
+            self.cache.invalidate(self.host)
+            return None
+        if fresh or not is_cacheable(command):
+            return None
+        return self.cache.get(self.host, command)
+
+    def _cache_store(self, command: str, output: str):
+        if not self.cache or not self.cache.enabled:
+            return
+        if is_cacheable(command):
+            self.cache.set(self.host, command, output)
+        elif not is_read_command(command):
+            self.cache.invalidate(self.host)
+
+    def call(self, command: str, fresh: bool = False):
+        """
+        Execute a RouterOS CLI command over SSH.
+        Returns stdout as string. fresh=True skips the result cache (the
+        new output still refreshes it).
+        """
+        cached = self._cache_lookup(command, fresh)
+        if cached is not None:
+            return cached
+
+        if self.api:
+            output = self.api.call(command)
+        else:
+            output = self._result(self._exec(command))
+
+        self._cache_store(command, output)
+        return output
+
+    def call_iter(self, command: str, chunk_size: int = 32768,
+                  fresh: bool = False):
+        """
+        Execute a RouterOS CLI command and yield stdout line by line.
+
+        Lines are yielded as soon as they arrive and only one chunk is held
+        in memory, so very large tables can be parsed incrementally. A
+        cached result is served unless fresh=True; streamed output is
+        never stored.
+        """
+        cached = self._cache_lookup(command, fresh)
+        if cached is not None:
+            yield from cached.splitlines()
+            return
+
+        try:
+            if self.api:
+                yield from self.api.call_lines(command)
+            else:
+                yield from self._iter_lines(command, chunk_size)
+        finally:
+            if self.cache and not is_read_command(command):
+                self.cache.invalidate(self.host)
+
+    def _iter_lines(self, command: str, chunk_size: int):
+        channel = self._exec(command)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        # A follow print stays silent until something happens; other
+        # commands fail once the router stops sending for self.timeout
+        words = command.split()
+        timeout = None if "follow" in words or "follow-only" in words else self.timeout
+        try:
+            for chunk in self._drain(channel, chunk_size, timeout):
+                pending += decoder.decode(chunk)
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    yield line.rstrip("\r")
+
+            pending += decoder.decode(b"", final=True)
+            if pending:
+                yield pending.rstrip("\r")
+        finally:
+            channel.close()
+
+    def call_many(self, commands, max_channels: int = 8, fresh: bool = False,
+                  errors: bool = False):
+        """
+        Execute several RouterOS CLI commands concurrently over SSH.
+
+        Each command gets its own exec channel on the same transport, so the
+        total latency is close to that of the slowest command. At most
+        max_channels channels are open at once. Returns the stdout strings
+        in the same order as commands. fresh=True skips the result cache.
+        errors=True returns the RuntimeError of a failed command (e.g. a
+        menu of a package that is not installed) in its place instead of
+        raising it.
+        """
+        commands = list(commands)
+        results = [self._cache_lookup(command, fresh) for command in commands]
+        pending = [i for i, r in enumerate(results) if r is None]
+
+        if self.api:
+            for i in pending:
+                try:
+                    results[i] = self.api.call(commands[i])
+                except RuntimeError as exc:
+                    if not errors:
+                        raise
+                    results[i] = exc
+                    continue
+                self._cache_store(commands[i], results[i])
+            return results
+
+        for start in range(0, len(pending), max_channels):
+            batch = pending[start:start + max_channels]
+            channels = []
+            try:
+                for i in batch:
+                    channels.append(self._exec(commands[i]))
+                for i, channel in zip(batch, channels):
+                    try:
+                        results[i] = self._result(channel)
+                    except RuntimeError as exc:
+                        if not errors:
+                            raise
+                        results[i] = exc
+                        continue
+                    self._cache_store(commands[i], results[i])
+            finally:
+                for channel in channels:
+                    channel.close()
+
+        return results
+
+    def rows(self, path: str, proplist=None, **query):
+        """
+        Yields the items of a menu (e.g. "/ip/address") as dicts.
+
+        Over the API this is a streamed print with .proplist, so only the
+        requested columns cross the wire. Over SSH the terse print output
+        is parsed and trimmed to proplist locally. Keyword arguments filter
+        on equality (where key=value); booleans match yes/no properties.
+        """
+        if self.api:
+            yield from self.api.rows(path, proplist, **query)
+            return
+
+        command = f"{path.rstrip('/')}/print terse without-paging"
+        if query:
+            command += " where " + " and ".join(
+                f"{k}={'yes' if v else 'no'}" if isinstance(v, bool) else f'{k}="{v}"'
+                for k, v in query.items()
+            )
+
+        for record in parse_records(self.call_iter(command)):
+            if proplist:
+                yield {k: record.fields[k] for k in proplist if k in record}
+            else:
+                yield dict(record.fields)
@@ -5,8 +5,9 @@ from typing import Optional, Any
 load_dotenv()
 
 
-class ConfigError(Exception):
-    """Raised when a required environment variable is missing."""
+class ConfigError(ValueError):
+    """Raised when a required environment variable is missing or the
+    router configuration is invalid."""
     pass
 
 
@@ -65,11 +66,33 @@ def get_env_bool(key: str, default: bool = False) -> bool:
     return val_str.strip().lower() in ("1", "true", "yes", "on")
 
 
+def get_router_env(
+    router: str,
+    key: str,
+    default: Optional[Any] = None
+) -> Optional[str]:
+    """
+    Fetches a per-router override, MT_ROUTER_<NAME>_<KEY>.
+
+    Args:
+        router (str): Router name as listed in MT_ROUTERS.
+        key (str): Setting name, e.g. TRANSPORT.
+        default (Optional[Any]): Value if no override is set.
+
+    Returns:
+        Optional[str]: The override or default.
+    """
+    return get_env(
+        f"MT_ROUTER_{router.upper()}_{key}", required=False, default=default
+    )
+
+
 # ─────────────────────────────
 # SSH / Authentication
 # ─────────────────────────────
 
-MT_USERNAME = get_env("MT_USERNAME")
+# Default login; inventory files may set it per router or group
+MT_USERNAME = get_env("MT_USERNAME", required=False)
 
 # Optional: password-based SSH
 MT_PASSWORD = get_env("MT_PASSWORD", required=False)
@@ -77,8 +100,30 @@ MT_PASSWORD = get_env("MT_PASSWORD", required=False)
 # Optional: key-based SSH (preferred)
 MT_SSH_KEY = get_env("MT_SSH_KEY", required=False)
 
+# Optional: passphrase for an encrypted MT_SSH_KEY
+MT_SSH_KEY_PASSPHRASE = get_env("MT_SSH_KEY_PASSPHRASE", required=False)
+
+# Offer keys held by a running ssh-agent
+MT_SSH_AGENT = get_env_bool("MT_SSH_AGENT", default=True)
+
 MT_SSH_PORT = int(get_env("MT_SSH_PORT", default=22))
 
+# Seconds between SSH keepalive packets on open sessions (0 = off)
+MT_SSH_KEEPALIVE = get_env_int("MT_SSH_KEEPALIVE", default=30)
+
+# SSH transport profile: default, lan, wan, satellite or one defined with
+# MT_PROFILE_<NAME>="compress=yes window=16MiB ..."
+# Override per router with MT_ROUTER_<NAME>_PROFILE
+MT_SSH_PROFILE = get_env("MT_SSH_PROFILE", default="default").lower()
+
+
+# Default transport: ssh (CLI), api (8728) or api-ssl (8729)
+# Override per router with MT_ROUTER_<NAME>_TRANSPORT
+MT_TRANSPORT = get_env("MT_TRANSPORT", default="ssh").lower()
+
+# Optional: non-default RouterOS API port
+MT_API_PORT = get_env("MT_API_PORT", required=False)
+
 
 # ─────────────────────────────
 # Runtime behavior
@@ -87,13 +132,60 @@ MT_SSH_PORT = int(get_env("MT_SSH_PORT", default=22))
 DRY_RUN = get_env("DRY_RUN", default="true").lower() == "true"
 LOG_LEVEL = get_env("LOG_LEVEL", default="INFO")
 
+# Max routers handled concurrently for read-only tasks (1 = sequential)
+MT_MAX_WORKERS = get_env_int("MT_MAX_WORKERS", default=10)
+
+# Seconds read-only command results are cached per router (0 = off)
+MT_CACHE_TTL = get_env_int("MT_CACHE_TTL", default=30)
+
+# Max cached (router, command) results
+MT_CACHE_SIZE = get_env_int("MT_CACHE_SIZE", default=512)
+
+# Keep SSH sessions open between menu tasks
+MT_SESSION_POOL = get_env_bool("MT_SESSION_POOL", default=True)
+
+# Close pooled sessions after this many idle seconds
+MT_POOL_IDLE_TIMEOUT = get_env_int("MT_POOL_IDLE_TIMEOUT", default=300)
+
+# Traffic samples kept per interface by "main.py traffic"
+MT_TRAFFIC_HISTORY = get_env_int("MT_TRAFFIC_HISTORY", default=900)
+
+# "main.py serve": Prometheus endpoint and collection interval (seconds)
+MT_EXPORTER_LISTEN = get_env("MT_EXPORTER_LISTEN", default="127.0.0.1:9436")
+MT_EXPORTER_INTERVAL = get_env_int("MT_EXPORTER_INTERVAL", default=60)
+
+# TCP pre-scan before connecting: routers whose port does not answer
+# within this many milliseconds are skipped (0 = off)
+MT_PRESCAN_TIMEOUT_MS = get_env_int("MT_PRESCAN_TIMEOUT_MS", default=1500)
+
+# Circuit breaker: skip a router after this many consecutive connect
+# failures (0 = off), for BACKOFF seconds, doubling up to BACKOFF_MAX
+MT_BREAKER_THRESHOLD = get_env_int("MT_BREAKER_THRESHOLD", default=3)
+MT_BREAKER_BACKOFF = get_env_int("MT_BREAKER_BACKOFF", default=60)
+MT_BREAKER_BACKOFF_MAX = get_env_int("MT_BREAKER_BACKOFF_MAX", default=3600)
+
+# Change-set scripts up to this many bytes run as one exec; larger ones
+# are uploaded over SFTP and /import'ed
+MT_CHANGESET_INLINE_MAX = get_env_int("MT_CHANGESET_INLINE_MAX", default=8192)
+
+# Local state (log cursors, metrics, ...)
+MT_STATE_DIR = os.path.expanduser(
+    get_env("MT_STATE_DIR", default="~/.mikrotik-ops")
+)
+
 
 # ─────────────────────────────
 # Router inventory
 # ─────────────────────────────
 
+# Inventory file (.toml, .yaml/.yml or .csv) with per-router settings and
+# tags, see inventory.py. Without it routers come from MT_ROUTERS.
+MT_INVENTORY = get_env("MT_INVENTORY", required=False)
+
 ROUTER_NAMES = [
-    r.strip() for r in get_env("MT_ROUTERS").split(",")
+    r.strip()
+    for r in get_env("MT_ROUTERS", required=not MT_INVENTORY, default="").split(",")
+    if r.strip()
 ]
 
 ROUTERS = {}
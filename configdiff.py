@@ -0,0 +1,235 @@
+# -----------------------------------------
+# Section-aware diff of RouterOS /export output
+# -----------------------------------------
+
+import re
+
+from parsing import parse_fields
+
+
+# Menus whose items have no name but a natural identity
+_NATURAL_KEYS = {
+    "/interface bridge port": ("bridge", "interface"),
+    "/interface bridge vlan": ("bridge", "vlan-ids"),
+    "/interface list member": ("list", "interface"),
+    "/ip address": ("address", "interface"),
+    "/ipv6 address": ("address", "interface"),
+    "/ip firewall address-list": ("list", "address"),
+    "/ipv6 firewall address-list": ("list", "address"),
+    "/ip dhcp-server lease": ("mac-address", "server"),
+    "/ip dhcp-server network": ("address",),
+    "/ip dhcp-client": ("interface",),
+    "/ip dns static": ("name", "type"),
+    "/ip route": ("dst-address", "gateway", "routing-table"),
+    "/ipv6 route": ("dst-address", "gateway", "routing-table"),
+    "/ip service": ("name",),
+    "/interface wireguard peers": ("public-key",),
+    "/user": ("name",),
+}
+
+# Menus where item order is significant
+_ORDERED = ("/ip firewall", "/ipv6 firewall", "/routing filter")
+
+_FIND = re.compile(r"^\[\s*find\s*(.*?)\s*\]\s*")
+_MENU_WORD = re.compile(r"^[a-z0-9][a-z0-9\-]*$")
+_VERBS = ("add", "set", "remove")
+
+
+###################
+# Parse: {menu path: {key: fields}}
+###################
+def _joined_lines(lines):
+    """
+    Joins export lines wrapped with a trailing backslash.
+    """
+    pending = ""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if pending:
+            # Continuations are indented by four spaces
+            line = pending + (line[4:] if line.startswith("    ") else line.lstrip())
+        if line.endswith("\\"):
+            pending = line[:-1]
+            continue
+        pending = ""
+        yield line
+    if pending:
+        yield pending
+
+
+def _content_key(fields):
+    return " ".join(f"{k}={v}" for k, v in sorted(fields.items()))
+
+
+def _identity(menu, fields):
+    if fields.get("name"):
+        return f"name={fields['name']}"
+
+    natural = _NATURAL_KEYS.get(menu)
+    if natural and any(fields.get(k) for k in natural):
+        return " ".join(f"{k}={fields.get(k, '')}" for k in natural)
+
+    if fields.get("comment"):
+        return f"comment={fields['comment']}"
+
+    # No identity: key by content
+    return _content_key(fields)
+
+
+def _item_key(menu, verb, selector, fields, seen):
+    if selector is not None:
+        return f"[find {selector}]" if selector else "[find]"
+    if verb == "set":
+        return "set"
+
+    # Items sharing a key (two rules with one comment, two routes that
+    # differ only in distance) are numbered in order, never merged
+    key = _identity(menu, fields)
+    seen[key] = seen.get(key, 0) + 1
+    return key if seen[key] == 1 else f"{key} #{seen[key]}"
+
+
+def parse_export(lines):
+    """
+    Indexes an export by menu path, then by a stable item key: the find
+    selector of "set [ find ... ]", name=, a per-menu natural key (e.g.
+    list+address), comment= or, failing all that, the item's content.
+    Repeated keys are numbered ("comment=mgmt #2").
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    sections = {}
+    menu = None
+    items = None
+    seen = {}
+
+    for line in _joined_lines(lines):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        if stripped.startswith("/"):
+            # "/ip firewall filter" or inline "/system identity set name=x"
+            words = stripped.split(" ")
+            path = []
+            for i, word in enumerate(words):
+                if i and (word in _VERBS or not _MENU_WORD.match(word)):
+                    break
+                path.append(word)
+            menu = " ".join(path)
+            items = sections.setdefault(menu, {})
+            seen = {}
+            stripped = " ".join(words[len(path):])
+            if not stripped:
+                continue
+
+        if items is None:
+            continue
+
+        verb, _, rest = stripped.partition(" ")
+        if verb == "remove":
+            items[f"remove {rest.strip()}"] = {}
+            continue
+
+        selector = None
+        m = _FIND.match(rest)
+        if m:
+            selector = m.group(1)
+            rest = rest[m.end():]
+
+        fields = parse_fields(rest)
+        key = _item_key(menu, verb, selector, fields, seen)
+
+        if verb == "set":
+            # Repeated "set" lines on one item accumulate
+            items.setdefault(key, {}).update(fields)
+        else:
+            items[key] = fields
+
+    return sections
+
+
+###################
+# Diff
+###################
+def diff_exports(old, new, ignore=()):
+    """
+    Compares two parse_export() results. Returns {menu: [change]} where a
+    change is ("+", key, fields), ("-", key, fields) or
+    ("~", key, {field: (old, new)}). Reordered firewall rules show up as
+    a "(order)" change.
+    """
+    changes = {}
+    for menu in sorted(set(old) | set(new)):
+        if any(menu.startswith(prefix) for prefix in ignore):
+            continue
+
+        before = old.get(menu, {})
+        after = new.get(menu, {})
+        section = []
+
+        for key, fields in before.items():
+            if key not in after:
+                section.append(("-", key, fields))
+                continue
+            other = after[key]
+            if other != fields:
+                delta = {
+                    f: (fields.get(f), other.get(f))
+                    for f in sorted(set(fields) | set(other))
+                    if fields.get(f) != other.get(f)
+                }
+                section.append(("~", key, delta))
+
+        for key, fields in after.items():
+            if key not in before:
+                section.append(("+", key, fields))
+
+        if menu.startswith(_ORDERED):
+            kept = [k for k in before if k in after]
+            kept_after = [k for k in after if k in before]
+            moved = sum(a != b for a, b in zip(kept, kept_after))
+            if moved:
+                section.append(("~", "(order)", {"moved": moved}))
+
+        if section:
+            changes[menu] = section
+    return changes
+
+
+def summarize(changes):
+    counts = {"+": 0, "-": 0, "~": 0}
+    for section in changes.values():
+        for op, _, _ in section:
+            counts[op] += 1
+    return counts
+
+
+def _format_fields(fields):
+    return " ".join(
+        f'{k}="{v}"' if (" " in v or not v) else f"{k}={v}"
+        for k, v in fields.items()
+    )
+
+
+def format_diff(changes):
+    """
+    Text rendering, one block per menu path.
+    """
+    lines = []
+    for menu, section in changes.items():
+        lines.append(menu)
+        for op, key, data in section:
+            if key == "(order)":
+                lines.append(f"  ~ rule order changed ({data['moved']} moved)")
+            elif op == "~":
+                lines.append(f"  ~ {key}")
+                for field, (before, after) in data.items():
+                    lines.append(f"      {field}: {before} -> {after}")
+            else:
+                lines.append(f"  {op} {key}")
+                # Content-keyed items already show all their fields
+                if data and not key.startswith(_content_key(data)):
+                    lines.append(f"      {_format_fields(data)}")
+    return "\n".join(lines)
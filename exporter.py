@@ -0,0 +1,263 @@
+# -----------------------------------------
+# Prometheus exporter: background collection, cached scrape snapshot
+# -----------------------------------------
+
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import normalize
+from pool import SessionPool
+from runner import run_on_routers
+from tasks.misc1_2 import rows_system_info
+from tasks.misc13_23 import rows_interface_traffic, rows_queue_status, rows_vpn_status
+from units import to_number
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_UNSAFE = re.compile(r"[^a-zA-Z0-9_]")
+
+# Metric name -> (type, help) for everything not generated from a field name
+_HELP = {
+    "mikrotik_up": ("gauge", "1 if the last collection from the router succeeded"),
+    "mikrotik_collect_duration_seconds": ("gauge", "Time the last collection took"),
+    "mikrotik_last_collect_timestamp_seconds": ("gauge", "When the router was last collected"),
+    "mikrotik_collector_success": ("gauge", "1 if a collector section succeeded"),
+    "mikrotik_system_info": ("gauge", "Router identity, version and board"),
+    "mikrotik_interface_rx_bits_per_second": ("gauge", "Interface receive rate"),
+    "mikrotik_interface_tx_bits_per_second": ("gauge", "Interface transmit rate"),
+    "mikrotik_interface_rx_packets_per_second": ("gauge", "Interface receive packet rate"),
+    "mikrotik_interface_tx_packets_per_second": ("gauge", "Interface transmit packet rate"),
+    "mikrotik_queue_rate_bits_per_second": ("gauge", "Simple queue rate by direction"),
+    "mikrotik_queue_bytes_total": ("counter", "Simple queue bytes by direction"),
+    "mikrotik_queue_packets_total": ("counter", "Simple queue packets by direction"),
+    "mikrotik_queue_dropped_total": ("counter", "Simple queue drops by direction"),
+    "mikrotik_vpn_running": ("gauge", "1 if a VPN interface or peer is running/established"),
+    "mikrotik_vpn_rx_bytes_total": ("counter", "VPN bytes received"),
+    "mikrotik_vpn_tx_bytes_total": ("counter", "VPN bytes sent"),
+}
+
+
+def metric_name(*parts):
+    return "_".join(_UNSAFE.sub("_", p) for p in parts if p).lower()
+
+
+###################
+# Collectors: router data -> (name, labels, value) samples
+###################
+def _collect_system(client, name):
+    row = rows_system_info(client, name)[0]
+    yield "mikrotik_system_info", {
+        "identity": row.get("identity", ""),
+        "version": row.get("version", ""),
+        "board": row.get("board-name", ""),
+    }, 1
+    for key, value in normalize(row).items():
+        yield metric_name("mikrotik_system", key), {}, value
+
+
+def _collect_interfaces(client, name):
+    for row in rows_interface_traffic(client, name):
+        for key in ("rx-bits-per-second", "tx-bits-per-second",
+                    "rx-packets-per-second", "tx-packets-per-second"):
+            value = to_number(row.get(key))
+            if value is not None:
+                yield metric_name("mikrotik_interface", key), \
+                    {"interface": row["name"]}, value
+
+
+def _directions(value):
+    """
+    Simple queue counters are "upload/download" pairs.
+    """
+    up, _, down = str(value or "").partition("/")
+    return (("upload", to_number(up)), ("download", to_number(down)))
+
+
+def _collect_queues(client, name):
+    for row in rows_queue_status(client, name):
+        for key, metric in (("rate", "mikrotik_queue_rate_bits_per_second"),
+                            ("bytes", "mikrotik_queue_bytes_total"),
+                            ("packets", "mikrotik_queue_packets_total"),
+                            ("dropped", "mikrotik_queue_dropped_total")):
+            for direction, value in _directions(row.get(key)):
+                if value is not None:
+                    yield metric, {"queue": row["name"],
+                                   "direction": direction}, value
+
+
+def _collect_vpn(client, name):
+    for row in rows_vpn_status(client, name):
+        labels = {"type": row["type"], "name": row["name"]}
+        running = "R" in row["flags"] or row.get("state") == "established"
+        yield "mikrotik_vpn_running", labels, int(running)
+        for key in ("rx-bytes", "tx-bytes"):
+            value = to_number(row.get(key))
+            if value is not None:
+                yield metric_name("mikrotik_vpn", key, "total"), labels, value
+
+
+COLLECTORS = {
+    "system": _collect_system,
+    "interface": _collect_interfaces,
+    "queue": _collect_queues,
+    "vpn": _collect_vpn,
+}
+
+
+def collect_router(client, name, collectors=COLLECTORS):
+    """
+    Runs every collector on one router. A failing section is reported via
+    mikrotik_collector_success instead of failing the whole router.
+    """
+    samples = []
+    for section, collect in collectors.items():
+        try:
+            samples.extend(collect(client, name))
+            ok = 1
+        except Exception as e:
+            print(f"{name}: {section} collector failed: {e}", file=sys.stderr)
+            ok = 0
+        samples.append(("mikrotik_collector_success",
+                        {"collector": section}, ok))
+    return samples
+
+
+###################
+# Prometheus text format
+###################
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(samples_by_router):
+    """
+    Renders {router: [(name, labels, value)]} as Prometheus text, each
+    metric family grouped under one HELP/TYPE header.
+    """
+    families = {}
+    for router, samples in sorted(samples_by_router.items()):
+        for name, labels, value in samples:
+            labels = {"router": router, **labels}
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            families.setdefault(name, []).append(f"{name}{{{label_text}}} {_format_value(value)}")
+
+    lines = []
+    for name, samples in sorted(families.items()):
+        kind, text = _HELP.get(name, ("gauge", name.replace("_", " ")))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return ("\n".join(lines) + "\n").encode()
+
+
+###################
+# Background collector
+###################
+class Exporter:
+    """
+    Collects all routers every interval seconds with at most max_workers
+    concurrent sessions and keeps the rendered snapshot. Scrapes only read
+    the snapshot; they never talk to routers.
+    """
+
+    def __init__(self, clients, interval=60, max_workers=10, idle_timeout=300):
+        # Every poll must see live counters, never a result cached by an
+        # earlier poll inside the TTL
+        for client in clients.values():
+            client.cache = None
+        self.clients = clients
+        self.interval = interval
+        self.max_workers = max_workers
+        self.pool = SessionPool(lambda names=None: clients,
+                                idle_timeout=max(idle_timeout, interval * 2))
+        self._samples = {}
+        self._snapshot = render({})
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def snapshot(self):
+        return self._snapshot
+
+    def _store(self, result):
+        router = result["router"]
+        samples = list(result["data"] or []) if result["ok"] else []
+        samples += [
+            ("mikrotik_up", {}, int(result["ok"])),
+            ("mikrotik_collect_duration_seconds", {}, round(result["elapsed"], 3)),
+            ("mikrotik_last_collect_timestamp_seconds", {}, int(time.time())),
+        ]
+        if not result["ok"]:
+            print(f"{router}: {result['error']}", file=sys.stderr)
+
+        with self._lock:
+            self._samples[router] = samples
+            self._snapshot = render(self._samples)
+
+    def collect_once(self):
+        run_on_routers(
+            {"func": collect_router}, self.clients,
+            max_workers=self.max_workers, on_result=self._store,
+            pool=self.pool, capture=True,
+        )
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.collect_once()
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        self.pool.start_reaper()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.pool.close_all()
+
+
+###################
+# HTTP endpoint
+###################
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body = self.server.exporter.snapshot()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+        elif self.path == "/":
+            body = b'<a href="/metrics">metrics</a>\n'
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+        else:
+            body = b"not found\n"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass                                # scrapes are too frequent to log
+
+
+def serve(exporter, host="127.0.0.1", port=9436):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.exporter = exporter
+    exporter.start()
+    print(f"Serving metrics on http://{host}:{port}/metrics", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        exporter.stop()
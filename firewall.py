@@ -0,0 +1,338 @@
+# -----------------------------------------
+# Firewall rule analysis: hit counters, zero-hit and shadowed rules
+# -----------------------------------------
+
+import ipaddress
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from parsing import is_yes, parse_records
+from units import to_number
+
+
+TABLES = ("filter", "nat", "mangle", "raw")
+
+# Actions that end processing of the chain for a matching packet
+# (mark actions too, when passthrough=no)
+TERMINAL_ACTIONS = frozenset({
+    "accept", "drop", "reject", "tarpit", "return", "src-nat", "dst-nat",
+    "masquerade", "redirect", "netmap", "same",
+})
+
+# Rule properties that are not match conditions
+_NOT_MATCHERS = frozenset({
+    "chain", "action", "comment", "disabled", "dynamic", "invalid", "log",
+    "log-prefix", "bytes", "packets", "jump-target", "reject-with",
+    "address-list", "address-list-timeout", "to-addresses", "to-ports",
+    "new-connection-mark", "new-packet-mark", "new-routing-mark",
+    "new-dscp", "new-mss", "new-ttl", "new-priority", "passthrough",
+    "place-before", "route-dst", "sniff-id", "sniff-target",
+    "sniff-target-port", "hw-offload",
+})
+
+_ADDRESS_MATCHERS = frozenset({"src-address", "dst-address"})
+_PORT_MATCHERS = frozenset({"src-port", "dst-port", "port"})
+_RANGE_MATCHERS = _ADDRESS_MATCHERS | _PORT_MATCHERS
+# Comma lists where a packet matches if any item does
+_SET_MATCHERS = frozenset({"connection-state", "connection-nat-state",
+                           "tcp-flags", "icmp-options"})
+
+
+@dataclass(slots=True)
+class Rule:
+    """
+    One firewall rule with its counters. position is the print number
+    (order within the table), matchers the rule's match conditions.
+    """
+    position: int
+    id: str
+    chain: str
+    action: str
+    comment: str = ""
+    disabled: bool = False
+    dynamic: bool = False
+    packets: int = 0
+    bytes: int = 0
+    passthrough: bool = True
+    matchers: dict = field(default_factory=dict)
+
+    @property
+    def active(self):
+        return not self.disabled and not self.dynamic
+
+    @property
+    def terminal(self):
+        return self.action in TERMINAL_ACTIONS or (
+            self.action.startswith("mark-") and not self.passthrough)
+
+    def describe(self):
+        conditions = " ".join(f"{k}={v}" for k, v in self.matchers.items())
+        return f"chain={self.chain} action={self.action} {conditions}".rstrip()
+
+
+def _rule(position, rule_id, flags, fields):
+    return Rule(
+        position=position,
+        id=rule_id,
+        chain=fields.get("chain", ""),
+        action=fields.get("action", "accept"),
+        comment=fields.get("comment", ""),
+        disabled="X" in flags or is_yes(fields.get("disabled")),
+        dynamic="D" in flags or is_yes(fields.get("dynamic")),
+        packets=int(to_number(fields.get("packets")) or 0),
+        bytes=int(to_number(fields.get("bytes")) or 0),
+        passthrough=fields.get("passthrough", "yes") != "no",
+        matchers={k: v for k, v in fields.items() if k not in _NOT_MATCHERS},
+    )
+
+
+def _api_value(value):
+    if value is True:
+        return "yes"
+    if value is False:
+        return "no"
+    return str(value)
+
+
+###################
+# Fetch rules with counters
+###################
+def fetch_rules(client, table="filter"):
+    """
+    Returns the rules of /ip/firewall/<table> in order, with packet and
+    byte counters. Over SSH the rule and the stats prints run on parallel
+    channels and are joined on .id.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown firewall table: {table}")
+    path = f"/ip/firewall/{table}"
+
+    if client.api:
+        return [
+            _rule(i, row.get(".id", ""), "",
+                  {k: _api_value(v) for k, v in row.items() if k != ".id"})
+            for i, row in enumerate(client.api.stream(f"{path}/print", "=stats="))
+        ]
+
+    detail, stats = client.call_many([
+        f"{path}/print terse show-ids without-paging",
+        f"{path}/print stats terse show-ids without-paging",
+    ])
+    counters = {
+        r.index: (r.get("packets"), r.get("bytes"))
+        for r in parse_records(stats)
+    }
+
+    rules = []
+    for i, r in enumerate(parse_records(detail)):
+        fields = dict(r.fields)
+        fields["packets"], fields["bytes"] = counters.get(r.index, (None, None))
+        if r.comment:
+            fields["comment"] = r.comment
+        rules.append(_rule(i, r.index, r.flags, fields))
+    return rules
+
+
+###################
+# Match condition containment
+###################
+def _network(value):
+    try:
+        if "-" in value:
+            first, last = (ipaddress.ip_address(v) for v in value.split("-", 1))
+            return int(first), int(last)
+        net = ipaddress.ip_network(value, strict=False)
+        return int(net.network_address), int(net.broadcast_address)
+    except ValueError:
+        return None
+
+
+def _ports(value):
+    ranges = []
+    for part in value.split(","):
+        low, _, high = part.partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            return None                     # service names etc.
+        ranges.append((int(low), int(high or low)))
+    return ranges
+
+
+def _compile(key, value):
+    """
+    Pre-parses a matcher value into something containment can be checked
+    on cheaply; falls back to the plain string.
+    """
+    if value.startswith("!"):
+        return value
+    if key in _ADDRESS_MATCHERS:
+        return _network(value) or value
+    if key in _PORT_MATCHERS:
+        return _ports(value) or value
+    if key in _SET_MATCHERS:
+        return frozenset(value.split(","))
+    return value
+
+
+def _covers(broad, narrow):
+    """
+    True if every packet matching narrow also matches broad.
+    """
+    if broad == narrow:
+        return True
+    if type(broad) is not type(narrow) or isinstance(broad, str):
+        return False
+    if isinstance(broad, tuple):            # address range
+        return broad[0] <= narrow[0] and narrow[1] <= broad[1]
+    if isinstance(broad, frozenset):
+        return narrow <= broad
+    return all(any(lo <= n_lo and n_hi <= hi for lo, hi in broad)
+               for n_lo, n_hi in narrow)
+
+
+###################
+# Shadowed rule detection
+###################
+# Bounds that never rule a candidate out; the exact check decides
+_ANY = (-1, 2 ** 62)
+
+
+def _bounds(value):
+    """
+    (low, high) hull of an address or port matcher, or None.
+    """
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, list):
+        return min(lo for lo, _ in value), max(hi for _, hi in value)
+    return None
+
+
+class _Candidates:
+    """
+    Earlier terminal rules of one chain with the same condition keys and
+    the same values for plain (exact-match) conditions. Address and port
+    bounds are kept in a numpy array, so one vectorized comparison rules
+    out most candidates before the exact per-field check.
+    """
+
+    def __init__(self, range_keys):
+        self.range_keys = range_keys
+        self.entries = []                   # (compiled, rule)
+        self.bounds = np.empty((16, len(range_keys), 2), dtype=np.int64)
+
+    def add(self, compiled, rule):
+        n = len(self.entries)
+        if n == len(self.bounds):
+            self.bounds = np.concatenate([self.bounds, np.empty_like(self.bounds)])
+        for j, key in enumerate(self.range_keys):
+            value = compiled[key]
+            # Only a single range is a necessary condition for containment
+            single = isinstance(value, tuple) or (
+                isinstance(value, list) and len(value) == 1)
+            self.bounds[n, j] = _bounds(value) if single else _ANY
+        self.entries.append((compiled, rule))
+
+    def first_covering(self, compiled):
+        n = len(self.entries)
+        indices = range(n)
+        if self.range_keys:
+            mask = np.ones(n, dtype=bool)
+            for j, key in enumerate(self.range_keys):
+                hull = _bounds(compiled[key])
+                if hull:
+                    column = self.bounds[:n, j]
+                    mask &= (column[:, 0] <= hull[0]) & (hull[1] <= column[:, 1])
+            indices = np.flatnonzero(mask)
+
+        for i in indices:
+            other, rule = self.entries[i]
+            if all(_covers(value, compiled[k]) for k, value in other.items()):
+                return rule
+        return None
+
+
+def find_shadowed(rules):
+    """
+    Returns [(rule, shadowing rule)] for active rules that can never match
+    because an earlier active rule in the same chain with a terminal action
+    matches every packet they would: its conditions are a subset of theirs,
+    each one at least as broad.
+    """
+    shadowed = []
+    # chain -> condition keys -> exact-match values -> _Candidates
+    earlier = {}
+
+    for rule in rules:
+        if not rule.active:
+            continue
+        compiled = {k: _compile(k, v) for k, v in rule.matchers.items()}
+        keys = frozenset(compiled)
+        by_keys = earlier.setdefault(rule.chain, {})
+
+        found = None
+        for other_keys, (exact_keys, buckets) in by_keys.items():
+            if not other_keys <= keys:
+                continue
+            bucket = buckets.get(tuple(rule.matchers[k] for k in exact_keys))
+            match = bucket.first_covering(compiled) if bucket else None
+            if match and (found is None or match.position < found.position):
+                found = match
+        if found:
+            shadowed.append((rule, found))
+
+        if rule.terminal:
+            if keys not in by_keys:
+                by_keys[keys] = (sorted(keys - _RANGE_MATCHERS - _SET_MATCHERS), {})
+            exact_keys, buckets = by_keys[keys]
+            exact = tuple(rule.matchers[k] for k in exact_keys)
+            if exact not in buckets:
+                buckets[exact] = _Candidates(sorted(keys & _RANGE_MATCHERS))
+            buckets[exact].add(compiled, rule)
+    return shadowed
+
+
+###################
+# Analysis
+###################
+def analyze(rules, top=10):
+    """
+    Summarizes one table: the top hottest rules by packets (with their
+    share of the chain's packets), enabled rules that never matched, and
+    shadowed rules.
+    """
+    chain_packets = {}
+    for rule in rules:
+        chain_packets[rule.chain] = chain_packets.get(rule.chain, 0) + rule.packets
+
+    active = [r for r in rules if r.active]
+    hot = sorted((r for r in active if r.packets),
+                 key=lambda r: r.packets, reverse=True)[:top]
+    return {
+        "rules": len(rules),
+        "chain_packets": chain_packets,
+        "hot": hot,
+        "zero": [r for r in active if not r.packets],
+        "shadowed": find_shadowed(rules),
+    }
+
+
+def analysis_rows(analysis):
+    """
+    Flattens analyze() output into report rows, one per finding.
+    """
+    def _row(finding, rule, detail=""):
+        total = analysis["chain_packets"].get(rule.chain) or 0
+        return {
+            "finding": finding, "chain": rule.chain, "position": rule.position,
+            "action": rule.action, "packets": rule.packets,
+            "bytes": rule.bytes,
+            "share": round(100 * rule.packets / total, 1) if total else 0.0,
+            "detail": detail or rule.comment or rule.describe(),
+        }
+
+    rows = [_row("hot", r) for r in analysis["hot"]]
+    rows += [_row("shadowed", r, f"by #{by.position}: {by.describe()}")
+             for r, by in analysis["shadowed"]]
+    rows += [_row("zero-hit", r) for r in analysis["zero"]]
+    return rows
@@ -0,0 +1,172 @@
+# -----------------------------------------
+# Per-router health: circuit breaker, connect latency, tuned timeouts
+# -----------------------------------------
+
+import json
+import os
+import threading
+import time
+
+from config import (
+    MT_STATE_DIR,
+    MT_BREAKER_THRESHOLD,
+    MT_BREAKER_BACKOFF,
+    MT_BREAKER_BACKOFF_MAX,
+)
+
+
+HEALTH_PATH = os.path.join(MT_STATE_DIR, "health.json")
+
+# Weight of the newest connect latency in the moving average
+_EWMA_ALPHA = 0.3
+
+# Connect timeout = average latency * factor + slack, within bounds
+_TIMEOUT_FACTOR = 5
+_TIMEOUT_SLACK = 1.0
+_TIMEOUT_MIN = 2.0
+_MIN_SAMPLES = 3
+
+
+def _new_state():
+    return {"failures": 0, "trips": 0, "open_until": 0, "latency": None,
+            "samples": 0, "last_error": None, "last_ok": None}
+
+
+class HealthTracker:
+    """
+    Remembers per router, across runs, the consecutive connect failures
+    and an average connect latency.
+
+    After threshold consecutive failures the circuit opens and the router
+    is skipped for backoff seconds, doubling with every trip up to
+    max_backoff. Once that has passed one attempt is let through
+    (half-open). Success closes the circuit, failure opens it again for
+    longer.
+    """
+
+    def __init__(self, path=None, threshold=MT_BREAKER_THRESHOLD,
+                 backoff=MT_BREAKER_BACKOFF, max_backoff=MT_BREAKER_BACKOFF_MAX):
+        self.path = path or HEALTH_PATH
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.routers = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.routers = json.load(f)
+        except (OSError, ValueError):
+            self.routers = {}
+
+    def save(self):
+        """
+        Writes the routers changed by this process over the file's current
+        content, so concurrent runs on other routers are not lost.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                with open(self.path) as f:
+                    merged = json.load(f)
+            except (OSError, ValueError):
+                merged = {}
+            merged.update({name: self.routers[name] for name in self._dirty})
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(merged, f, indent=1)
+            os.replace(tmp, self.path)
+            self._dirty.clear()
+
+    def _state(self, name):
+        self._dirty.add(name)
+        return self.routers.setdefault(name, _new_state())
+
+    ###################
+    # Breaker
+    ###################
+    def status(self, name):
+        state = self.routers.get(name)
+        if not state or not state["open_until"]:
+            return "closed"
+        return "open" if time.time() < state["open_until"] else "half-open"
+
+    def allow(self, name):
+        """
+        Returns (allowed, reason). Routers with an open circuit are not
+        allowed until their backoff has passed.
+        """
+        if self.status(name) != "open":
+            return True, None
+        state = self.routers[name]
+        until = time.strftime("%H:%M:%S", time.localtime(state["open_until"]))
+        return False, (f"circuit open until {until} after "
+                       f"{state['failures']} failures: {state['last_error']}")
+
+    def record_success(self, name, latency=None):
+        with self._lock:
+            state = self._state(name)
+            state.update(failures=0, trips=0, open_until=0, last_ok=time.time())
+            if latency is not None:
+                previous = state["latency"]
+                state["latency"] = round(latency if previous is None else
+                                         _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * previous, 4)
+                state["samples"] += 1
+
+    def record_failure(self, name, error):
+        with self._lock:
+            state = self._state(name)
+            state["failures"] += 1
+            state["last_error"] = str(error)[:200]
+            if self.threshold and state["failures"] >= self.threshold:
+                # Every trip (including a failed half-open probe) doubles
+                state["trips"] += 1
+                delay = min(self.backoff * 2 ** (state["trips"] - 1), self.max_backoff)
+                state["open_until"] = time.time() + delay
+
+    def reset(self, name):
+        with self._lock:
+            self._dirty.add(name)
+            self.routers[name] = _new_state()
+
+    ###################
+    # Timeouts
+    ###################
+    def connect_timeout(self, name, ceiling):
+        """
+        A connect timeout fitted to the router's measured latency, never
+        above ceiling. Routers without enough history, or currently
+        failing, keep the ceiling.
+        """
+        state = self.routers.get(name)
+        if not state or state["failures"] or state["samples"] < _MIN_SAMPLES:
+            return ceiling
+        tuned = state["latency"] * _TIMEOUT_FACTOR + _TIMEOUT_SLACK
+        return round(min(ceiling, max(_TIMEOUT_MIN, tuned)), 1)
+
+
+###################
+# Process-wide tracker used by the runner
+###################
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker():
+    """
+    The shared tracker, or None when the breaker is disabled
+    (MT_BREAKER_THRESHOLD=0).
+    """
+    global _tracker
+    if not MT_BREAKER_THRESHOLD:
+        return None
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = HealthTracker()
+        return _tracker
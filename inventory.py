@@ -0,0 +1,368 @@
+# -----------------------------------------
+# Router inventory: TOML/YAML/CSV files, tags, selection expressions
+# -----------------------------------------
+
+import csv
+import fnmatch
+import ipaddress
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+try:
+    import tomllib
+except ImportError:                         # Python < 3.11
+    import toml as tomllib
+
+try:
+    import yaml
+except ImportError:                         # only needed for YAML inventories
+    yaml = None
+
+from config import (
+    MT_INVENTORY,
+    ROUTERS,
+    ConfigError,
+    get_router_env,
+)
+
+
+# Connection settings a router entry may carry; anything else (site,
+# role, rack, ...) is kept as a free-form attribute for selection
+FIELDS = ("host", "username", "password", "password_env", "port",
+          "transport", "api_port", "ssh_key", "ssh_key_passphrase", "profile")
+_INT_FIELDS = ("port", "api_port")
+# Never usable in selection expressions (they would leak through matches)
+_SECRET_FIELDS = ("password", "password_env", "ssh_key_passphrase")
+SELECTABLE = tuple(f for f in FIELDS if f not in _SECRET_FIELDS)
+
+_KEY = re.compile(r"^[a-z_][\w-]*$")
+_GLOB_CHARS = "*?["
+
+
+@dataclass(slots=True)
+class Router:
+    name: str
+    host: str
+    username: str = None
+    password: str = None
+    password_env: str = None
+    port: int = None
+    transport: str = None
+    api_port: int = None
+    ssh_key: str = None
+    ssh_key_passphrase: str = None
+    profile: str = None
+    tags: tuple = ()
+    attrs: dict = field(default_factory=dict)
+
+    def value(self, key):
+        """
+        The selectable value of key: a connection field or an attribute.
+        Secrets are never selectable.
+        """
+        if key in _SECRET_FIELDS:
+            return None
+        if key in SELECTABLE:
+            value = getattr(self, key)
+            return None if value is None else str(value)
+        return self.attrs.get(key)
+
+    def secret(self):
+        """
+        The password, read from the environment when given as password_env.
+        """
+        if self.password_env:
+            return os.environ.get(self.password_env)
+        return self.password
+
+
+def _make_router(name, entry, defaults, groups, source):
+    """
+    Merges [defaults], then the settings of every group named by one of
+    the router's tags (in tag order), then the entry itself.
+    """
+    tags = entry.get("tags") or ()
+    if isinstance(tags, str):
+        tags = tags.replace(";", " ").replace(",", " ").split()
+    tags = tuple(str(t).lower() for t in tags)
+
+    merged = dict(defaults)
+    for tag in tags:
+        merged.update(groups.get(tag, {}))
+    merged.update({k: v for k, v in entry.items() if k not in ("name", "tags")})
+
+    fields = {}
+    attrs = {}
+    for key, value in merged.items():
+        if value is None or value == "":
+            continue
+        key = key.lower()
+        if key in _INT_FIELDS:
+            try:
+                fields[key] = int(value)
+            except (TypeError, ValueError):
+                raise ConfigError(f"{source}: router {name}: invalid {key} {value!r}")
+        elif key in FIELDS:
+            fields[key] = str(value)
+        else:
+            attrs[key] = str(value)
+
+    if not fields.get("host"):
+        raise ConfigError(f"{source}: router {name} has no host")
+    return Router(name=str(name), tags=tags, attrs=attrs, **fields)
+
+
+###################
+# Loaders
+###################
+def _routers_from_document(doc, source):
+    """
+    TOML/YAML layout: optional "defaults" and "groups" tables, and
+    "routers" as a table keyed by name or a list of entries with "name".
+    """
+    if not isinstance(doc, dict):
+        raise ConfigError(f"{source}: expected a mapping at the top level")
+    defaults = doc.get("defaults") or {}
+    groups = {str(k).lower(): v or {} for k, v in (doc.get("groups") or {}).items()}
+
+    entries = doc.get("routers") or {}
+    if isinstance(entries, dict):
+        entries = [{"name": name, **(entry or {})} for name, entry in entries.items()]
+
+    routers = []
+    for entry in entries:
+        if not entry.get("name"):
+            raise ConfigError(f"{source}: router entry without a name: {entry}")
+        routers.append(_make_router(entry["name"], entry, defaults, groups, source))
+    return routers
+
+
+def _load_csv(path):
+    """
+    One router per row. "name" and "host" columns are required; "tags" is
+    split on spaces or semicolons; other columns become attributes.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if rows and not {"name", "host"} <= set(rows[0]):
+        raise ConfigError(f"{path}: CSV inventory needs name and host columns")
+    return [_make_router(row["name"], row, {}, {}, path)
+            for row in rows if (row.get("name") or "").strip()]
+
+
+def load_file(path):
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".csv":
+            return _load_csv(path)
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except OSError as e:
+        raise ConfigError(f"Cannot read inventory {path}: {e}") from e
+
+    if ext == ".toml":
+        try:
+            doc = tomllib.loads(text)
+        except ValueError as e:             # TOMLDecodeError
+            raise ConfigError(f"{path}: {e}") from e
+    elif ext in (".yaml", ".yml"):
+        if yaml is None:
+            raise ConfigError("YAML inventories need PyYAML (pip install pyyaml)")
+        try:
+            doc = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ConfigError(f"{path}: {e}") from e
+    else:
+        raise ConfigError(f"Unknown inventory format {ext} (use .toml, .yaml or .csv)")
+    return _routers_from_document(doc, path)
+
+
+def load_env():
+    """
+    The MT_ROUTERS / MT_ROUTER_<NAME> inventory, tagged from
+    MT_ROUTER_<NAME>_TAGS.
+    """
+    return [Router(name=name, host=host,
+                   tags=tuple(t.lower() for t in
+                              (get_router_env(name, "TAGS", "") or "").replace(",", " ").split()))
+            for name, host in ROUTERS.items()]
+
+
+###################
+# Indexed inventory
+###################
+class Inventory:
+    """
+    Routers in inventory order, with lookup indexes for selection. The tag
+    index is built on load; an attribute index is built the first time an
+    expression uses that key.
+    """
+
+    def __init__(self, routers):
+        self.routers = {}
+        for router in routers:
+            if router.name in self.routers:
+                raise ConfigError(f"Duplicate router name in inventory: {router.name}")
+            self.routers[router.name] = router
+        self._order = {name: i for i, name in enumerate(self.routers)}
+        self._attr_keys = {k for r in self.routers.values() for k in r.attrs}
+        self._indexes = {"tag": self._build_tags()}
+        self._parsed_hosts = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.routers)
+
+    def __contains__(self, name):
+        return name in self.routers
+
+    def __getitem__(self, name):
+        return self.routers[name]
+
+    def names(self):
+        return list(self.routers)
+
+    def _build_tags(self):
+        index = {}
+        for router in self.routers.values():
+            for tag in router.tags:
+                index.setdefault(tag, set()).add(router.name)
+        return index
+
+    def tag_counts(self):
+        return {tag: len(names) for tag, names in sorted(self._indexes["tag"].items())}
+
+    def _index(self, key):
+        """
+        {lower-cased value: set of names} for a selection key.
+        """
+        with self._lock:
+            if key not in self._indexes:
+                index = {}
+                for router in self.routers.values():
+                    value = router.name if key == "name" else router.value(key)
+                    if value is not None:
+                        index.setdefault(value.lower(), set()).add(router.name)
+                self._indexes[key] = index
+            return self._indexes[key]
+
+    def _addresses(self):
+        """
+        [(ip_address, names)] for hosts given as addresses, for CIDR terms.
+        """
+        index = self._index("host")
+        with self._lock:
+            if self._parsed_hosts is None:
+                self._parsed_hosts = []
+                for value, names in index.items():
+                    try:
+                        self._parsed_hosts.append((ipaddress.ip_address(value), names))
+                    except ValueError:
+                        pass                # a DNS name, not an address
+            return self._parsed_hosts
+
+    ###################
+    # Selection expressions
+    ###################
+    def _match(self, key, pattern):
+        """
+        Names whose key matches pattern: a glob, a CIDR for host, or an
+        exact value (one dict lookup).
+        """
+        pattern = pattern.lower()
+        if key == "host" and "/" in pattern:
+            try:
+                network = ipaddress.ip_network(pattern, strict=False)
+            except ValueError:
+                raise ValueError(f"Invalid network: {pattern}") from None
+            matched = set()
+            for address, names in self._addresses():
+                if address in network:
+                    matched |= names
+            return matched
+
+        index = self._index(key)
+        if not any(c in pattern for c in _GLOB_CHARS):
+            if key == "name" and pattern not in index:
+                raise ValueError(f"Unknown router(s): {pattern}")
+            return set(index.get(pattern, ()))
+        # Globs run over the distinct values, not over every router
+        matched = set()
+        for value in fnmatch.filter(index, pattern):
+            matched |= index[value]
+        return matched
+
+    def _term(self, term):
+        key, sep, patterns = term.partition(":")
+        if not sep or not _KEY.match(key.lower()):
+            key, patterns = "name", term
+        key = key.lower()
+        if key not in ("name", "tag") + SELECTABLE and key not in self._attr_keys:
+            raise ValueError(f"Unknown selector '{key}' in '{term}'")
+
+        matched = set()
+        for pattern in patterns.split(","):
+            if pattern:
+                matched |= self._match(key, pattern)
+        return matched
+
+    def select(self, expression):
+        """
+        Names matching a selection expression, in inventory order. Terms
+        are separated by spaces and must all match; "!" negates a term and
+        commas inside a term are alternatives:
+
+            tag:edge site:ath* !lab*     edge routers at ath* sites, no labs
+            core,edge1                   two routers by name
+            host:10.1.0.0/16 !tag:test   by address range
+
+        Keys are tag, name (the default), the connection fields (host,
+        transport, profile, ...) and any attribute in the inventory.
+        Raises ValueError on unknown router names or keys.
+        """
+        expression = re.sub(r"\s*,\s*", ",", expression or "").strip()
+        if not expression:
+            return self.names()
+
+        include = None
+        exclude = set()
+        for term in expression.split():
+            if term.startswith("!"):
+                exclude |= self._term(term[1:])
+            else:
+                matched = self._term(term)
+                include = matched if include is None else include & matched
+
+        selected = (set(self.routers) if include is None else include) - exclude
+        return sorted(selected, key=self._order.__getitem__)
+
+    def resolve(self, selection=None):
+        """
+        Router names for an expression or a list of names (all if empty).
+        """
+        if not selection:
+            return self.names()
+        if isinstance(selection, str):
+            return self.select(selection)
+        unknown = [n for n in selection if n not in self.routers]
+        if unknown:
+            raise ValueError(f"Unknown router(s): {', '.join(unknown)}")
+        return list(selection)
+
+
+###################
+# Process-wide inventory, loaded on first use
+###################
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def get_inventory():
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            routers = load_file(os.path.expanduser(MT_INVENTORY)) if MT_INVENTORY else load_env()
+            _inventory = Inventory(routers)
+        return _inventory
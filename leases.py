@@ -0,0 +1,118 @@
+# -----------------------------------------
+# Bulk DHCP lease filtering and removal
+# -----------------------------------------
+
+import fnmatch
+
+from parsing import is_yes, parse_records
+from units import parse_duration
+
+
+LEASE_PATH = "/ip/dhcp-server/lease"
+
+# ids per remove command; chunks of one router run on parallel channels
+_REMOVE_CHUNK = 500
+
+
+def _normalize_mac(mac):
+    return (mac or "").upper().replace("-", ":")
+
+
+def fetch_leases(client):
+    """
+    Returns every lease as a dict with its .id as "id" and a boolean
+    "dynamic".
+    """
+    if client.api:
+        leases = []
+        for row in client.api.rows(LEASE_PATH):
+            lease = {k: str(v) for k, v in row.items() if k != ".id"}
+            lease["id"] = row.get(".id")
+            lease["dynamic"] = is_yes(str(row.get("dynamic", "")))
+            leases.append(lease)
+        return leases
+
+    output = client.call_iter(f"{LEASE_PATH}/print terse show-ids without-paging")
+    return [
+        {**r.fields, "id": r.index,
+         "dynamic": r.has_flag("D") or is_yes(r.get("dynamic"))}
+        for r in parse_records(output)
+    ]
+
+
+###################
+# Local lease filter
+###################
+class LeaseFilter:
+    """
+    All given criteria must match. Static leases are skipped unless
+    include_static is set.
+    """
+
+    def __init__(self, status=None, older_than=None, mac_prefix=None,
+                 server=None, hostname=None, include_static=False):
+        self.status = status
+        self.older_than = older_than        # seconds since last seen
+        self.mac_prefix = _normalize_mac(mac_prefix)
+        self.server = server
+        self.hostname = hostname            # glob, case-insensitive
+        self.include_static = include_static
+
+    def matches(self, lease):
+        if not self.include_static and not lease.get("dynamic"):
+            return False
+        if self.status and lease.get("status") != self.status:
+            return False
+        if self.server and lease.get("server") != self.server:
+            return False
+        if self.mac_prefix and not _normalize_mac(
+                lease.get("mac-address")).startswith(self.mac_prefix):
+            return False
+        if self.hostname and not fnmatch.fnmatch(
+                lease.get("host-name", "").lower(), self.hostname.lower()):
+            return False
+        if self.older_than is not None:
+            seen = parse_duration(lease.get("last-seen"))
+            # "never" counts as infinitely old
+            if seen is not None and seen < self.older_than:
+                return False
+        return True
+
+    def __str__(self):
+        parts = [f"{k}={v}" for k, v in (
+            ("status", self.status), ("older-than", self.older_than),
+            ("mac-prefix", self.mac_prefix), ("server", self.server),
+            ("host-name", self.hostname)) if v not in (None, "")]
+        if self.include_static:
+            parts.append("include-static")
+        return " ".join(parts) or "all dynamic leases"
+
+
+###################
+# Remove in one round trip
+###################
+def remove_leases(client, ids):
+    """
+    Removes leases by id with "remove numbers=*1,*2,..." commands; long
+    id lists are split into chunks that run concurrently.
+    """
+    ids = list(ids)
+    commands = [
+        f"{LEASE_PATH}/remove numbers={','.join(ids[i:i + _REMOVE_CHUNK])}"
+        for i in range(0, len(ids), _REMOVE_CHUNK)
+    ]
+    if commands:
+        client.call_many(commands)
+    return len(ids)
+
+
+def cleanup(client, lease_filter, apply=False):
+    """
+    Fetches, filters and (if apply) removes leases on one router. Returns
+    {"total", "matched", "removed", "leases": matched leases}.
+    """
+    leases = fetch_leases(client)
+    matched = [lease for lease in leases if lease_filter.matches(lease)]
+    removed = remove_leases(client, [l["id"] for l in matched]) if apply else 0
+    return {"total": len(leases), "matched": len(matched),
+            "removed": removed, "leases": matched}
@@ -0,0 +1,193 @@
+# -----------------------------------------
+# Fleet-wide MAC/IP/host location index (SQLite)
+# -----------------------------------------
+
+import hashlib
+import ipaddress
+import os
+import re
+import sqlite3
+import time
+
+from config import MT_STATE_DIR
+from parsing import parse_records
+
+
+INDEX_PATH = os.path.join(MT_STATE_DIR, "hosts.db")
+
+COLUMNS = ["router", "source", "mac", "ip", "hostname", "interface", "seen"]
+
+# source -> (command, ip field, hostname field, interface field)
+SOURCES = {
+    "arp": ("/ip/arp/print terse without-paging",
+            "address", None, "interface"),
+    "dhcp": ("/ip/dhcp-server/lease/print terse without-paging",
+             "address", "host-name", "server"),
+    "neighbor": ("/ip/neighbor/print terse without-paging",
+                 "address", "identity", "interface"),
+    "bridge": ("/interface/bridge/host/print terse without-paging",
+               None, None, "on-interface"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    router TEXT NOT NULL,
+    source TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    ip_num INTEGER,
+    hostname TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    seen REAL NOT NULL,
+    PRIMARY KEY (router, source, mac, ip)
+);
+CREATE INDEX IF NOT EXISTS hosts_mac ON hosts (mac);
+CREATE INDEX IF NOT EXISTS hosts_ip ON hosts (ip_num);
+CREATE INDEX IF NOT EXISTS hosts_hostname ON hosts (hostname);
+CREATE TABLE IF NOT EXISTS refreshed (
+    router TEXT PRIMARY KEY,
+    time REAL NOT NULL,
+    entries INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+_MAC_QUERY = re.compile(r"^[0-9A-Fa-f*?\[\]]{1,2}([:\-][0-9A-Fa-f*?\[\]]{0,2})+$")
+
+
+def _ip_num(ip):
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except ValueError:
+        return None
+
+
+###################
+# Collect one router's tables
+###################
+def collect(client, name):
+    """
+    Returns host entries (source, mac, ip, hostname, interface) from the
+    ARP, DHCP lease, neighbor and bridge host tables of one router.
+    """
+    commands = [command for command, *_ in SOURCES.values()]
+    try:
+        outputs = client.call_many(commands)
+    except RuntimeError:
+        # A menu is missing (e.g. no bridge); fetch the rest one by one
+        outputs = []
+        for command in commands:
+            try:
+                outputs.append(client.call(command))
+            except RuntimeError:
+                outputs.append("")
+
+    entries = []
+    for (source, (_, ip_key, host_key, if_key)), output in zip(
+            SOURCES.items(), outputs):
+        for r in parse_records(output):
+            mac = (r.get("mac-address") or "").upper()
+            ip = r.get(ip_key, "") if ip_key else ""
+            if not mac and not ip:
+                continue
+            entries.append((
+                source, mac, ip,
+                (r.get(host_key, "") if host_key else "").lower(),
+                r.get(if_key, ""),
+            ))
+    return entries
+
+
+###################
+# Index
+###################
+class HostIndex:
+    """
+    SQLite index of where MACs, IPs and host names were last seen. Each
+    refresh replaces one router's rows in a single transaction, and is
+    skipped when the router's tables did not change.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or INDEX_PATH
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def stale_routers(self, routers, max_age):
+        """
+        Routers never refreshed or refreshed more than max_age seconds ago.
+        """
+        fresh = {
+            router for router, when in self.db.execute(
+                "SELECT router, time FROM refreshed")
+            if time.time() - when < max_age
+        }
+        return [r for r in routers if r not in fresh]
+
+    def update(self, router, entries):
+        """
+        Replaces router's entries. Returns False if nothing changed.
+        """
+        entries = sorted(set(entries))
+        digest = hashlib.sha256(repr(entries).encode()).hexdigest()
+        now = time.time()
+
+        row = self.db.execute(
+            "SELECT digest FROM refreshed WHERE router = ?", (router,)
+        ).fetchone()
+        with self.db:
+            if row and row[0] == digest:
+                self.db.execute(
+                    "UPDATE refreshed SET time = ? WHERE router = ?",
+                    (now, router))
+                return False
+
+            self.db.execute("DELETE FROM hosts WHERE router = ?", (router,))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(router, source, mac, ip, _ip_num(ip), host, iface, now)
+                 for source, mac, ip, host, iface in entries])
+            self.db.execute(
+                "INSERT OR REPLACE INTO refreshed VALUES (?, ?, ?, ?)",
+                (router, now, len(entries), digest))
+        return True
+
+    def find(self, query, kind=None, limit=1000):
+        """
+        Looks up a MAC (glob: aa:bb:cc:*), an IP or CIDR (10.1.2.0/24) or a
+        host name glob. kind forces "mac", "ip" or "host"; otherwise it is
+        guessed from the query. Returns dict rows.
+        """
+        kind = kind or self.guess_kind(query)
+        if kind == "mac":
+            where, args = "mac GLOB ?", (query.upper().replace("-", ":"),)
+        elif kind == "ip":
+            net = ipaddress.IPv4Network(query, strict=False)
+            where, args = ("ip_num BETWEEN ? AND ?",
+                           (int(net.network_address), int(net.broadcast_address)))
+        else:
+            pattern = query.lower()
+            if not any(c in pattern for c in "*?["):
+                pattern = f"*{pattern}*"
+            where, args = "hostname GLOB ?", (pattern,)
+
+        cursor = self.db.execute(
+            "SELECT router, source, mac, ip, hostname, interface, seen "
+            f"FROM hosts WHERE {where} ORDER BY mac, ip, router LIMIT ?",
+            (*args, limit))
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    @staticmethod
+    def guess_kind(query):
+        if _MAC_QUERY.match(query):
+            return "mac"
+        try:
+            ipaddress.IPv4Network(query, strict=False)
+            return "ip"
+        except ValueError:
+            return "host"
@@ -0,0 +1,187 @@
+# -----------------------------------------
+# Incremental log tailing with per-router cursors
+# -----------------------------------------
+
+import collections
+import json
+import os
+import threading
+import time
+
+from config import MT_STATE_DIR
+from parsing import parse_properties, parse_records
+from units import parse_duration
+
+
+LOG_DIR = os.path.join(MT_STATE_DIR, "logs")
+
+# Seconds the computed boot time may drift before we call it a reboot
+_BOOT_SLACK = 60
+
+
+def id_value(entry_id):
+    """
+    "*1A" -> 26. Log ids grow by one per entry until the router reboots.
+    """
+    try:
+        return int(entry_id.lstrip("*"), 16)
+    except (AttributeError, ValueError):
+        return -1
+
+
+###################
+# Persisted cursor: last seen entry id and router boot time
+###################
+class LogCursor:
+    """
+    Remembers the last log entry seen on one router, stored as JSON under
+    MT_STATE_DIR/logs/<router>.json.
+    """
+
+    def __init__(self, router):
+        self.router = router
+        self.path = os.path.join(LOG_DIR, f"{router}.json")
+        self.id = None
+        self.boot = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.id = state.get("id")
+        self.boot = state.get("boot")
+
+    def save(self):
+        with self._lock:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"id": self.id, "boot": self.boot,
+                           "updated": time.time()}, f)
+            os.replace(tmp, self.path)
+
+    def check_boot(self, boot):
+        """
+        Entry ids restart after a reboot; start over when the router's boot
+        time moved.
+        """
+        if boot is None:
+            return
+        if self.boot is not None and abs(boot - self.boot) > _BOOT_SLACK:
+            self.id = None
+        self.boot = boot
+
+    def advance(self, entry):
+        """
+        Moves the cursor to entry. Returns False for entries already seen.
+        """
+        if id_value(entry["id"]) <= id_value(self.id):
+            return False
+        self.id = entry["id"]
+        return True
+
+
+###################
+# Fetch log entries newer than a cursor
+###################
+def boot_time(client):
+    """
+    Router boot time as a local epoch, from /system resource uptime.
+    """
+    # Uptime must come from the router, not the result cache
+    props = parse_properties(client.call("/system resource print", fresh=True))
+    uptime = parse_duration(props.get("uptime"))
+    return time.time() - uptime if uptime is not None else None
+
+
+def _entry(entry_id, fields):
+    return {
+        "id": entry_id,
+        "time": fields.get("time", ""),
+        "topics": fields.get("topics", ""),
+        "message": fields.get("message", ""),
+    }
+
+
+def entries(client, after=None, follow=False):
+    """
+    Yields log entries with an id above after (all entries if None). With
+    follow=True the request stays open and keeps yielding new entries.
+    """
+    if client.api:
+        words = ["=follow="] if follow else []
+        if after:
+            words.append(f"?>.id={after}")
+        for row in client.api.stream("/log/print", *words):
+            yield _entry(row.get(".id"), row)
+        return
+
+    command = "/log/print terse show-ids without-paging"
+    if follow:
+        command += " follow"
+    if after:
+        command += f" where .id>{after}"
+
+    # One entry per line; parse each as it arrives so follow stays live
+    for line in client.call_iter(command, fresh=True):
+        for record in parse_records([line]):
+            yield _entry(record.index, record.fields)
+
+
+def recent(client, limit=20):
+    """
+    The last limit log entries. No cursor is read or moved, so viewing
+    logs does not hide them from the incremental tail.
+    """
+    return list(collections.deque(entries(client), maxlen=limit))
+
+
+###################
+# One incremental poll
+###################
+def poll(client, router, limit=None):
+    """
+    Returns the log entries added since the last poll and moves the
+    router's cursor past them. The first poll returns the whole buffer
+    (or its last limit entries).
+    """
+    cursor = LogCursor(router)
+    cursor.check_boot(boot_time(client))
+
+    new = [e for e in entries(client, cursor.id) if cursor.advance(e)]
+    cursor.save()
+
+    return new[-limit:] if limit else new
+
+
+###################
+# Follow: stream new entries over one long-lived request
+###################
+def follow(client, router, on_entry, cursor=None):
+    """
+    Calls on_entry(router, entry) for every entry after the cursor, then
+    for each new one as it is logged. Blocks until the session ends.
+    """
+    cursor = cursor or LogCursor(router)
+    cursor.check_boot(boot_time(client))
+
+    last_save = time.monotonic()
+    try:
+        for entry in entries(client, cursor.id, follow=True):
+            if not cursor.advance(entry):
+                continue
+            on_entry(router, entry)
+            if time.monotonic() - last_save >= 1:
+                cursor.save()
+                last_save = time.monotonic()
+    finally:
+        cursor.save()
+
+
+def format_entry(router, entry):
+    return (f"{router:<12} {entry['time']:<20} {entry['topics']:<24} "
+            f"{entry['message']}")
@@ -2,10 +2,49 @@
 # MikroTik SSH Task Runner / Inventory Tool
 # -----------------------------------------
 
+import argparse
+import sys
+from functools import partial
+
+import batch
+from firewall import TABLES as FIREWALL_TABLES
+from inventory import get_inventory
+from metrics import AGGREGATES
+from report import REPORT_FORMATS
 from routers import get_router_clients
+from runner import run_on_routers, print_summary
+from pool import SessionPool
 from ui import show_menu, get_user_choice, select_routers
 from registry import TASKS
-from config import ROUTERS
+from config import (
+    MT_MAX_WORKERS,
+    MT_SESSION_POOL,
+    MT_POOL_IDLE_TIMEOUT,
+    MT_EXPORTER_LISTEN,
+    MT_EXPORTER_INTERVAL,
+)
+
+# --routers takes names or an inventory selection expression
+ROUTERS_HELP = ("comma-separated router names or a selection expression, "
+                "e.g. 'tag:edge site:ath* !lab*' (default: all)")
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+# Sessions reused across menu iterations (None = connect per task)
+POOL = (
+    SessionPool(get_router_clients, idle_timeout=MT_POOL_IDLE_TIMEOUT)
+    if MT_SESSION_POOL else None
+)
 
 ###################
 # Run a given task on selected routers
@@ -13,22 +52,26 @@ from config import ROUTERS
 def run_task(task):
     print(f"\nExecuting task: {task['name']}\n")
 
-    clients = get_router_clients()
-    selected_clients = select_routers(clients)
-
-    if not selected_clients:
+    names = select_routers(get_inventory())
+    if not names:
         print("Task cancelled.\n")
         return
 
-    for name, client in selected_clients.items():
-        print(f"--- {name} ---")
-        try:
-            client.connect()                 # establish SSH session
-            task["func"](client, name)       # run task payload
-        except Exception as e:
-            print(f"Error on {name}: {e}")
-        finally:
-            client.close()                   # enforce session cleanup
+    selected_clients = POOL.clients(names) if POOL else get_router_clients(names)
+
+    # Tasks with a setup hook ask their questions once, up front; after
+    # that they run unattended and can fan out like read-only ones
+    if task.get("setup"):
+        task = {**task, "func": partial(task["func"], **task["setup"]())}
+
+    # Interactive tasks prompt per router, so only unattended ones fan out
+    unattended = task.get("read_only") or task.get("setup")
+    workers = MT_MAX_WORKERS if unattended else 1
+
+    results = run_on_routers(
+        task, selected_clients, max_workers=workers, pool=POOL
+    )
+    print_summary(results)
 
     print("\nTask completed.\n")
 
@@ -36,33 +79,353 @@ def run_task(task):
 ###################
 # Print all routers from configuration inventory
 ###################
-def print_inventory():
-    print("\nLoaded router inventory:")
-    for name, ip in ROUTERS.items():
-        print(f" - {name} -> {ip}")
+def print_inventory(max_listed=40):
+    inventory = get_inventory()
+    print(f"\nLoaded router inventory ({len(inventory)} routers):")
+    for name in inventory.names()[:max_listed]:
+        router = inventory[name]
+        tags = f" [{', '.join(router.tags)}]" if router.tags else ""
+        print(f" - {name} -> {router.host}{tags}")
+    if len(inventory) > max_listed:
+        print(f" ... and {len(inventory) - max_listed} more")
     print("")
 
 
 ###################
-# Main program loop: show menu, select tasks, execute
+# Interactive program loop: show menu, select tasks, execute
 ###################
-def main():
+def interactive():
     print_inventory()
 
-    while True:
-        show_menu()
-        choice = get_user_choice()
+    if POOL:
+        POOL.start_reaper()
+
+    try:
+        while True:
+            show_menu()
+            choice = get_user_choice()
+
+            if choice == 0:
+                print("Exiting.")
+                break
+
+            task = TASKS.get(choice)
+            if not task:
+                print("Invalid selection.\n")
+                continue
+
+            run_task(task)
+    finally:
+        if POOL:
+            POOL.close_all()
+
+
+###################
+# Command line: no arguments starts the interactive menu
+###################
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="MikroTik SSH management tool. "
+                    "Run without arguments for the interactive menu."
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="run one task non-interactively")
+    run.add_argument("--task", required=True,
+                     help="task name (see 'tasks') or menu number")
+    run.add_argument("--routers", default="",
+                     help=ROUTERS_HELP)
+    run.add_argument("--format", choices=batch.FORMATS, default="ndjson")
+    run.add_argument("--answer", action="append", default=[],
+                     help="answer for the next task prompt, repeatable; "
+                          "unanswered prompts are skipped")
+    run.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                     help="routers handled in parallel")
+    run.set_defaults(handler=batch.cmd_run)
+
+    report = sub.add_parser("report",
+                            help="aggregate a read-only task into one table")
+    report.add_argument("--task", required=True,
+                        help="task name or menu number (see 'tasks')")
+    report.add_argument("--routers", default="",
+                        help=ROUTERS_HELP)
+    report.add_argument("--columns", default="",
+                        help="comma-separated columns (default: per task)")
+    report.add_argument("--sort", default=None,
+                        help="comma-separated columns, '-' prefix for "
+                             "descending, e.g. --sort=-cpu-load")
+    report.add_argument("--filter", action="append", default=[],
+                        help="row filter, repeatable: cpu-load>50, "
+                             "type=ether*, name~^wan")
+    report.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    report.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                        help="routers queried in parallel")
+    report.set_defaults(handler=batch.cmd_report)
+
+    logs = sub.add_parser("logs", help="print log entries new since last run")
+    logs.add_argument("--routers", default="",
+                      help=ROUTERS_HELP)
+    logs.add_argument("--follow", action="store_true",
+                      help="keep streaming new entries until interrupted")
+    logs.add_argument("--limit", type=int, default=None,
+                      help="max entries per router (without --follow)")
+    logs.add_argument("--format", choices=("text", "ndjson"), default="text")
+    logs.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                      help="routers polled in parallel")
+    logs.set_defaults(handler=batch.cmd_logs)
+
+    traffic = sub.add_parser("traffic",
+                             help="sample interface traffic continuously")
+    traffic.add_argument("--routers", default="",
+                         help=ROUTERS_HELP)
+    traffic.add_argument("--interval", type=int, default=1,
+                         help="seconds between samples")
+    traffic.add_argument("--window", type=int, default=300,
+                         help="seconds covered by mean/p95/peak")
+    traffic.add_argument("--every", type=int, default=10,
+                         help="seconds between printed reports")
+    traffic.add_argument("--duration", type=int, default=0,
+                         help="stop after this many seconds (0 = Ctrl-C)")
+    traffic.add_argument("--columns", default="",
+                         help="comma-separated columns, e.g. "
+                              "rx-pps-p95,tx-bps-last")
+    traffic.add_argument("--sort", default=None,
+                         help="e.g. --sort=-rx-bps-p95")
+    traffic.add_argument("--filter", action="append", default=[],
+                         help="row filter, repeatable: rx-bps-peak>100Mbps")
+    traffic.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    traffic.set_defaults(handler=batch.cmd_traffic)
+
+    metrics = sub.add_parser("metrics", help="resource history store")
+    metrics_sub = metrics.add_subparsers(dest="metrics_command", required=True)
+
+    collect = metrics_sub.add_parser("collect",
+                                     help="record /system resource metrics")
+    collect.add_argument("--routers", default="",
+                         help=ROUTERS_HELP)
+    collect.add_argument("--every", type=int, default=0,
+                         help="repeat every N seconds (0 = once)")
+    collect.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                         help="routers polled in parallel")
+    collect.set_defaults(handler=batch.cmd_metrics_collect)
+
+    query = metrics_sub.add_parser("query", help="query recorded metrics")
+    query.add_argument("--routers", default="",
+                       help=ROUTERS_HELP)
+    query.add_argument("--columns", default="",
+                       help="comma-separated metrics, e.g. cpu-load,free-memory")
+    query.add_argument("--since", default="1d",
+                       help="start: duration ago (7d, 12h) or ISO date/time")
+    query.add_argument("--until", default=None,
+                       help="end: duration ago or ISO date/time (default: now)")
+    query.add_argument("--step", default=None,
+                       help="downsample into buckets, e.g. 5m, 1h")
+    query.add_argument("--agg", choices=AGGREGATES,
+                       default="mean", help="bucket aggregate")
+    query.add_argument("--sort", default=None)
+    query.add_argument("--filter", action="append", default=[],
+                       help="row filter, repeatable: cpu-load>80")
+    query.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    query.set_defaults(handler=batch.cmd_metrics_query)
+
+    serve = sub.add_parser("serve", help="Prometheus metrics endpoint")
+    serve.add_argument("--routers", default="",
+                       help=ROUTERS_HELP)
+    serve.add_argument("--listen", default=MT_EXPORTER_LISTEN,
+                       help="host:port to listen on")
+    serve.add_argument("--interval", type=int, default=MT_EXPORTER_INTERVAL,
+                       help="seconds between background collections")
+    serve.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                       help="routers collected concurrently")
+    serve.set_defaults(handler=batch.cmd_serve)
+
+    export = sub.add_parser("export",
+                            help="archive /export of every router locally")
+    export.add_argument("--routers", default="",
+                        help=ROUTERS_HELP)
+    export.add_argument("--sensitive", action="store_true",
+                        help="include secrets (export show-sensitive)")
+    export.add_argument("--history", action="store_true",
+                        help="list archived versions instead of exporting")
+    export.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                        help="routers exported in parallel")
+    export.set_defaults(handler=batch.cmd_export)
+
+    diff = sub.add_parser(
+        "diff", help="section-aware diff of config exports",
+        description="Refs: a .rsc file, router (latest archived export), "
+                    "router@-1 (previous), router@7d, router@2026-10-01, "
+                    "router@<sha prefix> or router@live (export now).",
+    )
+    diff.add_argument("base", help="reference export (e.g. a golden config)")
+    diff.add_argument("targets", nargs="*",
+                      help="exports compared against base")
+    diff.add_argument("--all", action="store_true",
+                      help="compare every archived router against base")
+    diff.add_argument("--ignore", action="append", default=[],
+                      help="skip menus by prefix, repeatable: '/system identity'")
+    diff.add_argument("--summary", action="store_true",
+                      help="only print change counts")
+    diff.add_argument("--format", choices=("text", "json"), default="text")
+    diff.set_defaults(handler=batch.cmd_diff)
+
+    lease = sub.add_parser("leases",
+                           help="filter and bulk-remove DHCP leases")
+    lease.add_argument("--routers", default="",
+                       help=ROUTERS_HELP)
+    lease.add_argument("--status", help="e.g. waiting, bound, offered")
+    lease.add_argument("--older-than",
+                       help="last seen at least this long ago, e.g. 7d")
+    lease.add_argument("--mac-prefix", help="e.g. 00:0C:29")
+    lease.add_argument("--server", help="DHCP server name")
+    lease.add_argument("--hostname", help="host name glob, e.g. 'android-*'")
+    lease.add_argument("--include-static", action="store_true",
+                       help="also match static leases")
+    lease.add_argument("--list", action="store_true",
+                       help="print every matching lease")
+    lease.add_argument("--apply", action="store_true",
+                       help="remove the matches (default: dry run)")
+    lease.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                       help="routers handled in parallel")
+    lease.set_defaults(handler=batch.cmd_leases)
+
+    up = sub.add_parser(
+        "upgrade", help="check and roll out RouterOS updates in waves",
+        description="Checks all routers in parallel (polling until the "
+                    "check settles), then with --apply installs in waves: "
+                    "a canary wave first, then groups of --wave-size. A "
+                    "wave is done when its routers are back on the new "
+                    "version.",
+    )
+    up.add_argument("--routers", default="",
+                    help=ROUTERS_HELP)
+    up.add_argument("--channel", default=None,
+                    help="set the update channel first (stable, long-term, ...)")
+    up.add_argument("--apply", action="store_true",
+                    help="install (default: check and show the plan)")
+    up.add_argument("--canary", type=int, default=1,
+                    help="routers upgraded alone in the first wave")
+    up.add_argument("--wave-size", type=int, default=20,
+                    help="routers per wave after the canary")
+    up.add_argument("--max-failures", type=int, default=0,
+                    help="stop before the next wave after more failures")
+    up.add_argument("--check-timeout", type=int, default=120,
+                    help="seconds to wait for an update check to settle")
+    up.add_argument("--timeout", default="15m",
+                    help="per router: time to come back upgraded")
+    up.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                    help="routers checked/installed concurrently")
+    up.set_defaults(handler=batch.cmd_upgrade)
+
+    apply = sub.add_parser(
+        "apply", help="apply a file of commands as one change-set",
+        description="Every command of FILE (one per line, # comments) runs "
+                    "in one script per router: a single exec, or an SFTP "
+                    "upload and /import for large change-sets.",
+    )
+    apply.add_argument("file", help="command file, - for stdin")
+    apply.add_argument("--routers", default="",
+                       help=ROUTERS_HELP)
+    apply.add_argument("--stop-on-error", action="store_true",
+                       help="skip the remaining commands after a failure")
+    apply.add_argument("--show", action="store_true",
+                       help="print the generated script and exit")
+    apply.add_argument("--verbose", action="store_true",
+                       help="list successful commands too")
+    apply.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                       help="routers changed in parallel")
+    apply.set_defaults(handler=batch.cmd_apply)
+
+    fw = sub.add_parser(
+        "firewall", help="rank firewall rules by hits, find dead rules",
+        description="Hot rules by packet count, enabled rules that never "
+                    "matched, and rules shadowed by an earlier rule of the "
+                    "same chain.",
+    )
+    fw.add_argument("--routers", default="",
+                    help=ROUTERS_HELP)
+    fw.add_argument("--table", choices=FIREWALL_TABLES, default="filter")
+    fw.add_argument("--findings", default="",
+                    help="comma-separated: hot,shadowed,zero-hit (default: all)")
+    fw.add_argument("--top", type=int, default=10,
+                    help="hot rules listed per router")
+    fw.add_argument("--sort", default=None,
+                    help="sort key, '-' for descending: --sort=-packets")
+    fw.add_argument("--filter", action="append", default=[],
+                    help="row filter, repeatable: chain=forward")
+    fw.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    fw.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                    help="routers analyzed in parallel")
+    fw.set_defaults(handler=batch.cmd_firewall)
+
+    locate = sub.add_parser(
+        "locate", help="find where a MAC, IP or host name is seen",
+        description="Looks up the local host index built from ARP, DHCP "
+                    "lease, neighbor and bridge host tables. Queries: "
+                    "aa:bb:cc:* (MAC glob), 10.1.2.3 or 10.1.2.0/24, "
+                    "or a host name glob.",
+    )
+    locate.add_argument("query", nargs="?", help="MAC, IP/CIDR or host name")
+    locate.add_argument("--refresh", action="store_true",
+                        help="re-collect router tables into the index first")
+    locate.add_argument("--max-age", default=None,
+                        help="with --refresh: skip routers refreshed "
+                             "within this long, e.g. 15m")
+    locate.add_argument("--kind", choices=("mac", "ip", "host"),
+                        help="query type (default: guessed)")
+    locate.add_argument("--routers", default="",
+                        help="routers to refresh, as names or a selection "
+                             "expression (default: all)")
+    locate.add_argument("--limit", type=int, default=1000)
+    locate.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    locate.add_argument("--workers", type=int, default=MT_MAX_WORKERS,
+                        help="routers collected in parallel")
+    locate.set_defaults(handler=batch.cmd_locate)
+
+    hl = sub.add_parser("health",
+                        help="router health: circuit breaker, connect latency")
+    hl.add_argument("--reset", default=None,
+                    help="comma-separated router names (or 'all') to close "
+                         "the circuit for and forget")
+    hl.add_argument("--sort", default=None,
+                    help="sort key, '-' for descending: --sort=-failures")
+    hl.add_argument("--filter", action="append", default=[],
+                    help="row filter, repeatable: circuit=open")
+    hl.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    hl.set_defaults(handler=batch.cmd_health)
+
+    bench = sub.add_parser(
+        "bench-profiles", help="measure SSH throughput per transport profile",
+        description="Connects to each router once per SSH transport profile "
+                    "and times a large command, to pick the fastest profile "
+                    "for MT_ROUTER_<NAME>_PROFILE.",
+    )
+    bench.add_argument("--routers", default="",
+                       help=ROUTERS_HELP)
+    bench.add_argument("--profiles", default="",
+                       help="comma-separated profiles (default: all known)")
+    bench.add_argument("--command", default="/ip route print detail without-paging",
+                       help="command whose output is streamed")
+    bench.add_argument("--repeat", type=positive_int, default=3,
+                       help="runs per profile; the median is reported")
+    bench.add_argument("--sort", default=None,
+                       help="sort key, '-' for descending: --sort=seconds")
+    bench.add_argument("--format", choices=REPORT_FORMATS, default="table")
+    bench.set_defaults(handler=batch.cmd_bench_profiles)
+
+    tasks = sub.add_parser("tasks", help="list task names")
+    tasks.set_defaults(handler=batch.cmd_tasks)
+
+    return parser
+
 
-        if choice == 0:
-            print("Exiting.")
-            break
+def main(argv=None):
+    args = build_parser().parse_args(argv)
 
-        task = TASKS.get(choice)
-        if not task:
-            print("Invalid selection.\n")
-            continue
+    if args.command:
+        sys.exit(args.handler(args))
 
-        run_task(task)
+    interactive()
 
 
 
@@ -0,0 +1,214 @@
+# -----------------------------------------
+# On-disk columnar metrics store (memory-mapped, per router and day)
+# -----------------------------------------
+
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:                         # Windows: in-process lock only
+    fcntl = None
+
+from config import MT_STATE_DIR
+from units import to_number
+
+
+METRICS_DIR = os.path.join(MT_STATE_DIR, "metrics")
+
+AGGREGATES = ("mean", "min", "max", "last")
+
+_TS = "ts.i64"
+_LOCK = ".lock"
+_SUFFIX = ".f64"
+_UNSAFE = re.compile(r"[^\w.\-]")
+_DAY = 86400
+
+
+def normalize(props):
+    """
+    Keeps the numeric fields of a RouterOS property dict, with units
+    converted: "1w2d3h" -> seconds, "12.3MiB" -> bytes, "7%" -> 7.0.
+    """
+    metrics = {}
+    for key, value in props.items():
+        number = to_number(value)
+        if number is not None:
+            metrics[key] = number
+    return metrics
+
+
+def _day(ts):
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+def _read(path, dtype):
+    """
+    Memory-maps a column file read-only; empty files map to an empty array.
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+###################
+# Store
+###################
+class MetricsStore:
+    """
+    Time series per router as column files:
+
+        <root>/<router>/<YYYY-MM-DD>/ts.i64        sample times (epoch s)
+        <root>/<router>/<YYYY-MM-DD>/<metric>.f64  one float64 per sample
+
+    Every column of a day partition has one value per timestamp (NaN where
+    a metric was missing), so row i of each file belongs to ts[i]. Files
+    are only ever appended to and are memory-mapped for queries.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or METRICS_DIR
+        self._lock = threading.Lock()
+
+    def _partition(self, router, day):
+        return os.path.join(self.root, _UNSAFE.sub("_", router), day)
+
+    def _columns(self, path):
+        return sorted(f[:-len(_SUFFIX)] for f in os.listdir(path)
+                      if f.endswith(_SUFFIX))
+
+    ###################
+    # Write
+    ###################
+    def append(self, router, metrics, ts=None):
+        """
+        Appends one sample of {metric: number} for router at ts (now).
+        """
+        ts = int(time.time() if ts is None else ts)
+        metrics = {_UNSAFE.sub("_", k): float(v) for k, v in metrics.items()}
+        path = self._partition(router, _day(ts))
+
+        with self._lock:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, _LOCK), "a") as lock:
+                # Other processes (cron collectors) append to the same files
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self._append_row(path, ts, metrics)
+
+    def _append_row(self, path, ts, metrics):
+        ts_path = os.path.join(path, _TS)
+        rows = os.path.getsize(ts_path) // 8 if os.path.exists(ts_path) else 0
+        if os.path.exists(ts_path):
+            os.truncate(ts_path, rows * 8)  # drop a torn partial write
+
+        for name in set(self._columns(path)) | set(metrics):
+            col_path = os.path.join(path, name + _SUFFIX)
+            size = os.path.getsize(col_path) if os.path.exists(col_path) else 0
+            have = min(size // 8, rows)
+            if size != have * 8:
+                # An earlier append failed before writing ts (or mid-value):
+                # cut the column back to the last complete row
+                os.truncate(col_path, have * 8)
+            # New metric (or one missing from earlier samples): NaN backfill
+            values = [np.nan] * (rows - have)
+            values.append(metrics.get(name, np.nan))
+            with open(col_path, "ab") as f:
+                f.write(np.asarray(values, dtype=np.float64).tobytes())
+
+        # ts last: readers never see a row whose values are missing
+        with open(ts_path, "ab") as f:
+            f.write(np.asarray([ts], dtype=np.int64).tobytes())
+
+    ###################
+    # Read
+    ###################
+    def routers(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.listdir(self.root))
+
+    def metrics(self, router):
+        names = set()
+        root = self._partition(router, "")
+        if os.path.isdir(root):
+            for day in os.listdir(root):
+                names.update(self._columns(os.path.join(root, day)))
+        return sorted(names)
+
+    def query(self, router, columns=None, start=None, end=None):
+        """
+        Returns (ts, {column: values}) for start <= ts < end, with only the
+        day partitions in range opened and each sliced by binary search.
+        """
+        end = time.time() if end is None else end
+        root = self._partition(router, "")
+        days = sorted(os.listdir(root)) if os.path.isdir(root) else []
+        if start is not None:
+            days = [d for d in days if d >= _day(start)]
+        days = [d for d in days if d <= _day(end)]
+
+        columns = list(columns) if columns else self.metrics(router)
+        ts_parts = []
+        parts = {c: [] for c in columns}
+
+        for day in days:
+            path = os.path.join(root, day)
+            ts = _read(os.path.join(path, _TS), np.int64)
+            lo = np.searchsorted(ts, start, "left") if start is not None else 0
+            hi = np.searchsorted(ts, end, "left")
+            if lo >= hi:
+                continue
+
+            ts_parts.append(np.array(ts[lo:hi]))
+            for col in columns:
+                values = _read(os.path.join(path, col + _SUFFIX), np.float64)
+                chunk = np.full(hi - lo, np.nan)
+                avail = max(0, min(hi, len(values)) - lo)
+                chunk[:avail] = values[lo:lo + avail]
+                parts[col].append(chunk)
+
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), {
+                c: np.empty(0) for c in columns}
+        return np.concatenate(ts_parts), {
+            c: np.concatenate(v) for c, v in parts.items()}
+
+
+###################
+# Downsampling
+###################
+def downsample(ts, columns, step, how="mean"):
+    """
+    Buckets samples into step-second intervals. Returns (bucket_ts,
+    {column: values}) with one row per non-empty bucket; NaNs are ignored.
+    """
+    if how not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate: {how}")
+    if not len(ts):
+        return ts, columns
+
+    buckets = ts - ts % step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+
+    out = {}
+    for name, values in columns.items():
+        present = ~np.isnan(values)
+        if how == "mean":
+            sums = np.add.reduceat(np.where(present, values, 0.0), starts)
+            counts = np.add.reduceat(present.astype(np.int64), starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[name] = np.where(counts > 0, sums / counts, np.nan)
+        elif how == "min":
+            out[name] = np.fmin.reduceat(values, starts)
+        elif how == "max":
+            out[name] = np.fmax.reduceat(values, starts)
+        else:
+            out[name] = values[ends - 1]
+
+    return buckets[starts], out
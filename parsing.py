@@ -0,0 +1,269 @@
+# -----------------------------------------
+# RouterOS CLI output parser
+# -----------------------------------------
+#
+# Turns "print detail", "print terse", "print as-value" and "key: value"
+# output into records. Every parser accepts a string or any iterable of
+# lines (e.g. MikroTikClient.call_iter) and consumes it in a single pass.
+
+import re
+import shlex
+from dataclasses import dataclass, field
+
+
+# key=value, key="quoted \"value\" with spaces"
+_KV = re.compile(r'([^\s=";]+)=(?:"((?:[^"\\]|\\.)*)"?|(\S*))')
+
+# Start of a record: index or .id, then the rest of the line
+_HEADER = re.compile(r"^\s{0,3}(\d+|\*[0-9A-Fa-f]+)(?:\s+(.*))?$")
+
+# "key: value" line of single-item menus (/system resource print)
+_PROPERTY = re.compile(r"^\s*([A-Za-z0-9][\w.\-]*):(?:\s+(.*))?$")
+
+# Verbs ending the menu path of a CLI command
+COMMAND_VERBS = frozenset({
+    "print", "get", "set", "unset", "add", "remove", "enable", "disable",
+    "comment", "move", "export", "monitor", "monitor-traffic", "flush",
+    "reset-counters", "check-for-updates", "install", "reboot", "shutdown",
+    "save", "load", "run", "sync", "ping", "cancel", "import",
+})
+
+_ESCAPE = re.compile(r'\\([0-9A-Fa-f]{2}|.)')
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "a": "\a", "b": "\b",
+            "f": "\f", "v": "\v", "_": " "}
+
+
+@dataclass(slots=True)
+class Record:
+    """
+    One RouterOS item: print index (or .id), flag letters, comment and
+    key/value fields. Values are unquoted strings.
+    """
+    index: str = ""
+    flags: str = ""
+    comment: str = ""
+    fields: dict = field(default_factory=dict)
+
+    def get(self, key, default=None):
+        return self.fields.get(key, default)
+
+    def __getitem__(self, key):
+        return self.fields[key]
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def has_flag(self, flag):
+        return flag in self.flags
+
+    @property
+    def disabled(self):
+        return "X" in self.flags or is_yes(self.fields.get("disabled"))
+
+
+###################
+# Value helpers
+###################
+def is_yes(value):
+    return value is not None and value.lower() in ("yes", "true")
+
+
+def unquote(value):
+    """
+    Strips surrounding quotes and resolves RouterOS escape sequences.
+    """
+    if not value.startswith('"'):
+        return value
+
+    value = value[1:-1] if len(value) > 1 and value.endswith('"') else value[1:]
+    return _unescape(value) if "\\" in value else value
+
+
+def _unescape(value):
+    def _sub(m):
+        esc = m.group(1)
+        if len(esc) == 2:
+            return chr(int(esc, 16))
+        return _ESCAPES.get(esc, esc)
+
+    return _ESCAPE.sub(_sub, value)
+
+
+def parse_fields(text):
+    """
+    Returns a dict of all key=value pairs in text.
+    """
+    fields = {}
+    for key, quoted, plain in _KV.findall(text):
+        if quoted:
+            fields[key] = _unescape(quoted) if "\\" in quoted else quoted
+        else:
+            fields[key] = plain
+    return fields
+
+
+def _lines(source):
+    if isinstance(source, str):
+        return source.splitlines()
+    return source
+
+
+def _open_quote(text, state=False):
+    """
+    Returns True if text leaves a double-quoted string open.
+    """
+    if '"' not in text:
+        return state
+    if "\\" not in text:
+        return state ^ (text.count('"') % 2 == 1)
+
+    escaped = False
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = state
+        elif ch == '"':
+            state = not state
+    return state
+
+
+def _build(index, header, continuation):
+    flags = []
+    comment = ""
+
+    if ";;;" in header:
+        flag_text, comment = header.split(";;;", 1)
+        flags = flag_text.split()
+        comment = comment.strip()
+        body = continuation
+    else:
+        m = _KV.search(header)
+        flags = (header[:m.start()] if m else header).split()
+        body = header + " " + continuation if continuation else header
+
+    fields = parse_fields(body)
+    if not comment:
+        comment = fields.get("comment", "")
+
+    return Record(index=index, flags="".join(flags), comment=comment,
+                  fields=fields)
+
+
+###################
+# print detail / print terse
+###################
+def parse_records(source):
+    """
+    Yields a Record per item of "print detail" or "print terse" output.
+
+    Handles the "Flags:" legend, ";;; comment" lines, detail records wrapped
+    over several indented lines and quoted values spanning line breaks.
+    """
+    index = None
+    parts = []                              # header line + continuation
+    in_quote = False
+
+    for line in _lines(source):
+        if in_quote:
+            parts[-1] += "\n" + line
+            in_quote = _open_quote(line, True)
+            continue
+
+        m = _HEADER.match(line)
+        if m:
+            if index is not None:
+                yield _build(index, parts[0], " ".join(parts[1:]))
+            index, parts = m.group(1), [m.group(2) or ""]
+            in_quote = _open_quote(parts[0])
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            if index is not None:
+                yield _build(index, parts[0], " ".join(parts[1:]))
+                index = None
+            continue
+
+        if index is None:
+            continue                        # Flags:/Columns: legend
+
+        parts.append(stripped)
+        in_quote = _open_quote(stripped)
+
+    if index is not None:
+        yield _build(index, parts[0], " ".join(parts[1:]))
+
+
+###################
+# print as-value / :put [... print as-value]
+###################
+def parse_as_value(source):
+    """
+    Yields a Record per item of "as-value" output, where items are
+    ';'-separated key=value pairs and every item starts with .id (or with
+    the first key seen again).
+    """
+    first_key = None
+    fields = {}
+
+    for line in _lines(source):
+        for pair in line.strip().split(";"):
+            if "=" not in pair:
+                continue
+            key, value = pair.split("=", 1)
+            if first_key is None:
+                first_key = key
+            elif key == first_key or (key == ".id" and ".id" in fields):
+                yield _from_fields(fields)
+                fields = {}
+            fields[key] = unquote(value)
+
+    if fields:
+        yield _from_fields(fields)
+
+
+def _from_fields(fields):
+    return Record(index=fields.get(".id", ""),
+                  comment=fields.get("comment", ""), fields=fields)
+
+
+###################
+# "key: value" output of single-item menus
+###################
+def parse_properties(source):
+    """
+    Returns a dict from "key: value" output such as /system resource print.
+    Lines without a key continue the previous value.
+    """
+    props = {}
+    last = None
+
+    for line in _lines(source):
+        m = _PROPERTY.match(line)
+        if m:
+            last = m.group(1)
+            props[last] = (m.group(2) or "").strip()
+        elif last and line.strip():
+            props[last] += " " + line.strip()
+
+    return props
+
+
+###################
+# CLI command structure
+###################
+def split_command(command):
+    """
+    Splits a CLI command into its menu path and arguments:
+    "/ip address print detail" -> (["ip", "address", "print"], ["detail"]).
+    The path ends at the first known verb.
+    """
+    path = []
+    args = []
+    for token in shlex.split(command):
+        if args or (path and path[-1] in COMMAND_VERBS):
+            args.append(token)
+        else:
+            path.extend(p for p in token.split("/") if p)
+    return path, args
@@ -0,0 +1,116 @@
+# -----------------------------------------
+# Persistent SSH session pool
+# -----------------------------------------
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SessionPool:
+    """
+    Keeps authenticated MikroTikClient sessions open between tasks.
+
+    Clients are created only for the routers asked for, sessions are
+    connected lazily on first use, health-checked on every checkout
+    (reconnecting transparently when the transport died) and closed after
+    idle_timeout seconds without use.
+    """
+
+    def __init__(self, factory, idle_timeout: int = 300):
+        # callable(names=None) returning {name: client}, all routers if None
+        self._factory = factory
+        self._idle_timeout = idle_timeout
+        self._clients = {}
+        self._complete = False
+        self._last_used = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._stop = threading.Event()
+
+    ###################
+    # Router clients known to the pool (connected or not)
+    ###################
+    def clients(self, names=None):
+        with self._lock:
+            if names is None and not self._complete:
+                self._add(self._factory())
+                self._complete = True
+            elif names is not None:
+                missing = [n for n in names if n not in self._clients]
+                if missing:
+                    self._add(self._factory(missing))
+
+            if names is None:
+                return dict(self._clients)
+            return {name: self._clients[name] for name in names}
+
+    def _add(self, clients):
+        for name, client in clients.items():
+            if name not in self._clients:
+                self._clients[name] = client
+                self._locks[name] = threading.Lock()
+
+    ###################
+    # Check out a healthy, connected session for one router
+    ###################
+    @contextmanager
+    def session(self, name):
+        client = self.clients([name])[name]
+
+        with self._locks[name]:
+            if not client.is_alive():
+                client.close()
+                client.connect()
+
+            try:
+                yield client
+            finally:
+                self._last_used[name] = time.monotonic()
+
+    ###################
+    # Close sessions that have not been used for idle_timeout seconds
+    ###################
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            created = dict(self._clients)
+        for name, client in created.items():
+            last = self._last_used.get(name)
+            if last is None or now - last < self._idle_timeout:
+                continue
+
+            lock = self._locks[name]
+            if not lock.acquire(blocking=False):
+                continue                    # in use right now
+            try:
+                client.close()
+                self._last_used.pop(name, None)
+            finally:
+                lock.release()
+
+    ###################
+    # Background thread running evict_idle periodically
+    ###################
+    def start_reaper(self, interval: int | None = None):
+        if self._reaper or self._idle_timeout <= 0:
+            return
+
+        interval = interval or max(1, min(self._idle_timeout, 30))
+
+        def _loop():
+            while not self._stop.wait(interval):
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=_loop, daemon=True)
+        self._reaper.start()
+
+    def close_all(self):
+        self._stop.set()
+        with self._lock:
+            created = dict(self._clients)
+        for name, client in created.items():
+            with self._locks[name]:
+                client.close()
+        self._last_used.clear()
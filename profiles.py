@@ -0,0 +1,148 @@
+# -----------------------------------------
+# SSH transport profiles (compression, algorithms, window, keepalive)
+# -----------------------------------------
+
+import os
+from dataclasses import dataclass, replace
+
+import paramiko
+
+from units import parse_size
+
+
+@dataclass(frozen=True)
+class TransportProfile:
+    """
+    SSH transport tuning for one class of links. None keeps paramiko's
+    default. ciphers/kex are preference orders; algorithms the router
+    does not offer are skipped during negotiation.
+    """
+    name: str
+    compress: bool = False
+    ciphers: tuple = None
+    kex: tuple = None
+    window_size: int = None
+    max_packet_size: int = None
+    keepalive: int = None
+
+    def transport_factory(self, sock, **kwargs):
+        """
+        Builds the paramiko Transport for SSHClient.connect.
+        """
+        if self.window_size:
+            kwargs["default_window_size"] = self.window_size
+        if self.max_packet_size:
+            kwargs["default_max_packet_size"] = self.max_packet_size
+        transport = paramiko.Transport(sock, **kwargs)
+
+        options = transport.get_security_options()
+        if self.ciphers:
+            options.ciphers = _preferred(self.ciphers, options.ciphers)
+        if self.kex:
+            options.kex = _preferred(self.kex, options.kex)
+        return transport
+
+    def describe(self):
+        parts = ["compress" if self.compress else "no-compress"]
+        if self.window_size:
+            parts.append(f"window={self.window_size // 1024}KiB")
+        if self.ciphers:
+            parts.append(f"cipher={self.ciphers[0]}")
+        if self.keepalive is not None:
+            parts.append(f"keepalive={self.keepalive}s")
+        return " ".join(parts)
+
+
+def _preferred(order, supported):
+    """
+    Puts the preferred algorithms first, keeping the rest as fallbacks.
+    """
+    first = [a for a in order if a in supported]
+    return tuple(first + [a for a in supported if a not in first])
+
+
+# Fast AEAD/CTR ciphers first; the cipher is rarely the bottleneck on a
+# slow link, but CBC and 3DES cost router CPU
+_FAST_CIPHERS = ("aes128-gcm@openssh.com", "aes128-ctr", "aes256-gcm@openssh.com")
+
+PROFILES = {
+    "default": TransportProfile("default"),
+    # Low latency: compression costs more CPU than it saves
+    "lan": TransportProfile("lan", ciphers=_FAST_CIPHERS),
+    # Long-RTT links: a large window keeps data in flight, compression
+    # shrinks the very repetitive print output
+    "wan": TransportProfile("wan", compress=True, ciphers=_FAST_CIPHERS,
+                            window_size=8 * 1024 ** 2, keepalive=15),
+    # Satellite/LTE: even larger window, frequent keepalives against NAT
+    # and carrier idle timeouts
+    "satellite": TransportProfile("satellite", compress=True,
+                                  ciphers=_FAST_CIPHERS,
+                                  window_size=32 * 1024 ** 2, keepalive=10),
+}
+
+
+###################
+# Profiles from the environment
+###################
+def parse_profile(name, spec, base=None):
+    """
+    Parses "compress=yes window=16MiB ciphers=aes128-ctr:aes256-ctr
+    kex=curve25519-sha256 packet=32KiB keepalive=20 base=wan" (spaces or
+    commas between settings) into a profile. Raises ValueError.
+    """
+    settings = {}
+    for item in spec.replace(",", " ").split():
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Profile {name}: expected key=value, got {item}")
+        settings[key] = value
+
+    base_name = settings.pop("base", None)
+    if base_name:
+        if base_name not in (base or PROFILES):
+            raise ValueError(f"Profile {name}: unknown base profile {base_name}")
+        profile = replace((base or PROFILES)[base_name], name=name)
+    else:
+        profile = TransportProfile(name)
+
+    fields = {}
+    for key, value in settings.items():
+        if key == "compress":
+            fields["compress"] = value.lower() in ("1", "yes", "true", "on")
+        elif key in ("ciphers", "kex"):
+            fields[key] = tuple(a for a in value.split(":") if a)
+        elif key in ("window", "packet"):
+            size = parse_size(value)
+            if not size:
+                raise ValueError(f"Profile {name}: invalid size {value}")
+            fields["window_size" if key == "window" else "max_packet_size"] = int(size)
+        elif key == "keepalive":
+            if not value.isdigit():
+                raise ValueError(f"Profile {name}: invalid keepalive {value}")
+            fields["keepalive"] = int(value)
+        else:
+            raise ValueError(f"Profile {name}: unknown setting {key}")
+    return replace(profile, **fields)
+
+
+def load_profiles(environ=None):
+    """
+    Built-in profiles plus MT_PROFILE_<NAME>="..." definitions from the
+    environment (names are lower-cased).
+    """
+    environ = os.environ if environ is None else environ
+    profiles = dict(PROFILES)
+    for key, spec in sorted(environ.items()):
+        if key.startswith("MT_PROFILE_") and spec.strip():
+            name = key[len("MT_PROFILE_"):].lower()
+            profiles[name] = parse_profile(name, spec, profiles)
+    return profiles
+
+
+def get_profile(name, profiles=None):
+    profiles = profiles or load_profiles()
+    try:
+        return profiles[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown SSH profile '{name}' "
+                         f"(known: {', '.join(sorted(profiles))})") from None
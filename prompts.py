@@ -0,0 +1,46 @@
+# -----------------------------------------
+# Task prompts: interactive input() or scripted answers
+# -----------------------------------------
+
+import getpass
+import threading
+
+
+# Scripted answers for non-interactive runs (None = interactive)
+_answers = None
+_local = threading.local()
+
+
+def set_answers(answers):
+    """
+    Switches prompts to non-interactive mode. Every router run consumes
+    answers in order; once they run out, prompts get an empty answer,
+    which tasks treat as skip/cancel.
+    """
+    global _answers
+    _answers = list(answers) if answers is not None else None
+
+
+def reset():
+    """
+    Rewinds the scripted answers for the router about to run in this thread.
+    """
+    _local.queue = list(_answers or [])
+
+
+def ask(prompt="", secret=False):
+    """
+    Reads one answer. secret=True hides it: no terminal echo when
+    interactive, and scripted answers are echoed masked.
+    """
+    if _answers is None:
+        return getpass.getpass(prompt) if secret else input(prompt)
+
+    queue = getattr(_local, "queue", None)
+    if queue is None:
+        reset()
+        queue = _local.queue
+
+    answer = queue.pop(0) if queue else ""
+    print(f"{prompt}{'*' * 8 if secret and answer else answer}")
+    return answer
@@ -1,30 +1,36 @@
-from tasks.misc1_2 import task_system_info, task_package_updates
-from tasks.misc3_13 import task_reboot_router, task_ssh_shell, task_scheduler, task_import_ssh_keys, task_create_user, task_services, task_system_logs, task_ip_addresses, task_firewall_rules, task_interfaces_status, task_backup_config
-from tasks.misc13_23 import task_backup_restore, task_interface_traffic, task_dhcp_leases, task_routes, task_firewall_manage, task_vpn_status, task_queue_status, task_user_audit, task_time_ntp, task_arp_neighbor
-from tasks.misc24_34 import task_bandwidth_accounting, task_hotspot_users, task_dns_cache, task_logs_export, task_certificates, task_bandwidth_test, task_capsman_status, task_netwatch, task_snmp_status, task_script_management, task_queue_tree, task_traffic_flow, task_vpn_user_management
+from tasks.misc1_2 import task_system_info, task_package_updates, rows_system_info
+from tasks.misc3_13 import task_reboot_router, task_ssh_shell, task_scheduler, task_import_ssh_keys, task_create_user, task_services, task_system_logs, task_ip_addresses, task_firewall_rules, rows_firewall_rules, task_interfaces_status, task_backup_config, task_archive_export, rows_interfaces_status
+from tasks.misc13_23 import task_backup_restore, task_interface_traffic, task_dhcp_leases, task_routes, task_firewall_manage, task_vpn_status, task_queue_status, task_user_audit, task_time_ntp, task_arp_neighbor, rows_queue_status, rows_interface_traffic, rows_vpn_status, task_dhcp_bulk_cleanup, setup_dhcp_bulk_cleanup
+from tasks.misc24_34 import task_bandwidth_accounting, task_hotspot_users, task_dns_cache, task_logs_export, task_certificates, task_bandwidth_test, task_capsman_status, task_netwatch, task_snmp_status, task_script_management, task_queue_tree, task_traffic_flow, task_vpn_user_management, rows_certificates
 
 
 TASKS = {
-    1: {"name": "Show system information", "func": task_system_info},
+    1: {"name": "Show system information", "func": task_system_info, "read_only": True,
+        "rows": rows_system_info, "columns": ["router", "identity", "cpu-load", "free-memory", "total-memory", "uptime", "version", "board-name"]},
     2: {"name": "Check & install RouterOS updates", "func": task_package_updates},
     3: {"name": "Create user", "func": task_create_user},
     4: {"name": "Import SSH keys for a user", "func": task_import_ssh_keys},
     5: {"name": "Backup Configuration", "func": task_backup_config},
-    6: {"name": "Check Interface Status", "func": task_interfaces_status},
+    6: {"name": "Check Interface Status", "func": task_interfaces_status, "read_only": True,
+        "rows": rows_interfaces_status, "columns": ["router", "name", "type", "status", "ips"]},
     7: {"name": "Reboot System", "func": task_reboot_router},
-    8: {"name": "Firewall Rules", "func": task_firewall_rules},
-    9: {"name": "IP Addresses", "func": task_ip_addresses},
-    10: {"name": "System Logs", "func": task_system_logs},
+    8: {"name": "Firewall Rules", "func": task_firewall_rules, "read_only": True,
+        "rows": rows_firewall_rules, "columns": ["router", "position", "chain", "action", "disabled", "packets", "bytes", "comment"]},
+    9: {"name": "IP Addresses", "func": task_ip_addresses, "read_only": True},
+    10: {"name": "System Logs", "func": task_system_logs, "read_only": True},
     11: {"name": "Manage Services", "func": task_services},
-    12: {"name": "Scheduled Tasks", "func": task_scheduler},
+    12: {"name": "Scheduled Tasks", "func": task_scheduler, "read_only": True},
     13: {"name": "Shell", "func": task_ssh_shell},
     14: {"name": "Backup & Restore Config", "func": task_backup_restore},
-    15: {"name": "Interface Traffic", "func": task_interface_traffic},
+    15: {"name": "Interface Traffic", "func": task_interface_traffic, "read_only": True,
+         "rows": rows_interface_traffic, "columns": ["router", "name", "rx-bits-per-second", "tx-bits-per-second", "rx-packets-per-second", "tx-packets-per-second"]},
     16: {"name": "DHCP Lease Management", "func": task_dhcp_leases},
     17: {"name": "Routing Table & Ping", "func": task_routes},
     18: {"name": "Firewall Management", "func": task_firewall_manage},
-    19: {"name": "VPN / Tunnel Status", "func": task_vpn_status},
-    20: {"name": "Queue / QoS Status", "func": task_queue_status},
+    19: {"name": "VPN / Tunnel Status", "func": task_vpn_status, "read_only": True,
+         "rows": rows_vpn_status, "columns": ["router", "type", "name", "flags", "state", "uptime"]},
+    20: {"name": "Queue / QoS Status", "func": task_queue_status, "read_only": True,
+         "rows": rows_queue_status, "columns": ["router", "name", "flags", "target", "max-limit", "rate", "bytes"]},
     21: {"name": "User Audit", "func": task_user_audit},
     22: {"name": "Time & NTP Management", "func": task_time_ntp},
     23: {"name": "ARP / Neighbor Inspection", "func": task_arp_neighbor},
@@ -32,13 +38,37 @@ TASKS = {
     25: {"name": "Hotspot Users", "func": task_hotspot_users},
     26: {"name": "DNS Cache", "func": task_dns_cache},
     27: {"name": "Logs Export", "func": task_logs_export},
-    28: {"name": "Certificates Management", "func": task_certificates},
+    28: {"name": "Certificates Management", "func": task_certificates,
+         "rows": rows_certificates, "columns": ["router", "name", "flags", "common-name", "invalid-after", "expires-after"]},
     29: {"name": "Bandwidth Test", "func": task_bandwidth_test},
-    30: {"name": "CAPsMAN Status", "func": task_capsman_status},
+    30: {"name": "CAPsMAN Status", "func": task_capsman_status, "read_only": True},
     31: {"name": "Netwatch Hosts", "func": task_netwatch},
     32: {"name": "SNMP Status", "func": task_snmp_status},
     33: {"name": "Script Management", "func": task_script_management},
-    34: {"name": "Queue Tree Status", "func": task_queue_tree},
-    35: {"name": "Traffic Flow Info", "func": task_traffic_flow},
+    34: {"name": "Queue Tree Status", "func": task_queue_tree, "read_only": True},
+    35: {"name": "Traffic Flow Info", "func": task_traffic_flow, "read_only": True},
     36: {"name": "VPN User Management", "func": task_vpn_user_management},
+    37: {"name": "Archive Config Export (local)", "func": task_archive_export, "read_only": True},
+    38: {"name": "Bulk DHCP Lease Cleanup", "func": task_dhcp_bulk_cleanup, "setup": setup_dhcp_bulk_cleanup},
 }
+
+
+###################
+# Stable task names for non-interactive use (task_system_info -> system_info)
+###################
+def task_key(task):
+    return task["func"].__name__.removeprefix("task_")
+
+
+def find_task(name):
+    """
+    Resolves a task by stable name (e.g. "system_info") or menu number.
+    Returns None if there is no such task.
+    """
+    if str(name).isdigit():
+        return TASKS.get(int(name))
+
+    for task in TASKS.values():
+        if task_key(task) == name:
+            return task
+    return None
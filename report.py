@@ -0,0 +1,199 @@
+# -----------------------------------------
+# Fleet-wide aggregated reports for read-only tasks
+# -----------------------------------------
+
+import csv
+import fnmatch
+import json
+import re
+import sys
+
+from units import to_number
+
+
+REPORT_FORMATS = ("table", "ndjson", "json", "csv")
+
+_FILTER = re.compile(r"^\s*([\w.\-]+)\s*(>=|<=|!=|>|<|=|~)\s*(.*?)\s*$")
+
+
+###################
+# Filters: key>50, key<=1GiB, key=ether*, key!=bridge, key~regex
+###################
+def parse_filter(expr):
+    """
+    Compiles a filter expression into a predicate over row dicts.
+    Comparisons are numeric when both sides parse as numbers (units such
+    as %, MiB, Mbps and 1d2h are understood), otherwise textual.
+    """
+    m = _FILTER.match(expr)
+    if not m:
+        raise ValueError(f"Invalid filter: {expr}")
+
+    key, op, wanted = m.groups()
+    wanted_num = to_number(wanted)
+
+    if op == "~":
+        pattern = re.compile(wanted)
+        return lambda row: pattern.search(str(row.get(key, ""))) is not None
+    if op == "=":
+        return lambda row: fnmatch.fnmatchcase(str(row.get(key, "")), wanted)
+    if op == "!=":
+        return lambda row: not fnmatch.fnmatchcase(str(row.get(key, "")), wanted)
+
+    def _compare(row):
+        value = row.get(key)
+        if value is None:
+            return False
+        left = to_number(value)
+        if left is not None and wanted_num is not None:
+            a, b = left, wanted_num
+        else:
+            a, b = str(value), wanted
+        return {">": a > b, "<": a < b, ">=": a >= b, "<=": a <= b}[op]
+
+    return _compare
+
+
+def sort_key(key):
+    """
+    Sort key for a column: numbers first (by value), then text, then
+    missing values.
+    """
+    def _key(row):
+        value = row.get(key)
+        if value is None or value == "":
+            return (2, 0, "")
+        number = to_number(value)
+        if number is not None:
+            return (0, number, "")
+        return (1, 0, str(value))
+
+    return _key
+
+
+def sort_rows(rows, spec):
+    """
+    spec is a comma-separated list of columns, "-" prefix for descending.
+    """
+    rows = list(rows)
+    for column in reversed([c.strip() for c in spec.split(",") if c.strip()]):
+        reverse = column.startswith("-")
+        column = column.lstrip("-")
+        # Keep missing values last in both directions
+        present = [r for r in rows if r.get(column) not in (None, "")]
+        missing = [r for r in rows if r.get(column) in (None, "")]
+        rows = sorted(present, key=sort_key(column), reverse=reverse) + missing
+    return rows
+
+
+###################
+# Aggregated report
+###################
+class Report:
+    """
+    Collects rows from many routers. Rows are written incrementally as
+    each router responds; sorted output (and json) is produced by close().
+    """
+
+    def __init__(self, columns=None, filters=(), sort=None, fmt="table",
+                 stream=None, width=18):
+        self.columns = list(columns) if columns else None
+        self.filters = [parse_filter(f) if isinstance(f, str) else f
+                        for f in filters]
+        self.sort = sort
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.width = width
+        self.rows = []
+        self.errors = {}
+        self._header_done = False
+        self._csv = None
+
+    def _columns_for(self, rows):
+        if self.columns is None:
+            self.columns = ["router"]
+            for row in rows:
+                for key in row:
+                    if key not in self.columns:
+                        self.columns.append(key)
+        return self.columns
+
+    def _matches(self, row):
+        return all(f(row) for f in self.filters)
+
+    def _format_line(self, row):
+        cells = []
+        for col in self.columns:
+            value = str(row.get(col, ""))
+            if len(value) > self.width:
+                value = value[:self.width - 1] + "…"
+            cells.append(f"{value:<{self.width}}")
+        return " ".join(cells).rstrip()
+
+    def _write_header(self):
+        if self.fmt == "table":
+            self.stream.write(self._format_line(
+                {c: c.upper() for c in self.columns}) + "\n")
+            self.stream.write("-" * ((self.width + 1) * len(self.columns))
+                              + "\n")
+        elif self.fmt == "csv":
+            self._csv = csv.DictWriter(self.stream, fieldnames=self.columns,
+                                       extrasaction="ignore")
+            self._csv.writeheader()
+        self._header_done = True
+
+    def _emit(self, row):
+        if self.fmt == "table":
+            self.stream.write(self._format_line(row) + "\n")
+        elif self.fmt == "csv":
+            self._csv.writerow(row)
+        elif self.fmt == "ndjson":
+            self.stream.write(
+                json.dumps({c: row.get(c) for c in self.columns}) + "\n")
+
+    ###################
+    # Add one router's rows (or its error)
+    ###################
+    def add(self, router, rows, error=None):
+        if error:
+            self.errors[router] = error
+            return
+
+        rows = [{"router": router, **row} for row in rows or []]
+        rows = [r for r in rows if self._matches(r)]
+        self.rows.extend(rows)
+        if not rows:
+            return
+
+        self._columns_for(rows)
+        if self.sort or self.fmt == "json":
+            # Emitted sorted in close(); show progress meanwhile
+            print(f"  {router}: {len(rows)} rows", file=sys.stderr)
+            return
+
+        if not self._header_done:
+            self._write_header()
+        for row in rows:
+            self._emit(row)
+        self.stream.flush()
+
+    def close(self):
+        if self.fmt == "json":
+            rows = sort_rows(self.rows, self.sort) if self.sort else self.rows
+            json.dump([{c: r.get(c) for c in self.columns or []} for r in rows],
+                      self.stream, indent=2)
+            self.stream.write("\n")
+        elif self.sort and self.rows:
+            self._write_header()
+            for row in sort_rows(self.rows, self.sort):
+                self._emit(row)
+
+        if self.fmt == "table":
+            self.stream.write(f"\n{len(self.rows)} rows from "
+                              f"{len({r['router'] for r in self.rows})} routers")
+            if self.errors:
+                self.stream.write(f", {len(self.errors)} failed")
+            self.stream.write("\n")
+            for router, error in sorted(self.errors.items()):
+                self.stream.write(f"  {router}: {error}\n")
+        self.stream.flush()
@@ -1,23 +1,69 @@
+from cache import TTLCache
 from client import MikroTikClient
 from config import (
-    ROUTERS,
     MT_USERNAME,
     MT_PASSWORD,
     MT_SSH_PORT,
     MT_SSH_KEY,
+    MT_SSH_KEY_PASSPHRASE,
+    MT_SSH_AGENT,
+    MT_SSH_KEEPALIVE,
+    MT_SSH_PROFILE,
+    MT_TRANSPORT,
+    MT_API_PORT,
+    MT_CACHE_TTL,
+    MT_CACHE_SIZE,
+    ConfigError,
+    get_router_env,
 )
+from inventory import get_inventory
+from profiles import get_profile, load_profiles
 
+# Read-only results shared by every client of this process
+RESULT_CACHE = TTLCache(ttl=MT_CACHE_TTL, maxsize=MT_CACHE_SIZE)
 
-def get_router_clients():
-    clients = {}
 
-    for name, ip in ROUTERS.items():
-        clients[name] = MikroTikClient(
-            host=ip,
-            username=MT_USERNAME,
-            password=MT_PASSWORD,
-            port=MT_SSH_PORT,
-            ssh_key=MT_SSH_KEY,
-        )
+def make_client(router, profiles=None):
+    """
+    A client for one inventory router. Settings come from the inventory
+    entry, then MT_ROUTER_<NAME>_<KEY> overrides, then the global defaults.
+    """
+    name = router.name
+    username = router.username or MT_USERNAME
+    if not username:
+        raise ConfigError(f"No username for router {name} "
+                          f"(set MT_USERNAME or username in the inventory)")
 
-    return clients
+    api_port = router.api_port or get_router_env(name, "API_PORT", MT_API_PORT)
+    return MikroTikClient(
+        host=router.host,
+        username=username,
+        password=router.secret() or MT_PASSWORD,
+        port=router.port or MT_SSH_PORT,
+        ssh_key=router.ssh_key or get_router_env(name, "SSH_KEY", MT_SSH_KEY),
+        ssh_key_passphrase=router.ssh_key_passphrase or get_router_env(
+            name, "SSH_KEY_PASSPHRASE", MT_SSH_KEY_PASSPHRASE
+        ),
+        use_agent=MT_SSH_AGENT,
+        keepalive=MT_SSH_KEEPALIVE,
+        transport=(router.transport
+                   or get_router_env(name, "TRANSPORT", MT_TRANSPORT)).lower(),
+        api_port=int(api_port) if api_port else None,
+        cache=RESULT_CACHE,
+        profile=get_profile(
+            router.profile or get_router_env(name, "PROFILE", MT_SSH_PROFILE),
+            profiles,
+        ),
+    )
+
+
+def get_router_clients(selection=None):
+    """
+    Clients for the routers picked by selection: a selection expression
+    (see Inventory.select) or a list of names; all routers if empty. Only
+    the selected routers get a client. Raises ValueError on unknown names.
+    """
+    inventory = get_inventory()
+    profiles = load_profiles()
+    return {name: make_client(inventory[name], profiles)
+            for name in inventory.resolve(selection)}
@@ -0,0 +1,252 @@
+# -----------------------------------------
+# Fleet runner: execute a task across many routers
+# -----------------------------------------
+
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import scanner
+from config import MT_PRESCAN_TIMEOUT_MS
+from health import get_tracker
+
+
+###################
+# stdout proxy that buffers print() output per worker thread
+###################
+class _ThreadLocalStdout:
+    """
+    Wraps the real stdout. Threads that called begin() write into their own
+    buffer, every other thread writes straight through.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def begin(self):
+        self._local.buffer = io.StringIO()
+
+    def end(self):
+        buffer = getattr(self._local, "buffer", None)
+        self._local.buffer = None
+        return buffer.getvalue() if buffer else ""
+
+    def write(self, data):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(data)
+        return self._stream.write(data)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+###################
+# One-shot session: connect, yield, always close
+###################
+@contextmanager
+def connected(client):
+    try:
+        client.connect()                     # establish SSH session
+        yield client
+    finally:
+        client.close()                       # enforce session cleanup
+
+
+###################
+# Run a task on one router and return a result record
+###################
+def run_one(task, name, session, capture=False, stdout=None, health=None):
+    """
+    Opens a session via the session() context manager and runs the task
+    payload. Returns a dict with router, ok, error, elapsed, captured
+    output and the payload's return value as data. Connect outcomes are
+    reported to the health tracker, task errors are not.
+    """
+    if capture:
+        stdout.begin()
+
+    result = {"router": name, "ok": True, "error": None, "elapsed": 0.0,
+              "data": None}
+    start = time.monotonic()
+    session_open = False
+    try:
+        with session() as client:
+            session_open = True
+            if health:
+                # Only a fresh connect is a latency sample
+                latency, client.connect_time = client.connect_time, None
+                health.record_success(name, latency)
+            result["data"] = task["func"](client, name)   # run task payload
+    except Exception as e:
+        result["ok"] = False
+        result["error"] = str(e)
+        print(f"Error on {name}: {e}")
+        if health and not session_open:
+            health.record_failure(name, e)
+    finally:
+        result["elapsed"] = time.monotonic() - start
+        result["output"] = stdout.end() if capture else ""
+
+    return result
+
+
+def _session_for(name, client, pool):
+    if pool is not None:
+        return lambda: pool.session(name)
+    return lambda: connected(client)
+
+
+###################
+# Skip routers with an open circuit or whose port does not answer
+###################
+def _failed(name, error):
+    return {"router": name, "ok": False, "elapsed": 0.0, "data": None,
+            "output": "", "error": error}
+
+
+def _preflight(selected_clients, timeout, health):
+    """
+    Returns (clients worth connecting to, result records for the rest).
+    Remaining clients get a connect timeout tuned to their history.
+    """
+    skipped = []
+    if health:
+        allowed = {}
+        for name, client in selected_clients.items():
+            ok, reason = health.allow(name)
+            if ok:
+                client.connect_timeout = health.connect_timeout(
+                    name, client.timeout)
+                allowed[name] = client
+            else:
+                skipped.append(_failed(name, f"skipped: {reason}"))
+        selected_clients = allowed
+
+    if not timeout or not selected_clients:
+        return selected_clients, skipped
+
+    scan = scanner.scan_clients(selected_clients, timeout)
+    for name in selected_clients:
+        if not scan[name]["up"]:
+            error = f"unreachable ({scan[name]['error']})"
+            skipped.append(_failed(name, error))
+            if health:
+                health.record_failure(name, error)
+    reachable = {name: client for name, client in selected_clients.items()
+                 if scan[name]["up"]}
+    return reachable, skipped
+
+
+###################
+# Run a task on all selected routers, in parallel when allowed
+###################
+def run_on_routers(
+    task, selected_clients, max_workers=1, on_result=None, pool=None,
+    capture=False, prescan=MT_PRESCAN_TIMEOUT_MS / 1000, health=None,
+):
+    """
+    Executes task on every selected router.
+
+    With max_workers > 1 routers run concurrently; each router's output is
+    buffered and handed to on_result as one block once that router is done.
+    With max_workers == 1 routers run one by one in the calling thread so
+    that interactive prompts keep working.
+
+    capture=True buffers output even when running one router at a time.
+
+    If a SessionPool is given, sessions are checked out of it and stay
+    open afterwards; otherwise every router gets a fresh connection.
+
+    Routers whose SSH/API port does not accept a TCP connection within
+    prescan seconds fail right away instead of each waiting for the
+    connect timeout (0 disables the scan). Routers whose circuit breaker
+    is open are skipped; health defaults to the shared tracker.
+
+    Returns the list of result dicts in completion order.
+    """
+    on_result = on_result or print_result
+    health = health or get_tracker()
+    try:
+        return _run_on_routers(task, selected_clients, max_workers,
+                               on_result, pool, capture, prescan, health)
+    finally:
+        if health:
+            health.save()
+
+
+def _run_on_routers(task, selected_clients, max_workers, on_result, pool,
+                    capture, prescan, health):
+    selected_clients, results = _preflight(selected_clients, prescan, health)
+
+    if not capture and (max_workers <= 1 or len(selected_clients) <= 1):
+        for result in results:
+            print(f"--- {result['router']} ---")
+            print(f"Error on {result['router']}: {result['error']}")
+        for name, client in selected_clients.items():
+            print(f"--- {name} ---")
+            session = _session_for(name, client, pool)
+            result = run_one(task, name, session, health=health)
+            results.append(result)
+        return results
+
+    for result in results:
+        on_result(result)
+
+    stdout = _ThreadLocalStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [
+                executor.submit(
+                    run_one, task, name,
+                    _session_for(name, client, pool), True, stdout, health,
+                )
+                for name, client in selected_clients.items()
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                on_result(result)
+    finally:
+        sys.stdout = stdout._stream
+
+    return results
+
+
+###################
+# Print one buffered router block
+###################
+def print_result(result):
+    print(f"--- {result['router']} ---")
+    output = result.get("output", "")
+    if output:
+        print(output.rstrip("\n"))
+
+
+###################
+# Print per-router success/failure/latency summary
+###################
+def print_summary(results):
+    if not results:
+        return
+
+    ok = sum(1 for r in results if r["ok"])
+    width = max(len(r["router"]) for r in results) + 2
+
+    print("\nSummary:")
+    for r in sorted(results, key=lambda r: r["router"]):
+        status = "OK" if r["ok"] else "FAIL"
+        line = f"  {r['router']:<{width}} {status:<5} {r['elapsed']:7.2f}s"
+        if r["error"]:
+            line += f"  {r['error']}"
+        print(line)
+    print(f"\n  {ok}/{len(results)} routers succeeded")
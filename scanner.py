@@ -0,0 +1,156 @@
+# -----------------------------------------
+# TCP reachability pre-scan (non-blocking connects, one deadline)
+# -----------------------------------------
+
+import errno
+import os
+import selectors
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api import API_PORT, API_SSL_PORT
+
+
+# Sockets kept in flight at once (stays well below the fd limit)
+_MAX_OPEN = 512
+# Parallel DNS lookups before a batch (IP literals resolve immediately)
+_MAX_RESOLVERS = 32
+
+
+def service_port(client):
+    """
+    The TCP port a client will connect to: SSH, API or API-SSL.
+    """
+    if client.transport == "ssh":
+        return client.port
+    return client.api_port or (API_SSL_PORT if client.transport == "api-ssl" else API_PORT)
+
+
+def _resolve(host, port):
+    """
+    Returns (getaddrinfo entry, None) or (None, error).
+    """
+    try:
+        return socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0], None
+    except OSError as e:
+        return None, str(e)
+
+
+def _resolve_all(targets):
+    """
+    Resolves every distinct (host, port) up front and in parallel, so slow
+    DNS neither eats the connect deadline nor counts as connect latency.
+    """
+    addresses = {address for _, address in targets}
+    with ThreadPoolExecutor(max_workers=min(_MAX_RESOLVERS, len(addresses) or 1)) as pool:
+        return dict(zip(addresses, pool.map(lambda a: _resolve(*a), addresses)))
+
+
+def _start(info):
+    """
+    Starts a non-blocking connect. Returns (socket, None) or (None, error).
+    """
+    family, kind, proto, _, address = info
+    try:
+        sock = socket.socket(family, kind, proto)
+    except OSError as e:
+        return None, str(e)
+
+    sock.setblocking(False)
+    code = sock.connect_ex(address)
+    if code in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+        return sock, None
+    sock.close()
+    return None, os.strerror(code)
+
+
+def _scan_batch(targets, timeout, results):
+    resolved = _resolve_all(targets)
+    selector = selectors.DefaultSelector()
+    started = time.monotonic()
+    try:
+        for name, address in targets:
+            info, error = resolved[address]
+            sock = None
+            if info:
+                sock, error = _start(info)
+            if sock is None:
+                results[name] = {"up": False, "error": error, "latency": None}
+            else:
+                # Latency runs from this socket's own connect
+                selector.register(sock, selectors.EVENT_WRITE,
+                                  (name, time.monotonic()))
+
+        deadline = started + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                sock = key.fileobj
+                name, connect_started = key.data
+                code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                results[name] = {
+                    "up": code == 0,
+                    "error": None if code == 0 else os.strerror(code),
+                    "latency": round(time.monotonic() - connect_started, 4),
+                }
+                selector.unregister(sock)
+                sock.close()
+
+        # Still pending at the deadline: filtered or host down
+        for key in list(selector.get_map().values()):
+            results[key.data[0]] = {"up": False, "error": f"timeout ({timeout}s)",
+                                    "latency": None}
+            selector.unregister(key.fileobj)
+            key.fileobj.close()
+    finally:
+        selector.close()
+
+
+def scan(targets, timeout=1.5):
+    """
+    Opens TCP connects to all targets ({name: (host, port)}) at once and
+    waits at most timeout seconds in total. Returns {name: {"up", "error",
+    "latency"}}. No data is sent; connections are closed right away.
+    """
+    results = {}
+    items = list(targets.items())
+    for start in range(0, len(items), _MAX_OPEN):
+        _scan_batch(items[start:start + _MAX_OPEN], timeout, results)
+    return results
+
+
+def scan_clients(clients, timeout=1.5):
+    return scan({name: (c.host, service_port(c)) for name, c in clients.items()},
+                timeout)
+
+
+###################
+# Poll one router until its port answers (e.g. after a reboot)
+###################
+def wait_until_up(client, timeout=600, interval=2.0, wait_down=False,
+                  probe_timeout=1.0):
+    """
+    Probes the client's port every interval seconds until it accepts a
+    connection. With wait_down the router must first stop answering (so a
+    reboot that has not started yet is not mistaken for "back up").
+    Returns the seconds waited; raises RuntimeError on timeout.
+    """
+    target = {"router": (client.host, service_port(client))}
+    started = time.monotonic()
+    deadline = started + timeout
+    seen_down = not wait_down
+
+    while time.monotonic() < deadline:
+        probe = time.monotonic()
+        up = scan(target, probe_timeout)["router"]["up"]
+        if not up:
+            seen_down = True
+        elif seen_down:
+            return time.monotonic() - started
+        time.sleep(max(0, interval - (time.monotonic() - probe)))
+
+    state = "up" if not seen_down else "down"
+    raise RuntimeError(f"{client.host} still {state} after {timeout}s")
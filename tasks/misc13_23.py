@@ -2,7 +2,13 @@
 # Additional Advanced MikroTik SSH Tasks
 # -----------------------------------------
 
-
+from changeset import ChangeSet, check_results
+from firewall import fetch_rules
+from leases import LeaseFilter, cleanup
+from parsing import parse_records
+from prompts import ask
+from units import parse_duration
+from traffic import parse_monitor
 
 
 ###################
@@ -10,152 +16,220 @@
 ###################
 def task_backup_restore(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        choice = input(f"{label} Backup or Restore config? (b/r): ").strip().lower()
-        if choice == "b":
-            name = input(f"{label} Enter backup name: ").strip()
-            cmd = f"/system/backup/save name={name}"
-            client.call(cmd)
-            print(f"{label} Backup '{name}' saved successfully.")
-        elif choice == "r":
-            name = input(f"{label} Enter backup name to restore: ").strip()
-            cmd = f"/system/backup/load name={name}"
-            client.call(cmd)
-            print(f"{label} Backup '{name}' restored successfully. Reboot may be required.")
-        else:
-            print(f"{label} Invalid choice, skipping.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    choice = ask(f"{label} Backup or Restore config? (b/r): ").strip().lower()
+    if choice == "b":
+        name = ask(f"{label} Enter backup name: ").strip()
+        cmd = f"/system/backup/save name={name}"
+        client.call(cmd)
+        print(f"{label} Backup '{name}' saved successfully.")
+    elif choice == "r":
+        name = ask(f"{label} Enter backup name to restore: ").strip()
+        cmd = f"/system/backup/load name={name}"
+        client.call(cmd)
+        print(f"{label} Backup '{name}' restored successfully. Reboot may be required.")
+    else:
+        print(f"{label} Invalid choice, skipping.")
+
+###################
+# One monitor-traffic sample per interface as report rows
+###################
+def rows_interface_traffic(client, router_name=None):
+    target = "all"
+    if client.api:
+        target = ",".join(
+            row["name"] for row in client.rows("/interface", ["name", "disabled"])
+            if not row.get("disabled")
+        )
+
+    output = client.call(f"/interface/monitor-traffic {target} once")
+    return [
+        {"name": name, **fields}
+        for block in parse_monitor(output)
+        for name, fields in block.items()
+    ]
 
 ###################
 # Display interface traffic statistics
 ###################
 def task_interface_traffic(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        output = client.call("/interface monitor-traffic all once")
-        print(f"\n{label} Interface Traffic:\n{output}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    output = client.call("/interface monitor-traffic all once")
+    print(f"\n{label} Interface Traffic:\n{output}")
+
+###################
+# Bulk DHCP lease cleanup: filter asked once, applied on every router
+###################
+def setup_dhcp_bulk_cleanup():
+    """
+    Asks for the lease filter once, before the task fans out to routers.
+    """
+    older = ask("Not seen for at least (e.g. 7d, ENTER for any): ").strip()
+    lease_filter = LeaseFilter(
+        status=ask("Lease status (e.g. waiting, ENTER for any): ").strip() or None,
+        older_than=parse_duration(older) if older else None,
+        mac_prefix=ask("MAC prefix (ENTER for any): ").strip() or None,
+        server=ask("DHCP server (ENTER for any): ").strip() or None,
+        hostname=ask("Host name pattern, e.g. android-* (ENTER for any): ").strip() or None,
+    )
+    apply = ask(f"Remove leases matching [{lease_filter}]? (y/N): ").strip().lower() == "y"
+    return {"lease_filter": lease_filter, "apply": apply}
+
+def task_dhcp_bulk_cleanup(client, router_name=None, lease_filter=None, apply=False):
+    label = f"[{router_name}]" if router_name else ""
+    result = cleanup(client, lease_filter or LeaseFilter(), apply)
+    print(f"{label} {result['matched']} of {result['total']} leases matched, "
+          f"{result['removed']} removed")
 
 ###################
 # List DHCP leases and optionally remove one
 ###################
 def task_dhcp_leases(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        leases = client.call("/ip/dhcp-server/lease/print without-paging")
-        print(f"\n{label} DHCP Leases:\n{leases}")
+    leases = client.call("/ip/dhcp-server/lease/print without-paging")
+    print(f"\n{label} DHCP Leases:\n{leases}")
 
-        remove = input(f"{label} Remove a lease? Enter IP or ENTER to skip: ").strip()
-        if remove:
-            cmd = f"/ip/dhcp-server/lease/remove [find address={remove}]"
-            client.call(cmd)
-            print(f"{label} Lease {remove} removed.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    remove = ask(f"{label} Remove a lease? Enter IP or ENTER to skip: ").strip()
+    if remove:
+        cmd = f"/ip/dhcp-server/lease/remove [find address={remove}]"
+        client.call(cmd)
+        print(f"{label} Lease {remove} removed.")
 
 ###################
 # Show routing table and test next-hop connectivity
 ###################
 def task_routes(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        routes = client.call("/ip/route/print detail without-paging")
-        print(f"\n{label} Routing Table:\n{routes}")
+    print(f"\n{label} Routing Table:")
+    for line in client.call_iter("/ip/route/print detail without-paging"):
+        print(line)
 
-        test = input(f"{label} Ping a destination? Enter IP or ENTER to skip: ").strip()
-        if test:
-            result = client.call(f"/ping {test} count=3")
-            print(f"{label} Ping result:\n{result}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    test = ask(f"{label} Ping a destination? Enter IP or ENTER to skip: ").strip()
+    if test:
+        result = client.call(f"/ping {test} count=3")
+        print(f"{label} Ping result:\n{result}")
 
 ###################
 # Display firewall rules and allow interactive enable/disable
 ###################
 def task_firewall_manage(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        rules = client.call("/ip/firewall/filter/print without-paging detail")
-        print(f"\n{label} Firewall Rules:\n{rules}")
-
-        choice = input(f"{label} Enter rule number to enable/disable (ENTER to skip): ").strip()
-        if choice:
-            action = input(f"{label} Enable or Disable rule {choice}? (e/d): ").strip().lower()
-            disabled = "no" if action == "e" else "yes"
-            client.call(f"/ip/firewall/filter/set numbers={choice} disabled={disabled}")
-            print(f"{label} Rule {choice} {'enabled' if action=='e' else 'disabled'}.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    rules = fetch_rules(client)
+    print(f"\n{label} Firewall Rules:")
+    for r in rules:
+        flags = ("X" if r.disabled else "") + ("D" if r.dynamic else "")
+        print(f"{r.position:<3} {flags:<2} {r.packets:>12} {r.describe()}")
+
+    choice = ask(f"{label} Enter rule numbers to enable/disable, comma-separated (ENTER to skip): ").strip()
+    if choice:
+        numbers = [n.strip() for n in choice.split(",")]
+        bad = [n for n in numbers if not n.isdigit() or int(n) >= len(rules)]
+        if bad:
+            print(f"{label} No rule {', '.join(bad)}, skipping.")
+            return
+        action = ask(f"{label} Enable or Disable rules {choice}? (e/d): ").strip().lower()
+        disabled = "no" if action == "e" else "yes"
+        # Print numbers are per session; address rules by .id
+        changes = ChangeSet().extend(
+            f"/ip/firewall/filter/set numbers={rules[int(n)].id} disabled={disabled}"
+            for n in numbers)
+        results = changes.apply(client)
+        for n, result in zip(numbers, results):
+            print(f"{label} Rule {n}: {'enabled' if action == 'e' else 'disabled'}"
+                  if result["status"] == "ok" else f"{label} Rule {n}: {result['status']}")
+        return check_results(results)
 
 ###################
 # Show active VPN / tunnels: WireGuard, IPsec, ZeroTier
 ###################
 def task_vpn_status(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        wg = client.call("/interface/wireguard/print detail without-paging")
-        print(f"\n{label} WireGuard Interfaces:\n{wg}")
-        ipsec = client.call("/ip/ipsec/active-peers/print detail without-paging")
-        print(f"\n{label} IPsec Active Peers:\n{ipsec}")
-        zerotier = client.call("/interface/zerotier-one/print detail without-paging")
-        print(f"\n{label} ZeroTier Interfaces:\n{zerotier}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    sections = {
+        "WireGuard Interfaces": "/interface/wireguard/print detail without-paging",
+        "IPsec Active Peers": "/ip/ipsec/active-peers/print detail without-paging",
+        "ZeroTier Interfaces": "/interface/zerotier-one/print detail without-paging",
+    }
+    # A missing package (usually zerotier) only costs its own section
+    outputs = client.call_many(sections.values(), errors=True)
+    for title, output in zip(sections, outputs):
+        print(f"\n{label} {title}:\n{output}")
+    if all(isinstance(o, Exception) for o in outputs):
+        raise outputs[0]
+
+###################
+# VPN interfaces and IPsec peers as report rows
+###################
+_VPN_MENUS = (
+    ("wireguard", "/interface/wireguard/print detail without-paging", "name"),
+    ("ipsec", "/ip/ipsec/active-peers/print detail without-paging", "remote-address"),
+    ("zerotier", "/interface/zerotier-one/print detail without-paging", "name"),
+)
+
+def rows_vpn_status(client, router_name=None):
+    rows = []
+    for vpn_type, command, key in _VPN_MENUS:
+        try:
+            output = client.call(command)
+        except RuntimeError:
+            continue                        # package not installed
+        for r in parse_records(output):
+            rows.append({"type": vpn_type, "name": r.get(key, r.index),
+                         "flags": r.flags, **r.fields})
+    return rows
+
+###################
+# Simple queues as report rows
+###################
+def rows_queue_status(client, router_name=None):
+    output = client.call("/queue/simple/print without-paging detail")
+    return [
+        {"name": r.get("name", r.index), "flags": r.flags, **r.fields}
+        for r in parse_records(output)
+    ]
 
 ###################
 # Display simple queue / QoS status
 ###################
 def task_queue_status(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        queues = client.call("/queue/simple/print without-paging detail")
-        print(f"\n{label} Queue Status:\n{queues}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    queues = client.call("/queue/simple/print without-paging detail")
+    print(f"\n{label} Queue Status:\n{queues}")
 
 ###################
 # List users and optionally disable inactive ones
 ###################
 def task_user_audit(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        users = client.call("/user/print detail without-paging")
-        print(f"\n{label} Users:\n{users}")
-        disable = input(f"{label} Disable a user? Enter name or ENTER to skip: ").strip()
-        if disable:
-            client.call(f"/user/set [find name={disable}] disabled=yes")
-            print(f"{label} User {disable} disabled.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    users = client.call("/user/print detail without-paging")
+    print(f"\n{label} Users:\n{users}")
+    disable = ask(f"{label} Disable a user? Enter name or ENTER to skip: ").strip()
+    if disable:
+        client.call(f"/user/set [find name={disable}] disabled=yes")
+        print(f"{label} User {disable} disabled.")
 
 ###################
 # Show system clock, NTP status, and optionally sync time
 ###################
 def task_time_ntp(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        time = client.call("/system/clock/print detail without-paging")
-        ntp = client.call("/system/ntp/client/print detail without-paging")
-        print(f"\n{label} System Clock:\n{time}")
-        print(f"\n{label} NTP Client:\n{ntp}")
-        sync = input(f"{label} Sync time with NTP servers? (y/n): ").strip().lower()
-        if sync == "y":
-            client.call("/system/ntp/client/sync")
-            print(f"{label} Time synchronized.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    time, ntp = client.call_many([
+        "/system/clock/print detail without-paging",
+        "/system/ntp/client/print detail without-paging",
+    ])
+    print(f"\n{label} System Clock:\n{time}")
+    print(f"\n{label} NTP Client:\n{ntp}")
+    sync = ask(f"{label} Sync time with NTP servers? (y/n): ").strip().lower()
+    if sync == "y":
+        client.call("/system/ntp/client/sync")
+        print(f"{label} Time synchronized.")
 
 ###################
 # Display ARP table and neighbors
 ###################
 def task_arp_neighbor(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        arp = client.call("/ip/arp/print detail without-paging")
-        neighbor = client.call("/ip/neighbor/print detail without-paging")
-        print(f"\n{label} ARP Table:\n{arp}")
-        print(f"\n{label} Neighbors:\n{neighbor}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    arp, neighbor = client.call_many([
+        "/ip/arp/print detail without-paging",
+        "/ip/neighbor/print detail without-paging",
+    ])
+    print(f"\n{label} ARP Table:\n{arp}")
+    print(f"\n{label} Neighbors:\n{neighbor}")
@@ -2,8 +2,23 @@
 # Advanced MikroTik SSH Management Tasks
 # -----------------------------------------
 
+import upgrade
+from parsing import parse_properties
+from prompts import ask
 
 
+###################
+# Parse /system identity print output
+###################
+def parse_system_identity(output):
+    return parse_properties(output).get("name") or "unknown"
+
+###################
+# Parse /system resource print output into a dictionary
+###################
+def parse_system_resources(output):
+    return parse_properties(output)
+
 ###################
 # Retrieve system identity (router name)
 ###################
@@ -11,13 +26,7 @@ def get_system_identity(client):
     """
     Returns system identity (router name).
     """
-    output = client.call("/system identity print")
-
-    for line in output.splitlines():
-        if "name:" in line:
-            return line.split("name:", 1)[1].strip()
-
-    return "unknown"
+    return parse_system_identity(client.call("/system identity print"))
 
 ###################
 # Retrieve system resources as a dictionary
@@ -26,22 +35,27 @@ def get_system_resources(client):
     """
     Returns system resource info as a dict.
     """
-    output = client.call("/system resource print")
+    return parse_system_resources(client.call("/system resource print"))
 
-    resources = {}
-    for line in output.splitlines():
-        if ":" in line:
-            key, value = line.split(":", 1)
-            resources[key.strip()] = value.strip()
-
-    return resources
+###################
+# System information as a report row (identity plus resources)
+###################
+def rows_system_info(client, router_name=None):
+    identity_out, resources_out = client.call_many([
+        "/system identity print",
+        "/system resource print",
+    ])
+    return [{
+        "identity": parse_system_identity(identity_out),
+        **parse_system_resources(resources_out),
+    }]
 
 ###################
 # Display system information (identity and resources)
 ###################
 def task_system_info(client, router_name=None):
-    identity = get_system_identity(client)
-    resources = get_system_resources(client)
+    resources = rows_system_info(client, router_name)[0]
+    identity = resources.pop("identity")
 
     print(f"\n--- System Info for {identity} ({router_name}) ---\n")
 
@@ -57,26 +71,13 @@ def task_system_info(client, router_name=None):
 ###################
 def check_updates(client):
     """
-    Triggers update check and returns update info as dict.
+    Triggers update check, waits for it to settle and returns update
+    info as dict.
     """
     try:
-        # Trigger update check
-        client.call("/system package update check-for-updates")
-
-        # Fetch update status
-        output = client.call("/system package update print")
-
-        info = {}
-        for line in output.splitlines():
-            if ":" in line:
-                key, value = line.split(":", 1)
-                info[key.strip()] = value.strip()
-
-        return info
-
+        return upgrade.check(client)
     except Exception as e:
-        print(f"Error checking updates: {e}")
-        return {}
+        raise RuntimeError(f"Error checking updates: {e}") from e
 
 ###################
 # Install available package updates
@@ -90,7 +91,7 @@ def install_updates(client):
     try:
         client.call("/system package update install")
     except Exception as e:
-        print(f"Error installing updates: {e}")
+        raise RuntimeError(f"Error installing updates: {e}") from e
 
 ###################
 # Task to display update status and optionally install updates
@@ -115,11 +116,11 @@ def task_package_updates(client, router_name=None):
         print("   Router is already up to date.")
         return
 
-    if "checking" in status.lower():
-        print("   Update check still in progress, try again later.")
+    if not info.get("settled"):
+        print("   Update check did not finish in time, try again later.")
         return
 
-    confirm = input(
+    confirm = ask(
         "\nType YES to install updates (router may reboot): "
     ).strip()
 
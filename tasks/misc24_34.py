@@ -2,21 +2,23 @@
 # Additional Advanced MikroTik SSH Tasks
 # -----------------------------------------
 
+from changeset import ChangeSet, check_results
+from parsing import parse_records
+from prompts import ask
+
+
 ###################
 # Show per-interface bandwidth usage and optionally reset counters
 ###################
 def task_bandwidth_accounting(client, router_name=None):
     """Show per-interface bandwidth usage and reset counters optionally."""
     label = f"[{router_name}]" if router_name else ""
-    try:
-        output = client.call("/interface/monitor-traffic all once")
-        print(f"\n{label} Interface Traffic:\n{output}")
-        reset = input(f"{label} Reset counters? (y/n): ").strip().lower()
-        if reset == "y":
-            client.call("/interface/reset-counters all")
-            print(f"{label} Counters reset successfully.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    output = client.call("/interface/monitor-traffic all once")
+    print(f"\n{label} Interface Traffic:\n{output}")
+    reset = ask(f"{label} Reset counters? (y/n): ").strip().lower()
+    if reset == "y":
+        client.call("/interface/reset-counters all")
+        print(f"{label} Counters reset successfully.")
 
 
 ###################
@@ -24,15 +26,12 @@ def task_bandwidth_accounting(client, router_name=None):
 ###################
 def task_hotspot_users(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        users = client.call("/ip/hotspot/active/print without-paging detail")
-        print(f"\n{label} Hotspot Users:\n{users}")
-        disconnect = input(f"{label} Disconnect user by IP (ENTER to skip): ").strip()
-        if disconnect:
-            client.call(f"/ip/hotspot/active/remove [find address={disconnect}]")
-            print(f"{label} User {disconnect} disconnected.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    users = client.call("/ip/hotspot/active/print without-paging detail")
+    print(f"\n{label} Hotspot Users:\n{users}")
+    disconnect = ask(f"{label} Disconnect user by IP (ENTER to skip): ").strip()
+    if disconnect:
+        client.call(f"/ip/hotspot/active/remove [find address={disconnect}]")
+        print(f"{label} User {disconnect} disconnected.")
 
 
 ###################
@@ -40,15 +39,13 @@ def task_hotspot_users(client, router_name=None):
 ###################
 def task_dns_cache(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        cache = client.call("/ip/dns/cache/print without-paging detail")
-        print(f"\n{label} DNS Cache:\n{cache}")
-        flush = input(f"{label} Flush DNS cache? (y/n): ").strip().lower()
-        if flush == "y":
-            client.call("/ip/dns/cache/flush")
-            print(f"{label} DNS cache flushed.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    print(f"\n{label} DNS Cache:")
+    for line in client.call_iter("/ip/dns/cache/print without-paging detail"):
+        print(line)
+    flush = ask(f"{label} Flush DNS cache? (y/n): ").strip().lower()
+    if flush == "y":
+        client.call("/ip/dns/cache/flush")
+        print(f"{label} DNS cache flushed.")
 
 
 ###################
@@ -56,15 +53,23 @@ def task_dns_cache(client, router_name=None):
 ###################
 def task_logs_export(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        logs = client.call("/log/print without-paging count=50")
-        print(f"\n{label} Recent Logs:\n{logs}")
-        export = input(f"{label} Export logs to file? Enter filename or ENTER to skip: ").strip()
-        if export:
-            client.call(f"/log/save name={export}")
-            print(f"{label} Logs saved as {export}.rsc")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    logs = client.call("/log/print without-paging count=50")
+    print(f"\n{label} Recent Logs:\n{logs}")
+    export = ask(f"{label} Export logs to file? Enter filename or ENTER to skip: ").strip()
+    if export:
+        client.call(f"/log/save name={export}")
+        print(f"{label} Logs saved as {export}.rsc")
+
+
+###################
+# Installed certificates as report rows
+###################
+def rows_certificates(client, router_name=None):
+    output = client.call("/certificate/print without-paging detail")
+    return [
+        {"name": r.get("name", r.index), "flags": r.flags, **r.fields}
+        for r in parse_records(output)
+    ]
 
 
 ###################
@@ -72,15 +77,12 @@ def task_logs_export(client, router_name=None):
 ###################
 def task_certificates(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        certs = client.call("/certificate/print without-paging detail")
-        print(f"\n{label} Certificates:\n{certs}")
-        remove = input(f"{label} Remove certificate by name (ENTER to skip): ").strip()
-        if remove:
-            client.call(f"/certificate/remove [find name={remove}]")
-            print(f"{label} Certificate {remove} removed.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    certs = client.call("/certificate/print without-paging detail")
+    print(f"\n{label} Certificates:\n{certs}")
+    remove = ask(f"{label} Remove certificate by name (ENTER to skip): ").strip()
+    if remove:
+        client.call(f"/certificate/remove [find name={remove}]")
+        print(f"{label} Certificate {remove} removed.")
 
 
 ###################
@@ -88,12 +90,9 @@ def task_certificates(client, router_name=None):
 ###################
 def task_bandwidth_test(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        target = input(f"{label} Enter target IP for bandwidth test: ").strip()
-        result = client.call(f"/tool/bandwidth-test address={target} duration=5s")
-        print(f"{label} Bandwidth Test Result:\n{result}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    target = ask(f"{label} Enter target IP for bandwidth test: ").strip()
+    result = client.call(f"/tool/bandwidth-test address={target} duration=5s")
+    print(f"{label} Bandwidth Test Result:\n{result}")
 
 
 ###################
@@ -101,13 +100,16 @@ def task_bandwidth_test(client, router_name=None):
 ###################
 def task_capsman_status(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        aps = client.call("/caps-man/registration-table/print without-paging detail")
-        print(f"\n{label} CAPsMAN Registered APs:\n{aps}")
-        radios = client.call("/interface/wireless/print without-paging detail")
-        print(f"\n{label} Wireless Radios:\n{radios}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    sections = {
+        "CAPsMAN Registered APs": "/caps-man/registration-table/print without-paging detail",
+        "Wireless Radios": "/interface/wireless/print without-paging detail",
+    }
+    # Routers without CAPsMAN or wireless still show the other section
+    outputs = client.call_many(sections.values(), errors=True)
+    for title, output in zip(sections, outputs):
+        print(f"\n{label} {title}:\n{output}")
+    if all(isinstance(o, Exception) for o in outputs):
+        raise outputs[0]
 
 
 ###################
@@ -115,17 +117,28 @@ def task_capsman_status(client, router_name=None):
 ###################
 def task_netwatch(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        hosts = client.call("/tool/netwatch/print without-paging detail")
-        print(f"\n{label} Netwatch Hosts:\n{hosts}")
-        toggle = input(f"{label} Enable/disable host by number (ENTER to skip): ").strip()
-        if toggle:
-            action = input(f"{label} Enable or Disable? (e/d): ").strip().lower()
-            disabled = "no" if action == "e" else "yes"
-            client.call(f"/tool/netwatch/set numbers={toggle} disabled={disabled}")
-            print(f"{label} Host {toggle} {'enabled' if action=='e' else 'disabled'}.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    hosts, ids = client.call_many([
+        "/tool/netwatch/print without-paging detail",
+        "/tool/netwatch/print terse show-ids without-paging",
+    ])
+    print(f"\n{label} Netwatch Hosts:\n{hosts}")
+    # Several entries can watch the same host; address the chosen one by .id
+    by_number = {r.index: entry.index
+                 for r, entry in zip(parse_records(hosts), parse_records(ids))}
+    toggle = ask(f"{label} Enable/disable hosts by number, comma-separated (ENTER to skip): ").strip()
+    if toggle:
+        action = ask(f"{label} Enable or Disable? (e/d): ").strip().lower()
+        disabled = "no" if action == "e" else "yes"
+        changes = ChangeSet()
+        for number in (n.strip() for n in toggle.split(",")):
+            if number not in by_number:
+                print(f"{label} No host {number}, skipping.")
+                continue
+            changes.add(f"/tool/netwatch/set numbers={by_number[number]} disabled={disabled}")
+        results = changes.apply(client)
+        for result in results:
+            print(f"{label} {result['command']}: {result['status']}")
+        return check_results(results)
 
 
 ###################
@@ -133,16 +146,13 @@ def task_netwatch(client, router_name=None):
 ###################
 def task_snmp_status(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        snmp = client.call("/snmp/print detail without-paging")
-        print(f"\n{label} SNMP Config:\n{snmp}")
-        toggle = input(f"{label} Enable/disable SNMP? (e/d/ENTER to skip): ").strip().lower()
-        if toggle in ["e", "d"]:
-            disabled = "no" if toggle == "e" else "yes"
-            client.call(f"/snmp/set disabled={disabled}")
-            print(f"{label} SNMP {'enabled' if toggle=='e' else 'disabled'}.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    snmp = client.call("/snmp/print detail without-paging")
+    print(f"\n{label} SNMP Config:\n{snmp}")
+    toggle = ask(f"{label} Enable/disable SNMP? (e/d/ENTER to skip): ").strip().lower()
+    if toggle in ["e", "d"]:
+        disabled = "no" if toggle == "e" else "yes"
+        client.call(f"/snmp/set disabled={disabled}")
+        print(f"{label} SNMP {'enabled' if toggle=='e' else 'disabled'}.")
 
 
 ###################
@@ -150,15 +160,12 @@ def task_snmp_status(client, router_name=None):
 ###################
 def task_script_management(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        scripts = client.call("/system/script/print without-paging detail")
-        print(f"\n{label} Scripts:\n{scripts}")
-        run = input(f"{label} Run script by name (ENTER to skip): ").strip()
-        if run:
-            client.call(f"/system/script/run [find name={run}]")
-            print(f"{label} Script {run} executed.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    scripts = client.call("/system/script/print without-paging detail")
+    print(f"\n{label} Scripts:\n{scripts}")
+    run = ask(f"{label} Run script by name (ENTER to skip): ").strip()
+    if run:
+        client.call(f"/system/script/run [find name={run}]")
+        print(f"{label} Script {run} executed.")
 
 
 ###################
@@ -166,11 +173,8 @@ def task_script_management(client, router_name=None):
 ###################
 def task_queue_tree(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        qt = client.call("/queue/tree/print without-paging detail")
-        print(f"\n{label} Queue Tree:\n{qt}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    qt = client.call("/queue/tree/print without-paging detail")
+    print(f"\n{label} Queue Tree:\n{qt}")
 
 
 ###################
@@ -178,11 +182,8 @@ def task_queue_tree(client, router_name=None):
 ###################
 def task_traffic_flow(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        flow = client.call("/tool/traffic-flow/print without-paging detail")
-        print(f"\n{label} Traffic Flow Info:\n{flow}")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    flow = client.call("/tool/traffic-flow/print without-paging detail")
+    print(f"\n{label} Traffic Flow Info:\n{flow}")
 
 
 ###################
@@ -190,12 +191,9 @@ def task_traffic_flow(client, router_name=None):
 ###################
 def task_vpn_user_management(client, router_name=None):
     label = f"[{router_name}]" if router_name else ""
-    try:
-        vpn = client.call("/ppp/active/print without-paging detail")
-        print(f"\n{label} Active VPN Users:\n{vpn}")
-        disconnect = input(f"{label} Disconnect user by name (ENTER to skip): ").strip()
-        if disconnect:
-            client.call(f"/ppp/active/remove [find name={disconnect}]")
-            print(f"{label} VPN user {disconnect} disconnected.")
-    except Exception as e:
-        print(f"{label} Error: {e}")
+    vpn = client.call("/ppp/active/print without-paging detail")
+    print(f"\n{label} Active VPN Users:\n{vpn}")
+    disconnect = ask(f"{label} Disconnect user by name (ENTER to skip): ").strip()
+    if disconnect:
+        client.call(f"/ppp/active/remove [find name={disconnect}]")
+        print(f"{label} VPN user {disconnect} disconnected.")
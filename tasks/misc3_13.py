@@ -6,12 +6,20 @@ import os
 import glob
 import subprocess
 
+import logtail
+import scanner
+from archive import ConfigArchive, export_router
+from changeset import ChangeSet, check_results
+from firewall import analyze, fetch_rules
+from parsing import parse_records, is_yes
+from prompts import ask
+
 
 ###################
 # Reboot the router after confirmation
 ###################
 def task_reboot_router(client, router_name=None, *args, **kwargs):
-    confirm = input(f"{router_name}: Type YES to reboot: ").strip()
+    confirm = ask(f"{router_name}: Type YES to reboot: ").strip()
     if confirm != "YES":
         print(f"{router_name}: Reboot cancelled")
         return
@@ -20,7 +28,11 @@ def task_reboot_router(client, router_name=None, *args, **kwargs):
         client.call("/system reboot")
         print(f"{router_name}: Reboot triggered (SSH session may drop)")
     except Exception as e:
-        print(f"{router_name}: Failed to trigger reboot: {e}")
+        raise RuntimeError(f"Failed to trigger reboot: {e}") from e
+
+    if ask(f"{router_name}: Wait until it is back up? (y/n): ").strip().lower() == "y":
+        waited = scanner.wait_until_up(client, wait_down=True)
+        print(f"{router_name}: Back up after {waited:.0f}s")
 
 ###################
 # Open an interactive SSH shell to the router
@@ -43,7 +55,7 @@ def task_ssh_shell(client, router_name):
     except KeyboardInterrupt:
         print("\nSSH session interrupted by user.")
     except Exception as e:
-        print(f"Failed to open SSH session: {e}")
+        raise RuntimeError(f"Failed to open SSH session: {e}") from e
 
 ###################
 # List all scheduled tasks in RouterOS CLI style
@@ -55,7 +67,7 @@ def task_scheduler(client, router_name=None):
         print(f"\n--- Scheduled Tasks on {router_label} ---\n")
         print(output)
     except Exception as e:
-        print(f"{router_label} Error retrieving scheduler: {e}")
+        raise RuntimeError(f"Error retrieving scheduler: {e}") from e
 
 ###################
 # Import SSH public keys for a given user
@@ -68,15 +80,9 @@ def task_import_ssh_keys(client, router_name=None):
     try:
         users_output = client.call("/user/print detail without-paging")
     except Exception as e:
-        print(f"{label} Failed to fetch users: {e}")
-        return
+        raise RuntimeError(f"Failed to fetch users: {e}") from e
 
-    # Parse users (assuming RouterOS returns key=value format)
-    users = []
-    for line in users_output.splitlines():
-        parts = dict(kv.split("=", 1) for kv in line.split() if "=" in kv)
-        if "name" in parts:
-            users.append(parts["name"])
+    users = [r["name"] for r in parse_records(users_output) if "name" in r]
 
     if not users:
         print(f"{label} No users found on router. Aborting.")
@@ -88,7 +94,7 @@ def task_import_ssh_keys(client, router_name=None):
         print(f"{idx}. {u}")
 
     # Select user by index
-    selection = input(f"{label} Enter user number to import keys for: ").strip()
+    selection = ask(f"{label} Enter user number to import keys for: ").strip()
     if not selection.isdigit() or int(selection) < 1 or int(selection) > len(users):
         print(f"{label} Invalid selection. Aborting.")
         return
@@ -97,7 +103,7 @@ def task_import_ssh_keys(client, router_name=None):
     print(f"{label} Selected user: {username}")
 
     # Ask for folder with .pub keys
-    key_folder = input(f"{label} Enter folder to search for .pub keys (default ~/.ssh/): ").strip() or os.path.expanduser("~/.ssh/")
+    key_folder = ask(f"{label} Enter folder to search for .pub keys (default ~/.ssh/): ").strip() or os.path.expanduser("~/.ssh/")
     if not os.path.exists(key_folder):
         print(f"{label} Folder '{key_folder}' does not exist. Aborting.")
         return
@@ -113,21 +119,32 @@ def task_import_ssh_keys(client, router_name=None):
         print(f"{idx}. {k}")
 
     # Default to first key
-    selected_indices = input(f"{label} Enter comma-separated numbers of keys to import (default first key): ").strip() or "1"
+    selected_indices = ask(f"{label} Enter comma-separated numbers of keys to import (default first key): ").strip() or "1"
     selected_indices = [int(i) for i in selected_indices.split(",") if i.isdigit() and 1 <= int(i) <= len(key_files)]
 
+    # All keys go to the router as one change-set
+    changes = ChangeSet()
+    imported = []
     for i in selected_indices:
         key_file = key_files[i - 1]
         key_path = os.path.join(key_folder, key_file)
         with open(key_path, "r") as f:
             pubkey_content = f.read().strip()
 
-        cmd = f'/user ssh-keys add user={username} public-key="{pubkey_content}"'
-        try:
-            client.call(cmd)
+        changes.add(f'/user ssh-keys add user={username} public-key="{pubkey_content}"')
+        imported.append(key_file)
+
+    try:
+        results = changes.apply(client)
+    except Exception as e:
+        raise RuntimeError(f"Failed to import keys: {e}") from e
+
+    for key_file, result in zip(imported, results):
+        if result["status"] == "ok":
             print(f"{label} Key '{key_file}' imported for user '{username}'")
-        except Exception as e:
-            print(f"{label} Failed to import key '{key_file}': {e}")
+        else:
+            print(f"{label} Failed to import key '{key_file}': {result['output'] or result['status']}")
+    return check_results(results)
 
 
 
@@ -136,23 +153,19 @@ def task_import_ssh_keys(client, router_name=None):
 # Create a new RouterOS user interactively
 ###################
 def task_create_user(client, router_name=None, *args, **kwargs):
-    username = input("Enter new username: ").strip()
+    username = ask("Enter new username: ").strip()
     if not username:
         print(f"{router_name}: Aborted. Username cannot be empty.")
         return
 
-    output = client.call('/user print')
-    existing_users = []
-    for line in output.splitlines():
-        if "name:" in line:
-            name = line.split("name:", 1)[1].strip()
-            existing_users.append(name)
+    output = client.call("/user/print detail without-paging")
+    existing_users = [r["name"] for r in parse_records(output) if "name" in r]
 
     if username in existing_users:
         print(f"{router_name}: User '{username}' already exists")
         return
 
-    password = input(f"Enter password for user '{username}' on {router_name}: ").strip()
+    password = ask(f"Enter password for user '{username}' on {router_name}: ", secret=True).strip()
     if not password:
         print(f"{router_name}: Aborted. Password cannot be empty.")
         return
@@ -163,7 +176,7 @@ def task_create_user(client, router_name=None, *args, **kwargs):
         client.call(cmd)
         print(f"{router_name}: User '{username}' created successfully")
     except Exception as e:
-        print(f"{router_name}: Failed to create user '{username}': {e}")
+        raise RuntimeError(f"Failed to create user '{username}': {e}") from e
 
 ###################
 # Manage RouterOS services (enable/disable) interactively
@@ -175,44 +188,50 @@ def task_services(client, router_name=None):
         output = client.call("/ip/service/print without-paging detail")
         print(f"\n{router_label} Services on Router:\n")
         print(output)
+        names = {r.index: r.get("name") for r in parse_records(output) if "name" in r}
 
+        # Toggles are collected and applied together when done
+        changes = ChangeSet()
         while True:
-            service_id = input(f"\n{router_label} Enter service number to toggle enable/disable (ENTER to finish): ").strip()
+            service_id = ask(f"\n{router_label} Enter service number or name to toggle enable/disable (ENTER to finish): ").strip()
             if not service_id:
                 break
 
-            action = input(f"{router_label} Enable or Disable service {service_id}? (e/d): ").strip().lower()
+            action = ask(f"{router_label} Enable or Disable service {service_id}? (e/d): ").strip().lower()
             if action not in ["e", "d"]:
                 print(f"{router_label} Invalid choice, skipping.")
                 continue
 
             disabled_value = "no" if action == "e" else "yes"
-            cmd = f"/ip/service/set numbers={service_id} disabled={disabled_value}"
-            client.call(cmd)
-            print(f"{router_label} Service {service_id} {'enabled' if action=='e' else 'disabled'} successfully.")
+            # Print numbers mean nothing inside a script; address by name
+            name = names.get(service_id, service_id)
+            changes.add(f'/ip/service/set [find name="{name}"] disabled={disabled_value}')
+
+        results = changes.apply(client)
+        for result in results:
+            status = "applied" if result["status"] == "ok" else f"{result['status']} {result['output']}".rstrip()
+            print(f"{router_label} {result['command']}: {status}")
+        return check_results(results)
 
     except Exception as e:
-        print(f"{router_label} Error managing services: {e}")
+        raise RuntimeError(f"Error managing services: {e}") from e
 
 ###################
-# Fetch and display recent system logs
+# Show the most recent log entries (the "logs" tail cursor is untouched)
 ###################
 def task_system_logs(client, router_name, limit=20, *args, **kwargs):
     try:
-        raw = client.call("/log/print detail without-paging")
-        if isinstance(raw, bytes):
-            raw = raw.decode()
-        lines = raw.splitlines() if isinstance(raw, str) else [str(raw)]
-        if not lines:
-            print(f"{router_name}: No logs found")
-            return
+        entries = logtail.recent(client, limit)
     except Exception as e:
-        print(f"{router_name}: Failed to fetch logs: {e}")
+        raise RuntimeError(f"Failed to fetch logs: {e}") from e
+
+    if not entries:
+        print(f"{router_name}: No log entries")
         return
 
-    print(f"\n--- Recent Logs on {router_name} ---")
-    for line in lines[-limit:]:
-        print(line.strip().strip('"'))
+    print(f"\n--- Last {len(entries)} Logs on {router_name} ---")
+    for entry in entries:
+        print(f"{entry['time']:<20} {entry['topics']:<24} {entry['message']}")
     print("\nTask completed.")
 
 ###################
@@ -220,15 +239,13 @@ def task_system_logs(client, router_name, limit=20, *args, **kwargs):
 ###################
 def task_ip_addresses(client, router_name, *args, **kwargs):
     try:
-        raw = client.call("/ip/address/print detail without-paging")
-        if isinstance(raw, bytes):
-            raw = raw.decode()
-        lines = raw.splitlines()
+        records = list(parse_records(
+            client.call("/ip/address/print detail without-paging")
+        ))
     except Exception as e:
-        print(f"{router_name}: Failed to fetch IP addresses: {e}")
-        return
+        raise RuntimeError(f"Failed to fetch IP addresses: {e}") from e
 
-    if not lines:
+    if not records:
         print(f"{router_name}: No IP addresses found")
         return
 
@@ -236,133 +253,78 @@ def task_ip_addresses(client, router_name, *args, **kwargs):
     print(f"{'FLAGS':<3} {'ADDRESS':<18} : {'NETWORK':<18} : {'INTERFACE':<20} : {'ACTUAL-IF':<20} : COMMENT")
     print("-" * 95)
 
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith("Flags:"):
-            continue
-
-        parts = line.split()
-        flags = ""
-        idx = 0
-        if len(parts) > 1 and parts[1] in ('X', 'I', 'D', 'S'):
-            flags = parts[1]
-            idx = 2
-        else:
-            idx = 1
-
-        comment = ""
-        if ';;;' in line:
-            comment_index = line.index(';;;') + 3
-            comment = line[comment_index:].strip()
+    for r in records:
+        address = r.get('address', '—')
+        network = r.get('network', '—')
+        interface = r.get('interface', '—')
+        actual = r.get('actual-interface', '—')
 
-        kv = {}
-        for token in parts[idx:]:
-            if '=' in token:
-                k, v = token.split('=', 1)
-                kv[k] = v.strip('"')
-
-        address = kv.get('address', '—')
-        network = kv.get('network', '—')
-        interface = kv.get('interface', '—')
-        actual = kv.get('actual-interface', '—')
-
-        print(f"{flags:<3} {address:<18} : {network:<18} : {interface:<20} : {actual:<20} : {comment}")
+        print(f"{r.flags:<3} {address:<18} : {network:<18} : {interface:<20} : {actual:<20} : {r.comment}")
 
     print("\nTask completed.")
 
 ###################
-# Show firewall filter rules with details
+# Firewall filter rules with hit counters as report rows
+###################
+def rows_firewall_rules(client, router_name=None):
+    return [
+        {"position": r.position, "chain": r.chain, "action": r.action,
+         "disabled": "yes" if r.disabled else "no", "packets": r.packets,
+         "bytes": r.bytes, "comment": r.comment,
+         "conditions": " ".join(f"{k}={v}" for k, v in r.matchers.items())}
+        for r in fetch_rules(client)
+    ]
+
+###################
+# Show firewall filter rules with counters and analysis
 ###################
 def task_firewall_rules(client, router_name=None, *args, **kwargs):
     try:
-        raw = client.call('/ip/firewall/filter/print detail without-paging')
-        lines = raw.splitlines() if isinstance(raw, str) else [str(l) for l in raw]
+        rules = fetch_rules(client)
     except Exception as e:
-        print(f"{router_name}: Failed to fetch firewall rules: {e}")
-        return
+        raise RuntimeError(f"Failed to fetch firewall rules: {e}") from e
 
-    if not lines:
+    if not rules:
         print(f"{router_name}: No firewall rules found")
         return
 
     print(f"\n--- Firewall Rules on {router_name} ---")
 
-    for idx, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
+    for r in rules:
+        flags = ("X" if r.disabled else "") + ("D" if r.dynamic else "")
+        line_out = f"{r.describe()} ;;; {r.comment}" if r.comment else r.describe()
+        print(f"{r.position:<3} {flags:<2} {r.packets:>12} {line_out}")
 
-        flags = ""
-        tokens = line.split()
-        if len(tokens) > 1 and tokens[1].startswith(('X','D','I')):
-            flags = tokens[1]
-            tokens = tokens[2:]
-        else:
-            tokens = tokens[1:]
-
-        comment = ""
-        if ';;;' in line:
-            comment_index = line.index(';;;') + 3
-            comment = line[comment_index:].strip()
-
-        kv_pairs = []
-        for t in tokens:
-            if '=' in t:
-                k, v = t.split('=', 1)
-                kv_pairs.append(f"{k}={v.strip('\"')}")
-            else:
-                kv_pairs.append(t)
-
-        line_out = " ".join(kv_pairs)
-        if comment:
-            line_out = f"{line_out} ;;; {comment}"
-        print(f"{idx:<2} {flags} {line_out}".rstrip())
+    analysis = analyze(rules, top=5)
+    print(f"\n{router_name}: {len(analysis['zero'])} enabled rules never "
+          f"matched, {len(analysis['shadowed'])} shadowed")
+    for rule, by in analysis["shadowed"]:
+        print(f"  #{rule.position} is shadowed by #{by.position}")
 
     print("\nTask completed.")
 
 ###################
-# Show interface status along with assigned IP addresses
+# Build interface status rows from interface and IP address output
 ###################
-def task_interfaces_status(client, router_name=None, *args, **kwargs):
-    try:
-        intf_data = client.call("/interface print")
-        ip_data = client.call("/ip address print")
-    except Exception as e:
-        print(f"{router_name}: Failed to fetch interface or IP data: {e}")
-        return
-
-    print(f"\n--- DEBUG: /interface print on {router_name} ---")
-    print(intf_data)
-    print(f"\n--- DEBUG: /ip address print on {router_name} ---")
-    print(ip_data)
-
+def _interface_rows(intf_data, ip_data):
     ip_map = {}
-    for line in ip_data.splitlines():
-        parts = {}
-        for kv in line.split():
-            if "=" in kv:
-                k, v = kv.split("=", 1)
-                parts[k.strip()] = v.strip()
-        iface = parts.get("interface")
-        addr = parts.get("address")
+    for r in parse_records(ip_data):
+        iface = r.get("interface")
+        addr = r.get("address")
         if iface and addr:
             ip_map.setdefault(iface, []).append(addr)
 
-    print(f"\n--- Interfaces on {router_name} ---")
-    for line in intf_data.splitlines():
-        parts = {}
-        for kv in line.split():
-            if "=" in kv:
-                k, v = kv.split("=", 1)
-                parts[k.strip()] = v.strip()
+    rows = []
+    for r in parse_records(intf_data):
+        parts = r.fields
 
         if not parts.get("name"):
             continue
 
         name = parts.get("name")
         intf_type = parts.get("type", "")
-        disabled = parts.get("disabled", "no").lower() in ["yes", "true"]
-        running = parts.get("running", "no").lower() in ["yes", "true"]
+        disabled = r.disabled
+        running = "R" in r.flags or is_yes(parts.get("running"))
 
         if intf_type in ["ether", "sfp", "sfpplus"]:
             status = "UP" if running and not disabled else "DOWN"
@@ -373,10 +335,47 @@ def task_interfaces_status(client, router_name=None, *args, **kwargs):
         elif intf_type in ["wg", "zerotier", "loopback"]:
             status = "UP"
         else:
-            status = "DOWN" if parts.get("link-down", "false").lower() in ["yes", "true"] else "UP"
+            status = "DOWN" if is_yes(parts.get("link-down")) else "UP"
+
+        rows.append({
+            "name": name,
+            "type": intf_type,
+            "status": status,
+            "ips": ", ".join(ip_map.get(name, [])),
+        })
+
+    return rows
+
+def _fetch_interface_data(client):
+    return client.call_many([
+        "/interface print terse without-paging",
+        "/ip/address/print detail without-paging",
+    ])
+
+###################
+# Interface status as report rows
+###################
+def rows_interfaces_status(client, router_name=None):
+    return _interface_rows(*_fetch_interface_data(client))
+
+###################
+# Show interface status along with assigned IP addresses
+###################
+def task_interfaces_status(client, router_name=None, *args, **kwargs):
+    try:
+        intf_data, ip_data = _fetch_interface_data(client)
+    except Exception as e:
+        raise RuntimeError(f"Failed to fetch interface or IP data: {e}") from e
 
-        ips = ", ".join(ip_map.get(name, [])) if ip_map.get(name) else "—"
-        print(f"{name:20} : {status:4} : {ips}")
+    print(f"\n--- DEBUG: /interface print on {router_name} ---")
+    print(intf_data)
+    print(f"\n--- DEBUG: /ip address print on {router_name} ---")
+    print(ip_data)
+
+    print(f"\n--- Interfaces on {router_name} ---")
+    for row in _interface_rows(intf_data, ip_data):
+        ips = row["ips"] or "—"
+        print(f"{row['name']:20} : {row['status']:4} : {ips}")
 
 ###################
 # Backup router configuration to a file
@@ -392,4 +391,16 @@ def task_backup_config(client, router_name=None, *args, **kwargs):
         client.call(cmd)
         print(f"{router_name}: Backup saved as {filename}")
     except Exception as e:
-        print(f"{router_name}: Failed to save backup: {e}")
+        raise RuntimeError(f"Failed to save backup: {e}") from e
+
+###################
+# Keep the router's /export in the local archive (skipped if unchanged)
+###################
+def task_archive_export(client, router_name=None, *args, **kwargs):
+    try:
+        result = export_router(client, router_name, ConfigArchive())
+    except Exception as e:
+        raise RuntimeError(f"Failed to export config: {e}") from e
+
+    print(f"{router_name}: {result['status']} {result['sha'][:12]} "
+          f"({result['size']} bytes)")
@@ -0,0 +1,249 @@
+# -----------------------------------------
+# Continuous interface traffic sampling (ring-buffer time series)
+# -----------------------------------------
+
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from units import to_number
+
+
+# Sample columns kept per interface
+COLUMNS = ("rx-bps", "tx-bps", "rx-pps", "tx-pps")
+
+_MONITOR_KEYS = {
+    "rx-bits-per-second": "rx-bps",
+    "tx-bits-per-second": "tx-bps",
+    "rx-packets-per-second": "rx-pps",
+    "tx-packets-per-second": "tx-pps",
+}
+
+
+###################
+# Fixed-size time series
+###################
+class RingBuffer:
+    """
+    Last `size` samples of one interface in a preallocated NumPy array:
+    column 0 is the timestamp, then one column per COLUMNS entry.
+    Appending overwrites the oldest sample; nothing is reallocated.
+    """
+
+    def __init__(self, size, columns=COLUMNS):
+        self.columns = tuple(columns)
+        self._data = np.full((size, len(self.columns) + 1), np.nan)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, values):
+        with self._lock:
+            row = self._data[self._next]
+            row[0] = timestamp
+            row[1:] = values
+            self._next = (self._next + 1) % len(self._data)
+            self._count = min(self._count + 1, len(self._data))
+
+    def window(self, seconds=None, now=None):
+        """
+        Samples of the last `seconds` (all if None), oldest first.
+        """
+        with self._lock:
+            if self._count < len(self._data):
+                data = self._data[:self._count].copy()
+            else:
+                data = np.roll(self._data, -self._next, axis=0)
+
+        if seconds is not None:
+            now = time.time() if now is None else now
+            data = data[data[:, 0] >= now - seconds]
+        return data
+
+    def stats(self, seconds=None, now=None):
+        """
+        {column: {"last", "mean", "p95", "peak"}} over the window; None if
+        the window holds no samples.
+        """
+        data = self.window(seconds, now)
+        if not len(data):
+            return None
+
+        values = data[:, 1:]
+        with warnings.catch_warnings():
+            # Columns the router never reported are all-NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(values, axis=0)
+            p95 = np.nanpercentile(values, 95, axis=0)
+            peak = np.nanmax(values, axis=0)
+        return {
+            col: {"last": float(values[-1, i]), "mean": float(mean[i]),
+                  "p95": float(p95[i]), "peak": float(peak[i])}
+            for i, col in enumerate(self.columns)
+        }
+
+
+###################
+# monitor-traffic output -> samples
+###################
+def parse_monitor(lines):
+    """
+    Yields one {interface: {key: value}} dict per block of CLI
+    monitor-traffic output. Multi-interface output is columnar:
+    "name: ether1 ether2" followed by "rx-bits-per-second: 1kbps 3Mbps".
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    names = []
+    block = {}
+
+    for line in lines:
+        key, sep, rest = line.strip().partition(":")
+        if not sep:
+            if names and not line.strip():
+                yield block
+                names = []
+            continue
+
+        values = rest.split()
+        if key == "name":
+            if names:
+                yield block
+            names = values
+            block = {n: {} for n in names}
+            continue
+
+        for name, value in zip(names, values):
+            block[name][key] = value
+
+    if names:
+        yield block
+
+
+def sample_values(fields):
+    """
+    Converts one interface's monitor fields into a COLUMNS tuple of floats.
+    """
+    values = dict.fromkeys(COLUMNS, np.nan)
+    for key, column in _MONITOR_KEYS.items():
+        number = to_number(fields.get(key))
+        if number is not None:
+            values[column] = number
+    return tuple(values.values())
+
+
+def monitor(client, interfaces, interval=1):
+    """
+    Keeps one monitor-traffic request open and yields
+    {interface: COLUMNS tuple} per interval.
+    """
+    names = ",".join(interfaces)
+    if client.api:
+        wanted = len(set(interfaces))
+        block = {}
+        for row in client.api.stream("/interface/monitor-traffic",
+                                     f"=interface={names}",
+                                     f"=interval={interval}"):
+            # The API sends one reply per interface and interval; a block
+            # is complete once every interface reported (or one repeats)
+            name = row.get("name")
+            if name in block:
+                yield block
+                block = {}
+            block[name] = sample_values(row)
+            if len(block) >= wanted:
+                yield block
+                block = {}
+        if block:
+            yield block
+        return
+
+    command = f"/interface/monitor-traffic {names} interval={interval}"
+    for block in parse_monitor(client.call_iter(command)):
+        yield {name: sample_values(fields) for name, fields in block.items()}
+
+
+###################
+# Fleet sampler
+###################
+class TrafficSampler:
+    """
+    Samples every interface of every router into per-interface ring
+    buffers, one long-lived monitor session per router.
+    """
+
+    def __init__(self, clients, history=900, interval=1, retry=5):
+        self.clients = clients
+        self.history = history
+        self.interval = interval
+        self.retry = retry
+        self.buffers = {}                   # (router, interface) -> RingBuffer
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _buffer(self, router, interface):
+        key = (router, interface)
+        with self._lock:
+            if key not in self.buffers:
+                self.buffers[key] = RingBuffer(self.history)
+            return self.buffers[key]
+
+    def _sample_router(self, name, client):
+        while not self._stop.is_set():
+            try:
+                client.connect()
+                interfaces = [row["name"] for row in
+                              client.rows("/interface", ["name"], disabled=False)]
+                for block in monitor(client, interfaces, self.interval):
+                    if self._stop.is_set():
+                        break
+                    now = time.time()
+                    for interface, values in block.items():
+                        self._buffer(name, interface).append(now, values)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"{name}: {e} (retrying in {self.retry}s)",
+                          file=sys.stderr)
+            finally:
+                client.close()
+            self._stop.wait(self.retry)
+
+    def start(self):
+        for name, client in self.clients.items():
+            thread = threading.Thread(target=self._sample_router,
+                                      args=(name, client), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def rows(self, seconds=None):
+        """
+        One report row per interface with last/mean/p95/peak per column
+        over the last `seconds`.
+        """
+        now = time.time()
+        with self._lock:
+            buffers = sorted(self.buffers.items())
+
+        rows = []
+        for (router, interface), buffer in buffers:
+            stats = buffer.stats(seconds, now)
+            if not stats:
+                continue
+            row = {"router": router, "interface": interface}
+            for column, values in stats.items():
+                for stat, value in values.items():
+                    if not np.isnan(value):
+                        row[f"{column}-{stat}"] = round(value, 1)
+            rows.append(row)
+        return rows
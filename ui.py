@@ -43,36 +43,45 @@ def get_user_choice():
         return -1
 
 
-def select_routers(clients):
-    if not clients:
+def select_routers(inventory, max_listed=40):
+    """
+    Asks for routers by index or by selection expression and returns the
+    chosen names. Large inventories are summarized by tag instead of
+    listed one per line.
+    """
+    if not len(inventory):
         print("No routers available.")
-        return {}
+        return []
 
-    names = list(clients.keys())
+    names = inventory.names()
 
-    print("\nAvailable routers (SSH):")
-    for idx, name in enumerate(names, start=1):
-        print(f"{idx}. {name}")
+    if len(names) <= max_listed:
+        print("\nAvailable routers:")
+        for idx, name in enumerate(names, start=1):
+            print(f"{idx}. {name}")
+    else:
+        tags = ", ".join(f"{t} ({n})" for t, n in inventory.tag_counts().items())
+        print(f"\n{len(names)} routers. Tags: {tags or 'none'}")
 
     selection = input(
-        "\nSelect routers by index (comma-separated), "
-        "ENTER for ALL, or 0 to cancel:\n> "
+        "\nSelect routers by index (comma-separated) or expression "
+        "(e.g. tag:edge site:ath* !lab*),\nENTER for ALL, or 0 to cancel:\n> "
     ).strip()
 
     if selection == "0":
-        return {}
+        return []
 
     if not selection:
-        return clients  # ALL routers
-
-    indices = set()
-    for i in selection.split(","):
-        i = i.strip()
-        if i.isdigit():
-            indices.add(int(i))
-
-    return {
-        names[i - 1]: clients[names[i - 1]]
-        for i in indices
-        if 1 <= i <= len(names)
-    }
+        return names  # ALL routers
+
+    if all(i.strip().isdigit() for i in selection.split(",")):
+        indices = sorted({int(i) for i in selection.split(",")})
+        return [names[i - 1] for i in indices if 1 <= i <= len(names)]
+
+    try:
+        selected = inventory.select(selection)
+    except ValueError as e:
+        print(e)
+        return []
+    print(f"{len(selected)} routers selected.")
+    return selected
@@ -0,0 +1,108 @@
+# -----------------------------------------
+# RouterOS value units -> numbers
+# -----------------------------------------
+
+import re
+
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGTP]i?B|B)?\s*$")
+_SIZE_FACTORS = {
+    None: 1, "B": 1,
+    "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+    "PiB": 1024 ** 5,
+    "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4,
+    "PB": 1000 ** 5,
+}
+
+_RATE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kKMGT]?)bps\s*$")
+_RATE_FACTORS = {"": 1, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9, "T": 1e12}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|us|w|d|h|m|s)")
+_DURATION = re.compile(r"^(?:\d+(?:\.\d+)?(?:ms|us|w|d|h|m|s))+$")
+_CLOCK = re.compile(r"^(?:(\d+)d)?(\d+):(\d{2}):(\d{2}(?:\.\d+)?)$")
+_DURATION_FACTORS = {"w": 604800, "d": 86400, "h": 3600, "m": 60, "s": 1,
+                     "ms": 0.001, "us": 0.000001}
+
+
+def parse_size(text):
+    """
+    "12.3MiB" -> bytes. Returns None if text is not a size.
+    """
+    m = _SIZE.match(text or "")
+    if not m:
+        return None
+    return float(m.group(1)) * _SIZE_FACTORS[m.group(2)]
+
+
+def parse_rate(text):
+    """
+    "1.2Mbps" -> bits per second. Returns None if text is not a rate.
+    """
+    m = _RATE.match(text or "")
+    if not m:
+        return None
+    return float(m.group(1)) * _RATE_FACTORS[m.group(2)]
+
+
+def format_rate(bps):
+    """
+    Bits per second -> "1.2Mbps", the way RouterOS prints rates.
+    """
+    for unit, factor in (("Gbps", 1e9), ("Mbps", 1e6), ("kbps", 1e3)):
+        if bps >= factor:
+            return f"{bps / factor:.1f}{unit}"
+    return f"{bps:.0f}bps"
+
+
+def parse_duration(text):
+    """
+    "1w2d3h4m5s", "150ms" or "3d04:05:06" -> seconds. Returns None if
+    text is not a duration.
+    """
+    text = (text or "").strip()
+    if _DURATION.match(text):
+        return sum(float(n) * _DURATION_FACTORS[u]
+                   for n, u in _DURATION_PART.findall(text))
+
+    m = _CLOCK.match(text)
+    if m:
+        days, h, mi, s = m.groups()
+        return (int(days or 0) * 86400 + int(h) * 3600 + int(mi) * 60
+                + float(s))
+    return None
+
+
+def parse_percent(text):
+    """
+    "12%" -> 12.0. Returns None if text is not a percentage.
+    """
+    text = (text or "").strip()
+    if not text.endswith("%"):
+        return None
+    try:
+        return float(text[:-1])
+    except ValueError:
+        return None
+
+
+def to_number(text):
+    """
+    Best-effort numeric value of a RouterOS field: plain numbers,
+    percentages, sizes, rates and durations. Returns None otherwise.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return float(text)
+
+    text = str(text).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    for parse in (parse_percent, parse_size, parse_rate, parse_duration):
+        value = parse(text)
+        if value is not None:
+            return value
+    return None
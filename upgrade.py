@@ -0,0 +1,162 @@
+# -----------------------------------------
+# Fleet RouterOS upgrades: parallel checks, waves, version confirmation
+# -----------------------------------------
+
+import random
+import sys
+import time
+
+from paramiko import SSHException
+
+import scanner
+from parsing import parse_properties
+from runner import run_on_routers
+
+
+UPDATE_PATH = "/system package update"
+
+# Status texts of a check that has not finished yet
+_PENDING = ("checking", "finding out", "downloading", "calculating")
+
+
+def backoff(initial=1.0, maximum=15.0, factor=2.0):
+    """
+    Yields growing sleep intervals with +-20% jitter, so hundreds of
+    routers polled together do not stay in lock-step.
+    """
+    delay = initial
+    while True:
+        yield delay * random.uniform(0.8, 1.2)
+        delay = min(delay * factor, maximum)
+
+
+def update_status(client):
+    # The status changes under us while polling; never serve it cached
+    return parse_properties(client.call(f"{UPDATE_PATH} print", fresh=True))
+
+
+def is_settled(info):
+    status = info.get("status", "").lower()
+    return bool(status) and not any(p in status for p in _PENDING)
+
+
+###################
+# Update check with polling
+###################
+def check(client, name=None, channel=None, timeout=120):
+    """
+    Starts check-for-updates and polls the update status with backoff
+    until it settles. Returns the status dict plus "update-available"
+    (bool) and "settled" (False if timeout ran out first).
+    """
+    if channel:
+        client.call(f"{UPDATE_PATH} set channel={channel}")
+    client.call(f"{UPDATE_PATH} check-for-updates")
+
+    deadline = time.monotonic() + timeout
+    delays = backoff()
+    while True:
+        info = update_status(client)
+        if is_settled(info) or time.monotonic() >= deadline:
+            break
+        time.sleep(min(next(delays), max(0, deadline - time.monotonic())))
+
+    installed = info.get("installed-version", "")
+    latest = info.get("latest-version", "")
+    info["settled"] = is_settled(info)
+    info["update-available"] = bool(installed and latest and installed != latest)
+    return info
+
+
+###################
+# Install one router and wait for it to come back upgraded
+###################
+def wait_for_version(client, version, timeout=900):
+    """
+    Waits for the router to drop off and answer on its port again (cheap
+    TCP probes), then reconnects with backoff until it reports version as
+    installed. Returns the seconds waited; raises RuntimeError on timeout.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    scanner.wait_until_up(client, timeout=timeout, wait_down=True)
+    delays = backoff(initial=2, maximum=15)
+    last_error = "no answer"
+
+    while time.monotonic() < deadline:
+        try:
+            client.close()
+            client.connect()
+            installed = update_status(client).get("installed-version")
+            if installed == version:
+                return time.monotonic() - started
+            last_error = f"still on {installed}"
+        except Exception as e:
+            last_error = str(e)
+        time.sleep(min(next(delays), max(0, deadline - time.monotonic())))
+
+    raise RuntimeError(f"not back on {version} after {timeout}s ({last_error})")
+
+
+def install(client, name, version, timeout=900):
+    """
+    Triggers the install (the router downloads, then reboots) and waits
+    until it is reachable again on version.
+    """
+    try:
+        client.call(f"{UPDATE_PATH} install")
+    except (SSHException, EOFError, OSError):
+        pass                                # the session drops on reboot
+    except RuntimeError:
+        # A dropped API session also surfaces as RuntimeError; a router
+        # that is still answering refused the install (nothing downloaded,
+        # bad channel) and must fail now, not after the full wait
+        if client.is_alive():
+            raise
+    return {"version": version,
+            "downtime": round(wait_for_version(client, version, timeout), 1)}
+
+
+###################
+# Waves
+###################
+def plan_waves(names, wave_size, canary=1):
+    """
+    Splits routers into waves: first `canary` routers alone, then groups
+    of wave_size.
+    """
+    names = list(names)
+    waves = [names[:canary]] if canary else []
+    rest = names[canary:] if canary else names
+    waves += [rest[i:i + wave_size] for i in range(0, len(rest), wave_size)]
+    return [w for w in waves if w]
+
+
+def rollout(clients, targets, wave_size=20, canary=1, max_workers=10,
+            max_failures=0, timeout=900, on_result=None):
+    """
+    Installs routers wave by wave. targets maps router name to the version
+    it should end up on. A wave finishes when every router in it is back
+    on its target version (or failed); the next wave starts only if total
+    failures are still within max_failures. Returns all results.
+    """
+    results = []
+    failures = 0
+    waves = plan_waves(sorted(targets), wave_size, canary)
+
+    for number, wave in enumerate(waves, 1):
+        print(f"Wave {number}/{len(waves)}: {len(wave)} routers", file=sys.stderr)
+        wave_results = run_on_routers(
+            {"func": lambda client, name: install(client, name, targets[name], timeout)},
+            {name: clients[name] for name in wave},
+            max_workers=max_workers, on_result=on_result, capture=True,
+        )
+        results.extend(wave_results)
+        failures += sum(not r["ok"] for r in wave_results)
+
+        if failures > max_failures and number < len(waves):
+            skipped = sum(len(w) for w in waves[number:])
+            print(f"Stopping: {failures} failed (max {max_failures}), "
+                  f"{skipped} routers not upgraded", file=sys.stderr)
+            break
+    return results